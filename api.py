@@ -0,0 +1,307 @@
+# Headless HTTP API for the PulseVox engine.
+#
+# An ASGI app (Starlette, which ships with Streamlit) exposing the same intent
+# handlers as the web app: text and audio commands, and direct schedule,
+# availability and summary queries. The models (SharedModels) are built and warmed
+# up at startup and shared by every request, so the LLM connection is reused instead
+# of opened per call. The engine is blocking (LLM calls, file locks), so each request
+# runs it on a worker thread under a capacity limiter; once the limiter and its
+# wait queue are full, new requests are turned away with 503 + Retry-After rather
+# than piling up behind the LLM. Commands whose LLM call is shed by the shared rate
+# limiter (llm_policy) get the same 503; summaries fall back to a local one instead.
+#
+# Run with:  uvicorn api:app --host 0.0.0.0 --port 8000
+# Every endpoint takes an optional 'user' (the task shard, as '?user=' in the web app).
+
+import os
+import time
+import threading
+import functools
+import contextlib
+from datetime import date
+from collections import OrderedDict
+
+import anyio
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from llm import SharedModels
+from llm_policy import send_chat_message, policy_stats, rate_limiter, LLMDeadlineExceeded, LLMOverloaded
+from intent_schema import parse_intent_response, IntentParseError, intent_parse_stats, normalize_date, normalize_time
+from engine import (
+    run_intent,
+    schedule_reply,
+    agenda_reply,
+    specific_time_reply,
+    free_slot_reply,
+    summary_reply,
+    range_summary_reply,
+    transcribe_bytes,
+    TranscriptionError,
+)
+from pulsevox import get_tasks_for_range
+from summary_cache import summary_cache_stats
+from task_store import task_file_for, TaskStoreBusyError
+
+# Engine calls running on worker threads at once, and how many more may wait for a slot
+API_MAX_CONCURRENCY = int(os.getenv("PULSEVOX_API_MAX_CONCURRENCY", "16"))
+API_MAX_QUEUE = int(os.getenv("PULSEVOX_API_MAX_QUEUE", "64"))
+# Chat sessions kept for follow-ups ("move it to 7"); the least recently used is dropped first
+API_MAX_SESSIONS = int(os.getenv("PULSEVOX_API_MAX_SESSIONS", "1000"))
+# Longest date range schedule and availability queries may cover (like summaries' 31-day cap)
+API_MAX_RANGE_DAYS = int(os.getenv("PULSEVOX_API_MAX_RANGE_DAYS", "31"))
+MAX_AUDIO_BYTES = 10 * 2**20
+RETRY_AFTER_SECONDS = 1
+
+
+class ChatSessions:
+    """Chat sessions by session_id, each with a lock so one session's turns never interleave."""
+
+    def __init__(self, models, maxlen=API_MAX_SESSIONS):
+        self.models = models
+        self.maxlen = maxlen
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def get(self, session_id):
+        """(chat, lock) for a session; without a session_id every command gets a fresh chat."""
+        if not session_id:
+            return self.models.start_chat(), threading.Lock()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                entry = self._sessions[session_id] = (self.models.start_chat(), threading.Lock())
+                if len(self._sessions) > self.maxlen:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(session_id)
+            return entry
+
+
+class Overloaded(Exception):
+    """Raised when every worker slot and queue place is taken."""
+
+
+api_stats = {"engine_calls": 0, "rejected": 0, "errors": 0, "in_flight": 0}
+
+
+async def run_blocking(request, fn, *args):
+    """Runs a blocking engine call on a worker thread under the app's capacity limiter."""
+    if api_stats["in_flight"] >= API_MAX_CONCURRENCY + API_MAX_QUEUE:
+        api_stats["rejected"] += 1
+        raise Overloaded()
+    api_stats["engine_calls"] += 1
+    api_stats["in_flight"] += 1  # The event loop is single-threaded, so no lock is needed
+    try:
+        return await anyio.to_thread.run_sync(functools.partial(fn, *args), limiter=request.app.state.limiter)
+    finally:
+        api_stats["in_flight"] -= 1
+
+
+def _param(request, name, normalize=None, required=False):
+    value = request.query_params.get(name)
+    if not value:
+        if required:
+            raise HTTPException(400, f"'{name}' is required")
+        return None
+    if normalize is None:
+        return value
+    normalized = normalize(value)
+    if normalized is None:
+        raise HTTPException(400, f"'{name}' is not a valid value: '{value}'")
+    return normalized
+
+
+def _date_range(request):
+    """(start, end) from ?date=[&end_date=], in order, or a 400 if it spans more than API_MAX_RANGE_DAYS."""
+    start = _param(request, "date", normalize_date, required=True)
+    end = _param(request, "end_date", normalize_date) or start
+    if end < start:
+        start, end = end, start
+    if (date.fromisoformat(end) - date.fromisoformat(start)).days >= API_MAX_RANGE_DAYS:
+        raise HTTPException(400, f"Date range is longer than {API_MAX_RANGE_DAYS} days")
+    return start, end
+
+
+def _minutes(value):
+    return int(value) if value.isdigit() else None
+
+
+def _task_file(request, body=None):
+    return task_file_for((body or {}).get("user") or request.query_params.get("user"))
+
+
+def _reply_json(reply, **extra):
+    return JSONResponse({**extra, "reply": reply._asdict()})
+
+
+def execute_command(request, text, session_id, task_file):
+    """Intent for a command (in the session's chat) and the Reply to it."""
+    chat, lock = request.app.state.sessions.get(session_id)
+    with lock:
+        response = send_chat_message(chat, text)
+    response_data = parse_intent_response(response.text.strip())
+    return response_data, run_intent(response_data, task_file, request.app.state.models.summarizer_model())
+
+
+async def command(request):
+    """POST /v1/command  {"text": ..., "user": ..., "session_id": ...}"""
+    try:
+        body = await request.json()
+    except ValueError:
+        raise HTTPException(400, "Body must be JSON")
+    text = body.get("text") if isinstance(body, dict) else None
+    if not isinstance(text, str) or not text.strip():
+        raise HTTPException(400, "'text' is required")
+    response_data, reply = await run_blocking(request, execute_command, request, text.strip(),
+                                              body.get("session_id"), _task_file(request, body))
+    return _reply_json(reply, intent=response_data)
+
+
+async def audio(request):
+    """POST /v1/audio  raw audio body, or multipart with an 'audio' file; ?user=&session_id="""
+    if request.headers.get("content-type", "").startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("audio")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(400, "Multipart body needs an 'audio' file")
+        audio_bytes = await upload.read()
+    else:
+        audio_bytes = await request.body()
+    if not audio_bytes:
+        raise HTTPException(400, "No audio received")
+    if len(audio_bytes) > MAX_AUDIO_BYTES:
+        raise HTTPException(413, "Audio is too large")
+
+    text = await run_blocking(request, transcribe_bytes, audio_bytes)
+    if not text:
+        raise HTTPException(422, "Speech Recognition could not understand audio.")
+    response_data, reply = await run_blocking(request, execute_command, request, text,
+                                              request.query_params.get("session_id"), _task_file(request))
+    return _reply_json(reply, transcript=text, intent=response_data)
+
+
+async def schedule(request):
+    """GET /v1/schedule?date=[&end_date=]  a day's schedule, or the agenda for a range."""
+    start, end = _date_range(request)
+    task_file = _task_file(request)
+
+    def lookup():
+        text = schedule_reply(start, task_file) if start == end else agenda_reply(start, end, task_file)
+        return text, get_tasks_for_range(start, end, task_file)
+
+    text, tasks = await run_blocking(request, lookup)
+    return JSONResponse({"date": start, "end_date": end, "tasks": tasks, "reply": text})
+
+
+async def availability(request):
+    """GET /v1/availability?date=&time=  (is that time taken?) or ?date=[&end_date=&min_duration=]  (free slots)"""
+    day, end = _date_range(request)
+    at = _param(request, "time", normalize_time)
+    task_file = _task_file(request)
+    if at:
+        text = await run_blocking(request, specific_time_reply, day, at, task_file)
+        return JSONResponse({"date": day, "time": at, "reply": text})
+    min_duration = _param(request, "min_duration", _minutes) or 0
+    text = await run_blocking(request, free_slot_reply, day, end, min_duration, task_file)
+    return JSONResponse({"date": day, "end_date": end, "min_duration": min_duration, "reply": text})
+
+
+async def summary(request):
+    """GET /v1/summary?date=[&end_date=]"""
+    start = _param(request, "date", normalize_date, required=True)
+    end = _param(request, "end_date", normalize_date) or start
+    model = request.app.state.models.summarizer_model()
+    if start == end:
+        text = await run_blocking(request, summary_reply, start, model, _task_file(request))
+    else:
+        text = await run_blocking(request, range_summary_reply, start, end, model, _task_file(request))
+    return JSONResponse({"date": start, "end_date": end, "reply": text})
+
+
+async def healthz(request):
+    return JSONResponse({"status": "ok"})
+
+
+async def stats(request):
+    return JSONResponse({
+        "api": {**api_stats, "sessions": len(request.app.state.sessions),
+                "max_concurrency": API_MAX_CONCURRENCY, "max_queue": API_MAX_QUEUE,
+                "uptime_seconds": round(time.monotonic() - request.app.state.started, 1)},
+        "llm": policy_stats,
+        "llm_queues": rate_limiter.queue_stats(),
+        "intent_parse": intent_parse_stats,
+        "summary_cache": summary_cache_stats,
+    })
+
+
+def _error(status, message, **headers):
+    api_stats["errors"] += 1
+    return JSONResponse({"error": message}, status_code=status, headers=headers or None)
+
+
+async def http_error(request, exc):
+    return _error(exc.status_code, exc.detail)
+
+
+async def overloaded(request, exc):
+    return _error(503, "Server is busy; try again shortly.", **{"Retry-After": str(RETRY_AFTER_SECONDS)})
+
+
+async def llm_overloaded(request, exc):
+    return _error(503, "The LLM quota is used up for now; try again shortly.", **{"Retry-After": str(RETRY_AFTER_SECONDS)})
+
+
+async def store_busy(request, exc):
+    return _error(503, "The schedule is being updated by another session; try again.",
+                  **{"Retry-After": str(RETRY_AFTER_SECONDS)})
+
+
+async def intent_error(request, exc):
+    return _error(422, f"The LLM returned an intent that couldn't be parsed: {exc}")
+
+
+async def llm_timeout(request, exc):
+    return _error(504, f"The LLM didn't answer in time: {exc}")
+
+
+async def transcription_error(request, exc):
+    return _error(422, str(exc))
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    app.state.models = SharedModels()
+    app.state.models.warm_up(background=True)
+    app.state.sessions = ChatSessions(app.state.models)
+    app.state.limiter = anyio.CapacityLimiter(API_MAX_CONCURRENCY)
+    app.state.started = time.monotonic()
+    yield
+
+
+app = Starlette(
+    routes=[
+        Route("/v1/command", command, methods=["POST"]),
+        Route("/v1/audio", audio, methods=["POST"]),
+        Route("/v1/schedule", schedule, methods=["GET"]),
+        Route("/v1/availability", availability, methods=["GET"]),
+        Route("/v1/summary", summary, methods=["GET"]),
+        Route("/v1/stats", stats, methods=["GET"]),
+        Route("/healthz", healthz, methods=["GET"]),
+    ],
+    exception_handlers={
+        HTTPException: http_error,
+        Overloaded: overloaded,
+        TaskStoreBusyError: store_busy,
+        IntentParseError: intent_error,
+        LLMDeadlineExceeded: llm_timeout,
+        LLMOverloaded: llm_overloaded,
+        TranscriptionError: transcription_error,
+    },
+    lifespan=lifespan,
+)
@@ -1,41 +1,39 @@
 import streamlit as st
 import os
-import json
 from datetime import datetime
-import pandas as pd
-from dotenv import load_dotenv
-import google.generativeai as genai
-import speech_recognition as sr
 import io
+import uuid
+import threading
 from streamlit_mic_recorder import mic_recorder
-from pydub import AudioSegment
-from gtts import gTTS
+# pandas, pydub, TTS engines, speech_recognition and google.generativeai are imported where
+# they're used, so a fresh worker can render the page before loading them.
 # import glob # For finding FFmpeg
 
 try:
+    from llm import SharedModels
+    from llm_policy import send_chat_message, rate_limiter, LLMOverloaded
+    from summary_cache import summary_cache_stats
+    from intent_schema import parse_intent_response, IntentParseError, intent_parse_stats, parse_rates
     from pulsevox import (
-        system_prompt, 
-        get_task_description,
         load_all_tasks,
-        save_all_tasks,
-        check_for_conflicts,
-        handle_task_removal,
-        handle_task_update,
+        archive_old_tasks,
+        start_summary_prewarmer,
+        SUMMARY_PREWARM_SECONDS,
+        start_reminder_service,
+        REMINDERS_ENABLED,
     )
+    from engine import run_intent, agenda_reply, transcribe_bytes, TranscriptionError
+    from task_logic import AGENDA_PERIODS, agenda_range
+    from conversation_history import ConversationHistory, spill_path_for, prune_spill_files
+    from reminders import ReminderFeed
+    from task_store import task_file_for, TaskStoreBusyError
+    from store_feed import watch_store
+    from tts import synthesize, tts_router, TTSError
 except ImportError:
     st.error("Could not import functions from pulsevox.py. Make sure it's in the same directory.")
     st.stop()
 
 
-load_dotenv()
-API_KEY = os.getenv("GEMINI_API_KEY")
-# if not API_KEY:
-#     st.error("ERROR: GEMINI_API_KEY is not set or couldn't be found in .env file.")
-#     # st.stop()
-
-genai.configure(api_key=API_KEY)
-TASK_FILE = "tasks.json"
-
 # username = os.getlogin() # Get current username
 # # Ensure the path uses raw string or escaped backslashes
 # # Use glob to find the specific version folder as it might change
@@ -67,34 +65,33 @@ TASK_FILE = "tasks.json"
 #          st.sidebar.error(f"FFmpeg not found via winget or system PATH. Audio conversion will fail. Please install FFmpeg and add it to PATH. Details: {e}")
 #          # Consider st.stop() if FFmpeg is absolutely essential
 
+@st.cache_resource(show_spinner=False)
+def get_shared_models():
+    """Process-wide Gemini models, built and warmed up once when the server starts."""
+    models = SharedModels()
+    models.warm_up(background=True)
+    return models
+
 def initialize_state():
     """Initializes the models and chat history in Streamlit's session state."""
     # Initialize only if 'initialized' flag is not set
     if "initialized" not in st.session_state:
         try:
-            # 1. The JSON Expert (Main Brain)
-            json_model = genai.GenerativeModel(
-                'models/gemini-2.5-flash',
-                system_instruction=system_prompt # Use imported variable
-            )
-            st.session_state.chat_session = json_model.start_chat(history=[])
-
-            # 2. The Text Summarizer (Generalist)
-            summarizer_prompt = "You are a helpful assistant. You answer user requests in natural, conversational language. You do NOT output JSON."
-            st.session_state.summarizer_model = genai.GenerativeModel(
-                'models/gemini-2.5-flash',
-                system_instruction=summarizer_prompt
-            )
-
-            # 3. The chat history for display
-            st.session_state.history = []
-
-            # 4. Speech Recognizer
-            st.session_state.recognizer = sr.Recognizer()
+            # 1. The JSON Expert (Main Brain): a per-user chat on the shared model
+            models = get_shared_models()
+            st.session_state.chat_session = models.start_chat()
+
+            # 2. The Text Summarizer (Generalist), shared by all sessions
+            st.session_state.summarizer_model = models.summarizer_model()
+
+            # 3. The chat history for display: a ring buffer, older entries optionally spilled to disk
+            st.session_state.history = ConversationHistory(spill_path=spill_path_for(uuid.uuid4().hex))
+            st.session_state.history_shown = HISTORY_PAGE_SIZE
+
+            # 4. Speech Recognizer is created on the first recording (see transcribe_audio)
 
             # 5. State flags for audio processing
             st.session_state.audio_command_ready = None # None: no audio, "": failed trans, str: ready
-            st.session_state.history = []
             
             # 6. Set initialized flag
             st.session_state.message_to_speak = None
@@ -105,48 +102,127 @@ def initialize_state():
             # Potentially stop the app if initialization fails critically
             st.stop()
 
+# Icon in front of each reply, by Reply.status
+REPLY_ICONS = {"success": "✅", "info": "🗓️", "warning": "⚠️", "error": "❌"}
+
+# History entries rendered per page ("Load older" adds another page)
+HISTORY_PAGE_SIZE = 10
+
+# Same precedence as get_task_description()
+DESCRIPTION_COLUMNS = ['task_description', 'task', 'title', 'description']
+SCHEDULE_COLUMNS = ['task_description', 'category', 'date', 'start_time', 'end_time', 'status']
+SCHEDULE_PAGE_SIZES = [25, 50, 100, 250]
+
+# Seconds between the schedule panel's checks for changes made by other sessions or processes
+SCHEDULE_REFRESH_SECONDS = 2
+
+def _schedule_rows(keyed_tasks):
+    """Schedule table rows for {key: task}, indexed by task key."""
+    import pandas as pd
+    if not keyed_tasks:
+        return pd.DataFrame(columns=SCHEDULE_COLUMNS)
+    df = pd.DataFrame(list(keyed_tasks.values()), index=list(keyed_tasks))
+
+    # Coalesce the description columns column-wise instead of calling get_task_description per row
+    description = pd.Series(pd.NA, index=df.index, dtype="object")
+    for col in DESCRIPTION_COLUMNS:
+        if col in df.columns:
+            description = description.combine_first(df[col].replace("", pd.NA))
+    df['task_description'] = description.fillna("an unnamed task")
+
+    for col in SCHEDULE_COLUMNS:
+        if col not in df.columns:
+            df[col] = pd.NA
+    return df[SCHEDULE_COLUMNS]
+
+@st.cache_resource(show_spinner=False)
+def get_store_feed(task_file):
+    """The task file's change feed, kept current by one watcher thread per server process."""
+    return watch_store(task_file)
+
+@st.cache_resource(show_spinner=False)
+def get_schedule_table(task_file):
+    """The schedule table shared by every session on a task file, and the feed version it reflects."""
+    return {"version": None, "frame": None, "lock": threading.Lock()}
+
+def schedule_frame(task_file):
+    """The schedule table, patched with just the rows the change feed reports instead of rebuilt."""
+    import pandas as pd
+    feed = get_store_feed(task_file)
+    feed.refresh() # A stat(); the watcher normally got there first
+    table = get_schedule_table(task_file)
+    with table["lock"]:
+        changes = feed.changes_since(table["version"]) if table["frame"] is not None else None
+        if changes is None:
+            table["version"], frame = feed.version, _schedule_rows(feed.keyed())
+        elif changes[0] != table["version"]:
+            table["version"], upserts, removed = changes
+            frame = table["frame"].drop(index=[*upserts, *removed], errors="ignore")
+            if upserts:
+                rows = _schedule_rows(upserts)
+                frame = pd.concat([frame, rows]) if len(frame) else rows
+        else:
+            return table["frame"]
+        table["frame"] = frame.sort_values(['date', 'start_time'], na_position='last', kind='stable')
+        return table["frame"]
+
+@st.cache_resource(show_spinner=False)
+def archive_old_tasks_daily(task_file, today):
+    """Runs the archival stage at most once per task file per day and server process."""
+    try:
+        return archive_old_tasks(task_file)
+    except TaskStoreBusyError:
+        return 0 # Another session holds the lock; archiving can wait for the next day
+
+@st.cache_resource(show_spinner=False)
+def prune_history_spill_daily(today):
+    """Deletes stale history spill files (sessions that ended without cleanup) once a day per server process."""
+    return prune_spill_files()
+
+@st.cache_resource(show_spinner=False)
+def start_summary_prewarm(task_file):
+    """One background job per task file keeps today's and tomorrow's summaries cached."""
+    if SUMMARY_PREWARM_SECONDS > 0:
+        return start_summary_prewarmer(get_shared_models().summarizer_model(), task_file)
+
+@st.cache_resource(show_spinner=False)
+def get_reminder_feed(task_file):
+    """One reminder service per task file; sessions read what it fired from the shared feed."""
+    feed = ReminderFeed()
+    if REMINDERS_ENABLED:
+        start_reminder_service(feed.append, task_file)
+    return feed
+
+@st.fragment(run_every=10)
+def show_new_reminders(task_file):
+    """Reruns on its own every few seconds (not the whole page) and toasts reminders this session hasn't seen."""
+    feed = get_reminder_feed(task_file)
+    last_seen = st.session_state.setdefault("reminders_seen", feed.latest_seq())
+    for seq, text in feed.since(last_seen):
+        st.toast(text, icon="⏰")
+        st.session_state.reminders_seen = seq
+
+def get_session_task_file():
+    """Returns this browser session's task shard, picked with the '?user=' URL parameter."""
+    return task_file_for(st.query_params.get("user"))
+
 def transcribe_audio(audio_dict):
     """Transcribes audio bytes from the web recorder's output dict."""
     if not audio_dict or 'bytes' not in audio_dict:
         return None
+    import speech_recognition as sr
 
-    # Ensure recognizer is initialized
+    # Create the recognizer on first use
     if "recognizer" not in st.session_state:
-        st.error("Speech recognizer not initialized.")
-        return None
-    r = st.session_state.recognizer
-    audio_bytes = audio_dict['bytes']
-
+        st.session_state.recognizer = sr.Recognizer()
     try:
-        # 1. Load the web-format audio bytes
-        input_audio = io.BytesIO(audio_bytes)
-        # Explicitly state format if known, otherwise let pydub guess
-        sound = AudioSegment.from_file(input_audio) # pydub often guesses webm/ogg correctly
-
-        # 2. Create an in-memory WAV file
-        output_wav = io.BytesIO()
-        sound.export(output_wav, format="wav")
-        output_wav.seek(0)
-    except Exception as e:
-        st.error(f"Audio conversion error (check FFmpeg installation/path): {e}")
+        text = transcribe_bytes(audio_dict['bytes'], st.session_state.recognizer)
+    except TranscriptionError as e:
+        st.error(str(e))
         return None
-
-    try:
-        # 3. Read the WAV file
-        with sr.AudioFile(output_wav) as source:
-            # Adjust for ambient noise (though less effective on file vs mic)
-            # r.adjust_for_ambient_noise(source, duration=0.5) # Optional: Can sometimes help
-            audio_data = r.record(source)
-
-        # 4. Transcribe
-        text = r.recognize_google(audio_data, language="en-IN")
-        return text.lower()
-    except sr.UnknownValueError:
+    if text is None:
         st.warning("Speech Recognition could not understand audio.")
-        return None
-    except sr.RequestError as e:
-        st.error(f"Speech service error; {e}")
-        return None
+    return text
     
 def speak_web(text_to_speak):
     """Generates speech audio and embeds it in Streamlit."""
@@ -182,113 +258,88 @@ def speak_web(text_to_speak):
         if not clean_text:
             return
         
-        tts = gTTS(text=clean_text, lang='en', slow=False)
-        # Create an in-memory file-like object
-        mp3_fp = io.BytesIO()
-        tts.write_to_fp(mp3_fp)
-        # Reset the stream position to the beginning
-        mp3_fp.seek(0)
+        # gTTS while it's fast, otherwise the local engine (see tts.py); the audio stays in memory
+        audio = synthesize(clean_text, 'en')
         # Embed the audio player
-        st.audio(mp3_fp, format='audio/mp3', start_time=0)
+        st.audio(io.BytesIO(audio.data), format=f'audio/{audio.format}', start_time=0)
+    except TTSError as e:
+        st.warning(f"Audio feedback is unavailable: {e}")
     except Exception as e:
         st.error(f"Error generating or playing audio feedback: {e}")
 
-def handle_web_schedule_query(date_query):
-    """Web-friendly version: Returns text instead of speaking."""
-    all_tasks = load_all_tasks()
-    if not all_tasks: 
-        return "You don't have any tasks saved yet."
-    tasks_for_date = [task for task in all_tasks if task.get('date') == date_query]
-    if not tasks_for_date: 
-        return f"You have nothing scheduled for {date_query}."
-    tasks_for_date.sort(key=lambda x: datetime.strptime(x.get('start_time', '00:00'), "%H:%M"))
-    task_descriptions = []
-    for task in tasks_for_date:
-        desc = get_task_description(task)
-        start_time_str = task.get('start_time'); end_time_str = task.get('end_time')
-        if start_time_str and end_time_str:
-            try:
-                start_obj = datetime.strptime(start_time_str, "%H:%M")
-                end_obj = datetime.strptime(end_time_str, "%H:%M")
-                start_natural = start_obj.strftime("%I:%M %p").lstrip('0')
-                end_natural = end_obj.strftime("%I:%M %p").lstrip('0')
-                if (end_obj - start_obj).total_seconds() > 60: # Use total_seconds() for reliability
-                    desc += f" from {start_natural} to {end_natural}"
-                else:
-                    desc += f" at {start_natural}"
-            except ValueError: desc += f" at {start_time_str}"
-        task_descriptions.append(desc)
-    if len(tasks_for_date) == 1:
-        return f"For {date_query}, you have one task: {task_descriptions[0]}."
-    else:
-        # Handle cases with 2 tasks correctly
-        if len(task_descriptions) == 2:
-             joined_tasks = f"{task_descriptions[0]} and {task_descriptions[1]}"
-        elif len(task_descriptions) > 2:
-             joined_tasks = ", ".join(task_descriptions[:-1]) + f", and {task_descriptions[-1]}"
-        else: # Should not happen if tasks_for_date is not empty, but good fallback
-             joined_tasks = task_descriptions[0] if task_descriptions else "nothing"
-        return f"For {date_query}, you have {len(tasks_for_date)} tasks: {joined_tasks}."
-
-def handle_web_specific_time_query(date_query, time_query):
-    """Web-friendly version: Returns text instead of speaking."""
-    all_tasks = load_all_tasks()
-    if not all_tasks: 
-        return "You don't have any tasks saved yet."
-    try:
-        time_format = "%H:%M"; query_time = datetime.strptime(time_query, time_format).time()
-    except ValueError: 
-        return f"Sorry, I didn't understand the time {time_query}."
-    found_task = None
-    for task in all_tasks:
-        # Check date and ensure time keys exist before parsing
-        if task.get("date") == date_query and all(k in task for k in ["start_time", "end_time"]):
-            try:
-                start_time = datetime.strptime(task["start_time"], time_format).time()
-                end_time = datetime.strptime(task["end_time"], time_format).time()
-                # Check for overlap: query time is within [start_time, end_time)
-                if start_time <= query_time < end_time:
-                    found_task = task; break
-            except ValueError: 
-                continue # Ignore tasks with invalid time format
-    if found_task:
-        task_desc = get_task_description(found_task)
-        start_str = datetime.strptime(found_task['start_time'], time_format).strftime("%I:%M %p").lstrip('0')
-        end_str = datetime.strptime(found_task['end_time'], time_format).strftime("%I:%M %p").lstrip('0')
-        return f"Yes, at that time, you have '{task_desc}' scheduled from {start_str} to {end_str}."
-    else:
-        natural_query_time = datetime.strptime(time_query, time_format).strftime("%I:%M %p").lstrip('0')
-        return f"You appear to be free at {natural_query_time} on {date_query}."
-
-# Wrapper for summarization to pass the correct model from state
-def handle_web_summarization(date_query):
-    """Web-friendly version: Returns summary text."""
-    if "summarizer_model" not in st.session_state:
-        return "Summarizer model not initialized."
-
-    all_tasks = load_all_tasks()
-    if not all_tasks: 
-        return "You don't have any tasks saved yet."
-    tasks_for_date = [task for task in all_tasks if task.get('date') == date_query]
-    if not tasks_for_date: 
-        return f"You have nothing scheduled for {date_query}."
-    tasks_for_date.sort(key=lambda x: datetime.strptime(x.get('start_time', '00:00'), "%H:%M"))
-    task_descriptions = [f"- {get_task_description(task)} at {task.get('start_time', 'all day')}" for task in tasks_for_date]
-    tasks_str = "\n".join(task_descriptions)
-    try:
-        summary_prompt = (f"Here is a list of my tasks for {date_query}:\n{tasks_str}\n\n"
-                           f"Please write a brief, natural language summary of my day (in one or two sentences).")
-        response = st.session_state.summarizer_model.generate_content(summary_prompt)
-        return response.text.strip()
-    except Exception as e:
-        return f"I found your tasks but had trouble summarizing them: {e}"
-
 # Streamlit UI
 st.set_page_config(layout="wide", page_title="PulseVox Demo")
 st.title("PulseVox 🗣️✨ - Prototype Demo Interface")
 
 # Initialize the chat session and models (runs only once)
 initialize_state()
+task_file = get_session_task_file()
+archive_old_tasks_daily(task_file, datetime.now().date().isoformat())
+prune_history_spill_daily(datetime.now().date().isoformat())
+start_summary_prewarm(task_file)
+show_new_reminders(task_file)
+
+# Sidebar: engine health (process-wide counters)
+with st.sidebar:
+    st.subheader("Engine Stats")
+    repair_rate, failure_rate = parse_rates()
+    st.caption(f"Intent responses parsed: {intent_parse_stats['total']} · "
+               f"repaired locally: {repair_rate:.0%} · unusable: {failure_rate:.0%}")
+    st.caption(f"Summaries served from cache: {summary_cache_stats['hits']} · "
+               f"generated: {summary_cache_stats['misses']} · pre-generated: {summary_cache_stats['prewarmed']}")
+    queues = rate_limiter.queue_stats()
+    st.caption("LLM queue (waiting / shed / p95 wait): " + " · ".join(
+        f"{name} {q['depth']} / {q['shed']} / {q['wait_p95_ms'] or 0:.0f} ms" for name, q in queues.items()))
+    voices = {name: b for name, b in tts_router.tts_stats().items() if b["available"]}
+    st.caption("Speech (p50): " + (" · ".join(
+        f"{name} {b['p50_ms'] if b['p50_ms'] is not None else '–'} ms" + (" (benched)" if b["benched"] else "")
+        for name, b in voices.items()) or "no TTS engine installed"))
+
+@st.fragment(run_every=SCHEDULE_REFRESH_SECONDS)
+def schedule_panel(task_file):
+    """The schedule table. Reruns on its own every few seconds (not the whole page), so changes from
+    other sessions show up without a refresh; when nothing changed, the only data work is a feed
+    version check and the cached table is redrawn."""
+    import pandas as pd
+    try:
+        df = schedule_frame(task_file)
+    except Exception as e:
+        df = None
+        st.error(f"Error displaying tasks: {e}")
+        st.write("Raw task data:")
+        st.json(load_all_tasks(task_file)) # Display raw JSON if DataFrame fails
+
+    if df is not None and df.empty:
+        st.write("No tasks in your schedule yet.")
+    elif df is not None:
+        #  Filters (applied to the cached frame with vectorized masks)
+        filter_col1, filter_col2 = st.columns(2)
+        date_range = filter_col1.date_input("Date range", value=[], key="schedule_date_range")
+        statuses = sorted(df['status'].dropna().astype(str).unique())
+        selected_statuses = filter_col2.multiselect("Status", statuses, key="schedule_status_filter")
+
+        mask = pd.Series(True, index=df.index)
+        if len(date_range) == 2:
+            dates = df['date'].astype("string")
+            mask &= (dates >= date_range[0].isoformat()) & (dates <= date_range[1].isoformat())
+        elif len(date_range) == 1:
+            mask &= df['date'].astype("string") == date_range[0].isoformat()
+        if selected_statuses:
+            mask &= df['status'].astype("string").isin(selected_statuses)
+        filtered_df = df[mask]
+
+        #  Pagination: only the visible slice is rendered and sent to the browser
+        page_col1, page_col2 = st.columns(2)
+        page_size = page_col1.selectbox("Rows per page", SCHEDULE_PAGE_SIZES, key="schedule_page_size")
+        page_count = max(1, -(-len(filtered_df) // page_size))
+        page = page_col2.number_input("Page", min_value=1, max_value=page_count, value=1, step=1, key="schedule_page")
+        page = min(int(page), page_count)
+        first_row = (page - 1) * page_size
+        page_df = filtered_df.iloc[first_row:first_row + page_size]
+
+        st.dataframe(page_df, width='stretch', hide_index=True)
+        st.caption(f"Showing {first_row + 1 if len(page_df) else 0}–{first_row + len(page_df)} of {len(filtered_df)} tasks "
+                   f"({len(df)} in total), page {page} of {page_count}.")
 
 # Define the two-column layout
 col1, col2 = st.columns([1, 1.2]) # Adjust column width ratio if needed
@@ -375,114 +426,38 @@ with col1:
                     st.error("Chat session not initialized.")
                     st.stop() # Stop execution if chat session isn't ready
                 chat_session = st.session_state.chat_session
-                response = chat_session.send_message(command_to_process)
-                json_response_text = response.text.strip().lstrip("```json").rstrip("```").strip()
-                # Attempt to load JSON immediately to catch errors early
-                response_data = json.loads(json_response_text)
-
-                # 2. Add to history
-                if "history" not in st.session_state: st.session_state.history = []
-                st.session_state.history.append({
-                    "user": command_to_process,
-                    "json": json_response_text # Store the raw JSON string
-                })
+                response = send_chat_message(chat_session, command_to_process)
+                json_response_text = response.text.strip()
+                # Validate, repair and normalize locally to catch errors early
+                response_data = parse_intent_response(json_response_text)
+
+                # 2. Add to history (the parsed, normalized intent, so it's never re-parsed on a rerun)
+                st.session_state.history.append(command_to_process, data=response_data)
 
                 # 3. Handle the intent
-                intent = response_data.get("intent", "")
-                assistant_message = ""
-                all_tasks = load_all_tasks() # Load fresh task list
-
-                #  Intent Handling Logic 
-                if intent == "add_task":
-                    new_tasks = response_data.get("tasks", [])
-                    if not new_tasks:
-                        assistant_message = "I understood you wanted to add a task, but couldn't extract details."
-                    else:
-                        conflict_found = False; tasks_to_add = []
-                        for task in new_tasks:
-                            # Add metadata before checking conflicts
-                            task['timestamp'] = datetime.now().isoformat(); task['status'] = 'pending'
-                            conflicting_task = check_for_conflicts(task, all_tasks + tasks_to_add)
-                            if conflicting_task:
-                                conflict_desc = get_task_description(conflicting_task)
-                                new_task_desc = get_task_description(task)
-                                assistant_message = f"❌ **CONFLICT:** Can't add '{new_task_desc}', it conflicts with '{conflict_desc}'."
-                                conflict_found = True; break
-                            else:
-                                tasks_to_add.append(task)
-                        if not conflict_found and tasks_to_add:
-                            all_tasks.extend(tasks_to_add)
-                            if save_all_tasks(all_tasks):
-                                task_descs = " and ".join([f"'{get_task_description(t)}'" for t in tasks_to_add])
-                                assistant_message = f"✅ **Success:** Okay, adding {task_descs} to your list."
-                            else:
-                                assistant_message = "❌ **Error:** Failed to save updated task list."
-
-                elif intent == "remove_task":
-                    task_details = response_data.get("task_details")
-                    result_message = handle_task_removal(task_details, all_tasks) # Saves internally
-                    if "Okay, I've removed" in result_message:
-                         assistant_message = f"✅ **Success:** {result_message}"
-                    else:
-                         assistant_message = f"⚠️ {result_message}" # Use warning for failure
-
-                elif intent == "update_task":
-                    find_details = response_data.get("find_details")
-                    update_details = response_data.get("update_details")
-                    result_message = handle_task_update(find_details, update_details, all_tasks) # Saves internally
-                    if "Okay, I've updated" in result_message:
-                         assistant_message = f"✅ **Success:** {result_message}"
-                    else:
-                         assistant_message = f"⚠️ {result_message}" # Use warning for failure
-
-                elif intent == "summarize_schedule":
-                    date_query = response_data.get("date_query")
-                    if not date_query:
-                        assistant_message = "⚠️ I understood you wanted a summary, but I missed which day."
-                    else:
-                        summary = handle_web_summarization(date_query)
-                        assistant_message = f"🗓️ **Summary:** {summary}"
-
-                elif intent == "query_schedule":
-                    date_query = response_data.get("date_query")
-                    if not date_query:
-                        assistant_message = "⚠️ I understood you were asking about your schedule, but I missed which day."
-                    else:
-                        assistant_message = f"🗓️ **Schedule:** {handle_web_schedule_query(date_query)}"
-
-                elif intent == "query_specific_time":
-                    date_query = response_data.get("date_query")
-                    time_query = response_data.get("time_query")
-                    if not (date_query and time_query):
-                         assistant_message = "⚠️ I understood you were asking about a time, but I missed the date or time."
-                    else:
-                        assistant_message = f"🗓️ **Availability:** {handle_web_specific_time_query(date_query, time_query)}"
+                reply = run_intent(response_data, task_file, st.session_state.get("summarizer_model"))
+                assistant_message = f"{REPLY_ICONS[reply.status]} " + (f"**{reply.label}:** " if reply.label else "") + reply.text
 
-                else:
-                    # Handle cases where LLM gives JSON but no known intent
-                    assistant_message = f"❓ I received data but couldn't understand the intent: '{intent}'."
-                st.session_state.message_to_speak = assistant_message
-                    
                 # 4. Save assistant's reply and show message
-                if "history" in st.session_state and st.session_state.history:
-                    if assistant_message:
-                        st.session_state.history[-1]["assistant"] = assistant_message # Add assistant msg to last history entry
-
-                # Display message based on prefix or default to info
                 if assistant_message:
-                    if assistant_message.startswith("✅"): 
-                        st.success(assistant_message)
-                    elif assistant_message.startswith("🗓️"): 
-                        st.info(assistant_message)
-                    elif assistant_message.startswith("⚠️") or assistant_message.startswith("❓"): 
-                        st.warning(assistant_message)
-                    else: st.error(assistant_message) # Default to error if prefix missing or unknown
+                    st.session_state.history.set_reply(assistant_message) # Add assistant msg to last history entry
+
+                # Display message in the box that matches the reply's status
+                {"success": st.success, "info": st.info, "warning": st.warning}.get(reply.status, st.error)(assistant_message)
                 st.session_state.message_to_speak = assistant_message
                     
-            except json.JSONDecodeError:
+            except TaskStoreBusyError:
+                st.error("**Error:** Your schedule is being updated by another session. Please try again.")
+                st.session_state.message_to_speak = "Your schedule is busy being updated elsewhere. Please try again in a moment."
+
+            except LLMOverloaded:
+                st.warning("**Busy:** PulseVox is handling too many requests right now. Please try again in a moment.")
+                st.session_state.history.append(command_to_process, raw="N/A", assistant="Busy: try again in a moment.")
+                st.session_state.message_to_speak = "I'm handling too many requests right now. Please try again in a moment."
+
+            except IntentParseError:
                 st.error("**Error:** The LLM returned invalid JSON. Could not process.")
-                if "history" in st.session_state:
-                    st.session_state.history.append({"user": command_to_process, "json": json_response_text, "assistant": "Error: Invalid JSON."})
+                st.session_state.history.append(command_to_process, raw=json_response_text, assistant="Error: Invalid JSON.")
                 st.session_state.message_to_speak = "I encountered an error processing your command."
 
             except Exception as e:
@@ -490,9 +465,8 @@ with col1:
                 # Optionally log the full traceback for debugging
                 # import traceback
                 # st.error(traceback.format_exc())
-                if "history" in st.session_state:
-                    st.session_state.history.append({"user": command_to_process, "json": "N/A", "assistant": f"Error: {e}"})
-                    st.session_state.message_to_speak = "I encountered an error processing your command."
+                st.session_state.history.append(command_to_process, raw="N/A", assistant=f"Error: {e}")
+                st.session_state.message_to_speak = "I encountered an error processing your command."
 
             #  Rerun AFTER processing 
             st.rerun() # Refresh UI
@@ -505,50 +479,34 @@ with col1:
     #  History Display 
     st.subheader("Conversation & NLP Output")
 
-    if "history" in st.session_state and st.session_state.history:
-        for i, entry in enumerate(reversed(st.session_state.history)):
+    history = st.session_state.history
+    if len(history):
+        # Only the newest page(s) are built; older entries stay in the buffer (or on disk) until asked for
+        shown = st.session_state.get("history_shown", HISTORY_PAGE_SIZE)
+        for i, entry in enumerate(history.page(0, shown)):
             user_text = entry.get('user', 'Unknown Command')
             with st.expander(f"**You:** {user_text}", expanded=(i==0)):
                 st.markdown("**Assistant's Reply:**")
-                st.markdown(entry.get('assistant', '...')) # Use markdown for assistant reply
-                json_output = entry.get('json', '{}')
-                try:
+                st.markdown(entry.get('assistant') or '...') # Use markdown for assistant reply
+                if entry.get('data') is not None:
                     st.markdown("**NLP JSON Output:**")
-                    st.json(json.loads(json_output))
-                except json.JSONDecodeError:
-                     st.markdown("**NLP Raw Output:**")
-                     st.text(json_output)
+                    st.json(entry['data'])
+                else:
+                    st.markdown("**NLP Raw Output:**")
+                    st.text(entry.get('raw') or '')
+        if len(history) > shown:
+            if st.button(f"Load older ({len(history) - shown} more)", key="history_load_more"):
+                st.session_state.history_shown = shown + HISTORY_PAGE_SIZE
+                st.rerun()
 
 # Column 2: Live Task List 
 # Ensure this block only appears ONCE
 with col2:
-    st.header("Current Schedule (tasks.json)")
-
-    if st.button("Refresh List"):
-        st.rerun()
-
-    all_tasks = load_all_tasks()
-    if all_tasks:
-        try:
-            df = pd.DataFrame(all_tasks)
-
-            # Ensure apply uses a dict representation of the row
-            df['task_description'] = df.apply(lambda row: get_task_description(row.to_dict()), axis=1)
-
-            cols_to_show = ['task_description', 'category', 'date', 'start_time', 'end_time', 'status']
-            # Filter based on actual columns present in the DataFrame
-            display_cols = [col for col in cols_to_show if col in df.columns]
-
-            # Ensure 'task_description' is included if available
-            if 'task_description' in df.columns and 'task_description' not in display_cols:
-                display_cols.insert(0, 'task_description') # Add to beginning if missing
-
-            st.dataframe(df[display_cols], width='stretch', hide_index=True) # FIX: Use width='stretch'
-
-        except Exception as e:
-            st.error(f"Error displaying tasks: {e}")
-            st.write("Raw task data:")
-            st.json(all_tasks) # Display raw JSON if DataFrame fails
-    else:
-        st.write("No tasks in your schedule yet.")
-        
\ No newline at end of file
+    st.header(f"Current Schedule ({os.path.basename(task_file)})")
+    schedule_panel(task_file)
+
+    #  Agenda: the same tasks grouped by day over a range (date index + archive, no full scan).
+    #  Outside the fragment, so it's only rebuilt when the page reruns, not every few seconds.
+    with st.expander("Agenda"):
+        period = st.selectbox("Range", AGENDA_PERIODS, key="agenda_period")
+        st.markdown(agenda_reply(*agenda_range(period), task_file))
@@ -0,0 +1,78 @@
+# Latency of multi-day agenda queries over a large store.
+# Builds a store of --tasks tasks spread over three years, archives the past ones
+# as the app does, then times a 90-day agenda that spans archive and hot store:
+# a full scan of the store vs. get_tasks_for_range() (date index + archive
+# partitions), cold (index built from the file) and warm (file unchanged).
+#
+# Usage: python benchmarks/bench_agenda.py [--tasks 100000] [--days 90] [--budget-ms 100]
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import pulsevox
+from task_logic import group_by_date, task_sort_key
+
+
+def make_tasks(count, today):
+    rng = random.Random(7)
+    tasks = []
+    for i in range(count):
+        day = today + timedelta(days=rng.randint(-730, 365))
+        hour = rng.randint(7, 21)
+        tasks.append({"task_description": f"task {i}", "date": day.isoformat(), "start_time": f"{hour:02d}:00",
+                      "end_time": f"{hour:02d}:30", "category": rng.choice(["Work", "Personal"]), "status": "pending"})
+    return tasks
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings), result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-day agenda query latency.")
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--budget-ms", type=float, default=100)
+    args = parser.parse_args()
+
+    today = date.today()
+    start_date = (today - timedelta(days=args.days // 2)).isoformat()
+    end_date = (today + timedelta(days=args.days - args.days // 2 - 1)).isoformat()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        task_file = os.path.join(work_dir, "tasks.json")
+        pulsevox.save_all_tasks(make_tasks(args.tasks, today), task_file)
+        archived = pulsevox.archive_old_tasks(task_file)
+        hot_count = len(pulsevox.load_all_tasks(task_file))
+        print(f"{args.tasks} tasks: {archived} archived, {hot_count} in the hot store; "
+              f"agenda {start_date} .. {end_date}")
+
+        def full_scan():
+            all_tasks = pulsevox.load_all_tasks(task_file)
+            hot = [t for t in all_tasks if start_date <= t.get('date', '') <= end_date]
+            return group_by_date(sorted(hot + pulsevox.query_archive(pulsevox.archive_dir_for(task_file),
+                                                                     start_date, end_date), key=task_sort_key))
+
+        scan_ms, expected = best_of(full_scan, 3)
+        pulsevox._date_indexes.clear()
+        cold_ms, _ = best_of(lambda: pulsevox.get_tasks_for_range(start_date, end_date, task_file), 1)
+        warm_ms, tasks = best_of(lambda: group_by_date(pulsevox.get_tasks_for_range(start_date, end_date, task_file)), 20)
+
+        assert [(d, len(ts)) for d, ts in tasks] == [(d, len(ts)) for d, ts in expected], "agenda mismatch"
+        print(f"full scan            {scan_ms:8.1f} ms")
+        print(f"range query (cold)   {cold_ms:8.1f} ms  (builds the date index)")
+        print(f"range query (warm)   {warm_ms:8.1f} ms  ({sum(len(ts) for _, ts in tasks)} tasks on {len(tasks)} days)")
+        if warm_ms > args.budget_ms:
+            print(f"FAIL: warm agenda query over budget ({args.budget_ms:.0f} ms)")
+            sys.exit(1)
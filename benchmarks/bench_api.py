@@ -0,0 +1,205 @@
+# Load test for the HTTP API (api.py) against the local LLM stub.
+# Starts `uvicorn api:app` in a scratch directory with a pre-filled task store, then
+# runs --clients concurrent keep-alive connections for --seconds, each sending a mix
+# of text commands and schedule / availability / summary queries, and reports
+# requests per second and latency percentiles per endpoint. A final burst well past
+# the concurrency limit checks that overload is shed with 503 + Retry-After.
+#
+# The client speaks plain HTTP/1.1 over asyncio streams so nothing beyond the
+# app's own requirements is needed.
+#
+# Usage: python benchmarks/bench_api.py [--clients 32] [--seconds 10] [--tasks 2000] [--latency-ms 50]
+
+import os
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from datetime import date, timedelta
+from collections import defaultdict
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+from task_store import write_tasks
+
+COMMANDS = ["what do I have tomorrow", "am I free at 3pm", "find free time tomorrow",
+            "summarize my day", "show my agenda this week", "kal kya hai"]
+
+
+class Connection:
+    """One keep-alive HTTP/1.1 connection."""
+
+    def __init__(self, port):
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection("127.0.0.1", self.port)
+        payload = json.dumps(body).encode() if body is not None else b""
+        head = f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(payload)}\r\n"
+        if body is not None:
+            head += "Content-Type: application/json\r\n"
+        self.writer.write(head.encode() + b"\r\n" + payload)
+        await self.writer.drain()
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("server closed the connection")
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode().partition(":")
+            headers[name.strip().lower()] = value.strip()
+        content = await self.reader.readexactly(int(headers.get("content-length", 0)))
+        return int(status_line.split()[1]), headers, content
+
+    def close(self):
+        if self.writer:
+            self.writer.close()
+
+
+def next_request(rng, today):
+    """(label, method, path, body) for a weighted mix of endpoints."""
+    day = (today + timedelta(days=rng.randint(0, 13))).isoformat()
+    user = f"user{rng.randint(0, 7)}"
+    pick = rng.random()
+    if pick < 0.35:
+        return "command", "POST", "/v1/command", {"text": rng.choice(COMMANDS), "user": user}
+    if pick < 0.60:
+        return "schedule", "GET", f"/v1/schedule?date={day}&user={user}", None
+    if pick < 0.70:
+        end = (date.fromisoformat(day) + timedelta(days=6)).isoformat()
+        return "agenda", "GET", f"/v1/schedule?date={day}&end_date={end}&user={user}", None
+    if pick < 0.85:
+        return "availability", "GET", f"/v1/availability?date={day}&time={rng.randint(8, 20)}:00&user={user}", None
+    return "summary", "GET", f"/v1/summary?date={day}&user={user}", None
+
+
+async def client(port, seed, stop_at, results, today):
+    rng = random.Random(seed)
+    conn = Connection(port)
+    try:
+        while time.perf_counter() < stop_at:
+            label, method, path, body = next_request(rng, today)
+            started = time.perf_counter()
+            status, _, _ = await conn.request(method, path, body)
+            results[label].append(((time.perf_counter() - started) * 1000, status))
+    finally:
+        conn.close()
+
+
+async def load(port, clients, seconds, today):
+    """Runs every client until the deadline; returns {endpoint: [(ms, status), ...]}."""
+    results = defaultdict(list)
+    stop_at = time.perf_counter() + seconds
+    await asyncio.wait_for(asyncio.gather(*(client(port, seed, stop_at, results, today) for seed in range(clients))),
+                           seconds + 60)
+    return results
+
+
+async def burst(port, count):
+    """Fires `count` commands at once on separate connections; returns the status counts."""
+    async def one():
+        conn = Connection(port)
+        try:
+            status, headers, _ = await conn.request("POST", "/v1/command", {"text": "summarize my day"})
+            return status, headers.get("retry-after")
+        finally:
+            conn.close()
+
+    outcomes = await asyncio.gather(*(one() for _ in range(count)))
+    counts = defaultdict(int)
+    for status, retry_after in outcomes:
+        counts[f"{status}" + (f" (Retry-After {retry_after})" if retry_after else "")] += 1
+    return dict(counts)
+
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def report(label, samples, seconds):
+    latencies = sorted(ms for ms, _ in samples)
+    errors = sum(1 for _, status in samples if status >= 500)
+    print(f"{label:<13}{len(samples):>7}{len(samples) / seconds:>9.1f}{percentile(latencies, 0.5):>9.1f}"
+          f"{percentile(latencies, 0.95):>9.1f}{percentile(latencies, 0.99):>9.1f}{errors:>8}")
+
+
+def make_store(task_file, count, today):
+    rng = random.Random(2)
+    tasks = []
+    for i in range(count):
+        hour = rng.randint(7, 20)
+        tasks.append({"id": f"t{i}", "task_description": f"task {i}", "date": (today + timedelta(days=rng.randint(0, 29))).isoformat(),
+                      "start_time": f"{hour:02d}:00", "end_time": f"{hour:02d}:45", "status": "pending", "category": "Work"})
+    write_tasks(tasks, task_file)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(port, server, timeout=20):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit("uvicorn exited during startup")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise SystemExit("uvicorn did not start in time")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HTTP API throughput and latency against the LLM stub.")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--tasks", type=int, default=2000, help="tasks per user shard")
+    parser.add_argument("--latency-ms", type=float, default=50, help="stub LLM latency per request")
+    parser.add_argument("--max-concurrency", type=int, default=16)
+    parser.add_argument("--llm-rpm", type=float, default=0, help="LLM rate limit (0: off, to measure the API itself)")
+    args = parser.parse_args()
+    today = date.today()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        for user in range(8):
+            make_store(os.path.join(work_dir, "task_shards", f"user{user}.json"), args.tasks, today)
+        port = free_port()
+        env = dict(os.environ, PYTHONPATH=ROOT, PULSEVOX_LLM_BACKEND="stub", PULSEVOX_STUB_LATENCY_MS=str(args.latency_ms),
+                   PULSEVOX_API_MAX_CONCURRENCY=str(args.max_concurrency), PULSEVOX_API_MAX_QUEUE=str(args.clients * 2),
+                   PULSEVOX_LLM_RPM=str(args.llm_rpm))
+        server = subprocess.Popen([sys.executable, "-m", "uvicorn", "api:app", "--port", str(port), "--log-level", "warning"],
+                                  cwd=work_dir, env=env)
+        try:
+            wait_until_up(port, server)
+            started = time.perf_counter()
+            results = asyncio.run(load(port, args.clients, args.seconds, today))
+            elapsed = time.perf_counter() - started
+
+            print(f"{args.clients} clients, {elapsed:.1f} s, stub latency {args.latency_ms:.0f} ms, "
+                  f"max concurrency {args.max_concurrency}")
+            print(f"{'endpoint':<13}{'count':>7}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'5xx':>8}")
+            for label in sorted(results):
+                report(label, results[label], elapsed)
+            report("all", [sample for samples in results.values() for sample in samples], elapsed)
+
+            # Past concurrency + queue, the extra requests must be shed, not queued
+            shed = asyncio.run(burst(port, args.max_concurrency + args.clients * 2 + 50))
+            print(f"overload burst: {shed}")
+            conn = Connection(port)
+            status, _, body = asyncio.run(conn.request("GET", "/v1/stats"))
+            print(f"server stats: {json.loads(body)['api']}")
+        finally:
+            server.terminate()
+            server.wait(10)
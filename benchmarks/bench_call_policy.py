@@ -0,0 +1,70 @@
+# Tail latency and success rate of LLM calls with and without the call policy
+# (deadlines, jittered retries, hedging), against the fault-injecting local stub.
+#
+# Usage: python benchmarks/bench_call_policy.py [--requests 300] [--slow-rate 0.03] [--error-rate 0.05]
+
+import os
+import sys
+import time
+import argparse
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else float("nan")
+
+
+def run(label, call, requests, concurrency):
+    """Fires `requests` calls from `concurrency` threads; prints latency percentiles (ms) and failures."""
+    def timed(i):
+        started = time.perf_counter()
+        try:
+            call(f"add task {i} kal at 6pm")
+            ok = True
+        except Exception:
+            ok = False
+        return (time.perf_counter() - started) * 1000, ok
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(timed, range(requests)))
+    latencies = [ms for ms, _ in results]
+    failures = sum(1 for _, ok in results if not ok)
+    print(f"{label:<16} p50 {statistics.median(latencies):7.0f}  p95 {percentile(latencies, 0.95):7.0f}  "
+          f"p99 {percentile(latencies, 0.99):7.0f}  max {max(latencies):7.0f}  failed {failures}/{requests}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LLM call policy under injected faults.")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=400)
+    parser.add_argument("--slow-rate", type=float, default=0.03)
+    parser.add_argument("--slow-ms", type=float, default=4000)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    args = parser.parse_args()
+    os.environ.update({
+        "PULSEVOX_LLM_BACKEND": "stub", "PULSEVOX_STUB_CONNECT_MS": "0",
+        "PULSEVOX_STUB_LATENCY_MS": str(args.latency_ms), "PULSEVOX_STUB_SLOW_RATE": str(args.slow_rate),
+        "PULSEVOX_STUB_SLOW_MS": str(args.slow_ms), "PULSEVOX_STUB_ERROR_RATE": str(args.error_rate),
+        "PULSEVOX_LLM_RPM": "0",  # The stub has no quota here; bench_rate_limiter.py covers the limiter
+    })
+    import llm
+    import llm_policy
+
+    model = llm.create_intent_model()
+    print(f"stub: {args.latency_ms:.0f} ms requests, {args.slow_rate:.0%} slow ({args.slow_ms:.0f} ms), "
+          f"{args.error_rate:.0%} transient errors; latencies in ms")
+
+    run("no policy", lambda text: model.generate_content(text), args.requests, args.concurrency)
+
+    policy = llm_policy.CALL_POLICIES["intent"]
+    policy.hedge = False
+    run("retries only", lambda text: llm_policy.generate_with_policy(model, text, "intent"), args.requests, args.concurrency)
+
+    policy.hedge = True  # The previous round also warmed up the p95 estimate
+    run("retries + hedge", lambda text: llm_policy.generate_with_policy(model, text, "intent"), args.requests, args.concurrency)
+    print("policy counters:", llm_policy.policy_stats)
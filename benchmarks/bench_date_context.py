@@ -0,0 +1,67 @@
+# Input tokens and latency per chat turn for the intent model, before and after moving
+# the date out of the system prompt:
+#   before: the date baked into the system prompt, and the whole prompt sent every turn
+#   after:  the static prompt in a context cache, with a one-line date preamble per turn
+# The "billable" column is the input not served from the cache. Runs against the local
+# stub by default; with PULSEVOX_LLM_BACKEND=gemini and GEMINI_API_KEY set it measures
+# the real API (where the cache must clear the model's minimum size, or "after" falls
+# back to sending the prompt).
+#
+# Usage: python benchmarks/bench_date_context.py [--turns 8]
+
+import os
+import re
+import sys
+import time
+import argparse
+import statistics
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+COMMANDS = ["add call with mom kal at 6pm", "move it to 7", "what do I have tomorrow", "am I free at 3pm",
+            "parson subah meeting with the design team", "summarize my day", "find free time tomorrow",
+            "what's on this week"]
+
+
+def conversation(chat, turns):
+    """[(input tokens, cached tokens, ms)] for one chat of `turns` commands."""
+    from llm_policy import send_chat_message, usage_tokens
+    rows = []
+    for i in range(turns):
+        started = time.perf_counter()
+        response = send_chat_message(chat, COMMANDS[i % len(COMMANDS)])
+        rows.append((*usage_tokens(response), (time.perf_counter() - started) * 1000))
+    return rows
+
+
+def report(label, rows):
+    prompt, cached = sum(r[0] for r in rows), sum(r[1] for r in rows)
+    print(f"{label:<8}{prompt / len(rows):>12.0f}{cached / len(rows):>12.0f}{(prompt - cached) / len(rows):>12.0f}"
+          f"{statistics.median(r[2] for r in rows):>10.0f}{max(r[2] for r in rows):>10.0f}")
+    return prompt - cached
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-turn tokens and latency with the date in the prompt vs a preamble.")
+    parser.add_argument("--turns", type=int, default=8)
+    parser.add_argument("--chats", type=int, default=5)
+    args = parser.parse_args()
+    os.environ.setdefault("PULSEVOX_LLM_BACKEND", "stub")
+    os.environ.setdefault("PULSEVOX_STUB_CONNECT_MS", "0")
+    os.environ["PULSEVOX_LLM_RPM"] = "0"
+    import llm
+    from intent_schema import INTENT_RESPONSE_SCHEMA
+
+    generation_config = {"response_mime_type": "application/json", "response_schema": INTENT_RESPONSE_SCHEMA}
+    legacy_prompt = re.sub(r"^CONTEXT:.*$", f"CONTEXT: The current date is {datetime.now().strftime('%A, %B %d, %Y')}.",
+                           llm.system_prompt, count=1, flags=re.M)
+    before_model = llm._create_model(legacy_prompt, generation_config=generation_config)
+    after_model = llm.create_intent_model()
+    cached = after_model.use_context_cache()
+
+    print(f"backend {llm.LLM_BACKEND}, {args.chats} chats x {args.turns} turns; context cache {'in use' if cached else 'unavailable'}")
+    print(f"{'':<8}{'input/turn':>12}{'cached':>12}{'billable':>12}{'p50 ms':>10}{'max ms':>10}")
+    before = report("before", [row for _ in range(args.chats) for row in conversation(before_model.start_chat(history=[]), args.turns)])
+    after = report("after", [row for _ in range(args.chats) for row in conversation(after_model.start_chat(history=[]), args.turns)])
+    print(f"billable input tokens: {after / before:.0%} of before")
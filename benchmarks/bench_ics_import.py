@@ -0,0 +1,94 @@
+# Throughput of the streaming .ics import and export.
+# Writes a calendar with --events events (folded lines, time zones, all-day and
+# cancelled events, some overlaps), then measures: parsing alone and its peak
+# memory (should stay flat as the file grows), a full import with bulk conflict
+# detection against a pre-filled store, and exporting everything back out.
+#
+# Usage: python benchmarks/bench_ics_import.py [--events 100000] [--existing 10000]
+
+import os
+import sys
+import time
+import random
+import argparse
+import itertools
+import tempfile
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import pulsevox
+from ics_io import iter_ics_events, event_to_task
+
+
+def write_calendar(path, events, today):
+    rng = random.Random(11)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write("BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//bench//EN\r\n")
+        for i in range(events):
+            day = today + timedelta(days=rng.randint(-365, 365))
+            hour = rng.randint(6, 21)
+            f.write(f"BEGIN:VEVENT\r\nUID:bench-{i}@example.com\r\nDTSTAMP:20250101T000000Z\r\n")
+            kind = i % 20
+            if kind == 0:
+                f.write(f"DTSTART;VALUE=DATE:{day:%Y%m%d}\r\n")
+            elif kind == 1:
+                f.write(f"DTSTART;TZID=Europe/Berlin:{day:%Y%m%d}T{hour:02d}0000\r\nDURATION:PT45M\r\n")
+            else:
+                f.write(f"DTSTART:{day:%Y%m%d}T{hour:02d}{rng.choice(['00', '30'])}00\r\n"
+                        f"DTEND:{day:%Y%m%d}T{hour:02d}5900\r\n")
+            f.write(f"SUMMARY:Event {i}\\, with a description long enough that the writer had to fold th\r\n"
+                    f" is line over two\r\nCATEGORIES:{rng.choice(['Work', 'Personal', 'Meeting'])}\r\n")
+            if kind == 2:
+                f.write("STATUS:CANCELLED\r\n")
+            f.write("BEGIN:VALARM\r\nACTION:DISPLAY\r\nTRIGGER:-PT15M\r\nEND:VALARM\r\nEND:VEVENT\r\n")
+        f.write("END:VCALENDAR\r\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Streaming .ics import/export throughput.")
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--existing", type=int, default=10_000, help="tasks already in the store")
+    args = parser.parse_args()
+    today = date.today()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        ics_path = os.path.join(work_dir, "calendar.ics")
+        write_calendar(ics_path, args.events, today)
+        print(f"{args.events} events, {os.path.getsize(ics_path) / 2**20:.1f} MiB")
+
+        started = time.perf_counter()
+        with open(ics_path, encoding="utf-8", newline="") as f:
+            parsed = sum(1 for event in iter_ics_events(f) if event_to_task(event))
+        parse_seconds = time.perf_counter() - started
+        print(f"parse only      {parse_seconds:6.2f} s  {args.events / parse_seconds:9.0f} events/s  ({parsed} usable)")
+
+        # Peak parser memory after a few and after many events (traced separately: tracing is slow)
+        for count in (1_000, 20_000):
+            tracemalloc.start()
+            with open(ics_path, encoding="utf-8", newline="") as f:
+                for event in itertools.islice(iter_ics_events(f), count):
+                    event_to_task(event)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"  peak memory after {count:>6} events: {peak / 2**10:6.0f} KiB")
+
+        task_file = os.path.join(work_dir, "tasks.json")
+        rng = random.Random(3)
+        pulsevox.save_all_tasks([{"task_description": f"existing {i}", "date": (today + timedelta(days=rng.randint(0, 365))).isoformat(),
+                                  "start_time": "12:00", "end_time": "13:00", "status": "pending"}
+                                 for i in range(args.existing)], task_file)
+        started = time.perf_counter()
+        stats = pulsevox.import_ics(ics_path, task_file)
+        import_seconds = time.perf_counter() - started
+        print(f"import          {import_seconds:6.2f} s  {args.events / import_seconds:9.0f} events/s  "
+              f"imported {stats['imported']}, conflicts {stats['conflicts']}, unusable {stats['unusable']}")
+
+        started = time.perf_counter()
+        again = pulsevox.import_ics(ics_path, task_file)
+        print(f"re-import       {time.perf_counter() - started:6.2f} s  duplicates {again['duplicates']}, imported {again['imported']}")
+
+        started = time.perf_counter()
+        written = pulsevox.export_ics(os.path.join(work_dir, "export.ics"), task_file)
+        export_seconds = time.perf_counter() - started
+        print(f"export          {export_seconds:6.2f} s  {written / export_seconds:9.0f} events/s  ({written} events)")
@@ -0,0 +1,99 @@
+# Interactive latency while summaries and background jobs compete for one API key's quota.
+# The stub enforces a quota of --quota-rps requests per second (past it, requests fail with
+# "429"). A storm of summary and background threads runs flat out while a few users send
+# intent commands, first with the rate limiter off (everyone races for the quota and
+# retries on 429s), then with it on at a little under the quota. Reports intent latency
+# and failures, how many summaries were served or shed, the stub's 429 count, and the
+# limiter's queue metrics.
+#
+# Usage: python benchmarks/bench_rate_limiter.py [--quota-rps 20] [--seconds 10] [--summary-threads 12]
+
+import os
+import sys
+import time
+import argparse
+import threading
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else float("nan")
+
+
+def run(label, rpm, args):
+    import llm
+    import llm_stub
+    import llm_policy
+
+    llm_stub.quota = llm_stub.StubQuota(args.quota_rps)
+    llm_policy.rate_limiter = llm_policy.PriorityRateLimiter(rpm, args.burst)
+    for policy in llm_policy.CALL_POLICIES.values():
+        policy.latency = llm_policy.LatencyTracker()
+    intent_model, summarizer = llm.create_intent_model(), llm.create_summarizer_model()
+    stop_at = time.perf_counter() + args.seconds
+    intents, outcomes, lock = [], {"summary": 0, "summary_failed": 0, "background": 0, "background_failed": 0}, threading.Lock()
+
+    def user(i):
+        chat = intent_model.start_chat()
+        while time.perf_counter() < stop_at:
+            started = time.perf_counter()
+            try:
+                llm_policy.send_chat_message(chat, f"add task {i} kal at 6pm")
+                ok = True
+            except Exception:
+                ok = False
+            with lock:
+                intents.append(((time.perf_counter() - started) * 1000, ok))
+            time.sleep(args.think_ms / 1000)
+
+    def hog(call_type):
+        while time.perf_counter() < stop_at:
+            try:
+                llm_policy.generate_with_policy(summarizer, "Please write a brief summary of my day.", call_type)
+                outcome = call_type
+            except Exception:
+                outcome = f"{call_type}_failed"
+            with lock:
+                outcomes[outcome] += 1
+
+    threads = ([threading.Thread(target=user, args=(i,)) for i in range(args.users)]
+               + [threading.Thread(target=hog, args=("summary",)) for _ in range(args.summary_threads)]
+               + [threading.Thread(target=hog, args=("background",)) for _ in range(args.background_threads)])
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies = [ms for ms, _ in intents]
+    failed = sum(1 for _, ok in intents if not ok)
+    print(f"{label:<12} intents {len(intents):4d}  p50 {statistics.median(latencies):6.0f}  p95 {percentile(latencies, 0.95):6.0f}  "
+          f"max {max(latencies):6.0f} ms  failed {failed:3d} | summaries {outcomes['summary']:4d} ok {outcomes['summary_failed']:4d} failed | "
+          f"background {outcomes['background']:3d} ok {outcomes['background_failed']:4d} failed | 429s {llm_stub.quota.rejected}")
+    if rpm:
+        for name, queue in llm_policy.rate_limiter.queue_stats().items():
+            print(f"{'':<12} {name:<12} granted {queue['granted']:5d}  shed {queue['shed']:4d}  max depth {queue['max_depth']:3d}  "
+                  f"wait p50 {queue['wait_p50_ms'] or 0:7.1f}  p95 {queue['wait_p95_ms'] or 0:7.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Priority rate limiter vs a shared API quota.")
+    parser.add_argument("--quota-rps", type=int, default=20, help="requests per second the stub API key allows")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--users", type=int, default=4, help="threads sending intent commands")
+    parser.add_argument("--think-ms", type=float, default=300, help="pause between one user's commands")
+    parser.add_argument("--summary-threads", type=int, default=12)
+    parser.add_argument("--background-threads", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=100)
+    parser.add_argument("--burst", type=int, default=4)
+    args = parser.parse_args()
+    os.environ.update({"PULSEVOX_LLM_BACKEND": "stub", "PULSEVOX_STUB_CONNECT_MS": "0",
+                       "PULSEVOX_STUB_LATENCY_MS": str(args.latency_ms)})
+
+    print(f"stub quota {args.quota_rps} req/s, {args.latency_ms:.0f} ms requests; {args.users} users, "
+          f"{args.summary_threads} summary + {args.background_threads} background threads, {args.seconds:.0f} s each")
+    run("no limiter", 0, args)
+    # A little under the quota, since the bucket's burst comes on top of the steady rate
+    run("limiter", args.quota_rps * 60 * 0.9, args)
@@ -0,0 +1,91 @@
+# Reminder scheduler at scale.
+# Schedules --tasks pending reminders, then measures: the initial sync, a re-sync
+# after a few edits (incremental) vs. building a fresh scheduler, firing a day of
+# reminders on an injected clock, and the CPU an idle ReminderService uses while it
+# waits for a reminder that is hours away.
+#
+# Usage: python benchmarks/bench_reminders.py [--tasks 100000] [--edits 100] [--idle-seconds 5]
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import pulsevox
+from reminders import ReminderScheduler, ReminderService
+from store_feed import feed_for
+
+
+def make_tasks(count, start):
+    rng = random.Random(5)
+    tasks = []
+    for i in range(count):
+        when = start + timedelta(minutes=rng.randint(60, 365 * 24 * 60))
+        tasks.append({"id": f"task-{i}", "task_description": f"task {i}", "date": when.date().isoformat(),
+                      "start_time": when.strftime("%H:%M"), "end_time": when.strftime("%H:%M"), "status": "pending"})
+    return tasks
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - started) * 1000, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reminder scheduler throughput and idle cost.")
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--edits", type=int, default=100)
+    parser.add_argument("--idle-seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    now = datetime.now().replace(second=0, microsecond=0)
+    clock = [now.timestamp()]
+    fired = []
+    tasks = make_tasks(args.tasks, now)
+    scheduler = ReminderScheduler(fired.append, clock=lambda: clock[0], lead_minutes=0)
+
+    ms, _ = timed(lambda: scheduler.sync(tasks))
+    print(f"initial sync           {ms:8.1f} ms  ({len(scheduler)} reminders scheduled)")
+
+    # Fresh dicts for everything (as after reloading the file), with a few tasks moved or removed
+    rng = random.Random(9)
+    reloaded = [dict(task) for task in tasks]
+    for i in rng.sample(range(len(reloaded)), args.edits):
+        reloaded[i]["start_time"] = "23:59"
+    reloaded.pop()
+    ms, changes = timed(lambda: scheduler.sync(reloaded))
+    print(f"re-sync after edits    {ms:8.1f} ms  ({changes} heap changes)")
+    ms, _ = timed(lambda: ReminderScheduler(fired.append, clock=lambda: clock[0], lead_minutes=0).sync(reloaded))
+    print(f"rebuild from scratch   {ms:8.1f} ms")
+
+    # Advance the injected clock one day, firing minute by minute
+    def start_of(task):
+        return datetime.strptime(f"{task['date']} {task['start_time']}", "%Y-%m-%d %H:%M").timestamp()
+
+    expected = sorted(due for due in map(start_of, reloaded) if due <= clock[0] + 24 * 3600)
+    started = time.perf_counter()
+    for minute in range(24 * 60):
+        clock[0] += 60
+        scheduler.run_pending()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    assert [start_of(task) for task in fired] == expected, "reminders fired out of order or missing"
+    print(f"one simulated day      {elapsed_ms:8.1f} ms  ({len(fired)} reminders fired in order)")
+
+    # Idle cost: a real service on a real store with nothing due for at least an hour
+    with tempfile.TemporaryDirectory() as work_dir:
+        task_file = os.path.join(work_dir, "tasks.json")
+        pulsevox.save_all_tasks(make_tasks(args.tasks, now), task_file)
+        service = ReminderService(feed_for(task_file), lambda task: None).start()
+        time.sleep(2)  # Let it load and schedule the store
+        cpu_before, wall_before = time.process_time(), time.perf_counter()
+        time.sleep(args.idle_seconds)
+        cpu = time.process_time() - cpu_before
+        wall = time.perf_counter() - wall_before
+        service.stop()
+        print(f"idle service CPU       {cpu * 1000:8.1f} ms over {wall:.1f} s ({cpu / wall:.3%}) "
+              f"with {len(service.scheduler)} reminders pending")
@@ -0,0 +1,75 @@
+# First-command latency and per-session memory: models built for every session vs the
+# process-wide SharedModels. Runs against the local stub (llm_stub.py), whose models all
+# send over one shared client, like the SDK's default client; that client pays a
+# connection setup (TCP + TLS handshake) on its first request. Each side starts from a
+# fresh client: per-session models leave the handshake to the first user's command,
+# SharedModels pays it in warm_up() at server start.
+#
+# Usage: python benchmarks/bench_shared_models.py [--sessions 20] [--connect-ms 300] [--latency-ms 50]
+
+import os
+import sys
+import time
+import argparse
+import statistics
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+def per_session_models():
+    """What initialize_state() used to do: two new models and a chat for every browser session."""
+    import llm
+    return {"chat_session": llm.create_intent_model().start_chat(history=[]),
+            "summarizer_model": llm.create_summarizer_model()}
+
+
+def shared_session(models):
+    return {"chat_session": models.start_chat(), "summarizer_model": models.summarizer_model()}
+
+
+def measure(make_session, sessions):
+    """Returns (first-command latencies in ms, bytes allocated per session)."""
+    from llm_policy import send_chat_message
+    latencies, sizes, kept = [], [], []
+    for _ in range(sessions):
+        tracemalloc.start()
+        session = make_session()
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        started = time.perf_counter()
+        send_chat_message(session["chat_session"], "add call mom kal at 6pm")
+        latencies.append((time.perf_counter() - started) * 1000)
+        sizes.append(size)
+        kept.append(session)  # Sessions stay alive, like open browser tabs
+    return latencies, sizes
+
+
+def fresh_client():
+    """Drops the stub's process-wide client, so the next request pays the handshake again."""
+    import llm_stub
+    llm_stub._default_client = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-session models vs the process-wide SharedModels.")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--connect-ms", type=float, default=300)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    args = parser.parse_args()
+    os.environ.update({"PULSEVOX_LLM_BACKEND": "stub", "PULSEVOX_LLM_KEEPALIVE_SECONDS": "0", "PULSEVOX_LLM_RPM": "0",
+                       "PULSEVOX_STUB_CONNECT_MS": str(args.connect_ms), "PULSEVOX_STUB_LATENCY_MS": str(args.latency_ms)})
+    import llm
+
+    fresh_client()
+    results = {"per-session models": measure(per_session_models, args.sessions)}
+    fresh_client()
+    models = llm.SharedModels()
+    models.warm_up(background=False)  # Done once at server start
+    results["shared models"] = measure(lambda: shared_session(models), args.sessions)
+
+    print(f"{args.sessions} sessions, stub connect {args.connect_ms:.0f} ms, request {args.latency_ms:.0f} ms")
+    print(f"{'':<20} {'first cmd p50':>14} {'first cmd max':>14} {'KiB/session':>12}")
+    for name, (latencies, sizes) in results.items():
+        print(f"{name:<20} {statistics.median(latencies):>11.1f} ms {max(latencies):>11.1f} ms "
+              f"{statistics.mean(sizes) / 1024:>12.1f}")
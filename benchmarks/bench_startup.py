@@ -0,0 +1,69 @@
+# Cold-start budget check for the PulseVox modules.
+# Runs `python -X importtime -c "import <module>"` in a fresh interpreter for each
+# module, reports the cumulative import time and the heaviest imports, and fails
+# if a module goes over its budget or eagerly pulls in a heavy dependency.
+#
+# Usage: python benchmarks/bench_startup.py [--runs 5]
+
+import os
+import sys
+import argparse
+import subprocess
+import statistics
+
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Cumulative import time allowed per module, in milliseconds (median of the runs)
+IMPORT_BUDGETS_MS = {
+    "pulsevox": 100,
+    "task_logic": 30,
+    "task_store": 30,
+    "llm": 30,
+}
+
+# Must only be imported when actually used
+LAZY_DEPENDENCIES = ["google.generativeai", "speech_recognition", "gtts", "rich", "dotenv", "numpy", "pandas", "pydub"]
+
+
+def profile_import(module):
+    """Imports a module in a fresh interpreter; returns {imported module: cumulative microseconds}."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=REPO_DIR, capture_output=True, text=True, check=True)
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if name.strip() == "site":
+            timings = {}  # Everything before this is interpreter startup, not our import
+            continue
+        timings[name.strip()] = int(cumulative)
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold-start budget check for the PulseVox modules.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5, help="Heaviest imports to list per module")
+    args = parser.parse_args()
+
+    failures = []
+    for module, budget_ms in IMPORT_BUDGETS_MS.items():
+        runs = [profile_import(module) for _ in range(args.runs)]
+        median_ms = statistics.median(run[module] for run in runs) / 1000
+        status = "ok" if median_ms <= budget_ms else "OVER BUDGET"
+        print(f"{module:<12} {median_ms:7.1f} ms  (budget {budget_ms} ms)  {status}")
+        if median_ms > budget_ms:
+            failures.append(f"{module} took {median_ms:.1f} ms (budget {budget_ms} ms)")
+
+        heaviest = sorted((t, name) for name, t in runs[-1].items() if name != module)[-args.top:]
+        for t, name in reversed(heaviest):
+            print(f"    {t / 1000:7.1f} ms  {name}")
+
+        eager = [dep for dep in LAZY_DEPENDENCIES if dep in runs[-1]]
+        if eager:
+            failures.append(f"{module} eagerly imports {', '.join(eager)}")
+
+    if failures:
+        print("\nStartup regression:\n  " + "\n  ".join(failures))
+        sys.exit(1)
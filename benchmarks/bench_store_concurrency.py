@@ -0,0 +1,60 @@
+# Concurrency check for the sharded task store.
+# Runs many simultaneous "sessions" (processes) that each add tasks with the same
+# load-modify-save cycle the intent handlers use, then verifies no update was lost
+# and reports throughput for different shard counts.
+#
+# Usage: python benchmarks/bench_store_concurrency.py [--sessions 16] [--ops 25]
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+from multiprocessing import Pool
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import task_store
+from task_store import task_file_for, task_transaction, read_tasks, write_tasks
+
+
+def run_session(args):
+    """One simulated user session: repeatedly adds a task to its shard."""
+    work_dir, session_id, shard_count, ops = args
+    os.chdir(work_dir)
+    task_file = task_file_for(f"tenant-{session_id % shard_count}")
+    for i in range(ops):
+        with task_transaction(task_file):
+            all_tasks = read_tasks(task_file)
+            all_tasks.append({"task_description": f"session {session_id} task {i}", "date": "2025-01-01",
+                              "start_time": "09:00", "end_time": "09:30", "status": "pending"})
+            write_tasks(all_tasks, task_file)
+    return ops
+
+
+def run_round(sessions, shard_count, ops):
+    """Runs all sessions against `shard_count` shards and returns (seconds, stored, expected)."""
+    with tempfile.TemporaryDirectory() as work_dir:
+        started = time.perf_counter()
+        with Pool(sessions) as pool:
+            expected = sum(pool.map(run_session, [(work_dir, s, shard_count, ops) for s in range(sessions)]))
+        elapsed = time.perf_counter() - started
+        stored = sum(len(read_tasks(os.path.join(work_dir, task_file_for(f"tenant-{shard}"))))
+                     for shard in range(shard_count))
+    return elapsed, stored, expected
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrency check for the sharded task store.")
+    parser.add_argument("--sessions", type=int, default=16)
+    parser.add_argument("--ops", type=int, default=25, help="Tasks added per session")
+    args = parser.parse_args()
+
+    print(f"{args.sessions} sessions x {args.ops} adds (shard dir: {task_store.TASK_SHARD_DIR}/)")
+    print(f"{'shards':>6} {'seconds':>8} {'adds/s':>8} {'stored':>8} {'lost':>5}")
+    lost_any = False
+    for shard_count in (1, 2, 4, 8, 16):
+        if shard_count > args.sessions: break
+        elapsed, stored, expected = run_round(args.sessions, shard_count, args.ops)
+        lost_any |= stored != expected
+        print(f"{shard_count:>6} {elapsed:>8.2f} {expected / elapsed:>8.0f} {stored:>8} {expected - stored:>5}")
+    sys.exit(1 if lost_any else 0)
@@ -0,0 +1,137 @@
+# Cost of keeping readers current as the store changes, and how fast external edits are seen.
+# Builds a store of --tasks tasks, then for --edits single-task edits compares:
+#   reload: what readers did before the change feed (parse the file, rebuild the date
+#           index, re-sync the reminder scheduler), and
+#   feed:   an in-process save published to the feed, with the date index and the
+#           scheduler applying only the delta.
+# Then rewrites the file from outside write_tasks() (like another process would) and
+# measures how long the feed takes to report it, with file-system events and with polling.
+#
+# Usage: python benchmarks/bench_store_feed.py [--tasks 20000] [--edits 20]
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import statistics
+import threading
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from task_store import read_tasks, write_tasks
+from task_logic import TaskDateIndex, task_sort_key
+from reminders import ReminderScheduler
+from store_feed import StoreFeed, StoreWatcher, feed_for
+
+
+def make_tasks(count, start):
+    rng = random.Random(4)
+    return [{"id": f"task-{i}", "task_description": f"task {i}", "date": (start + timedelta(days=rng.randint(0, 365))).isoformat(),
+             "start_time": f"{rng.randint(7, 20):02d}:00", "end_time": f"{rng.randint(7, 20):02d}:45", "status": "pending"}
+            for i in range(count)]
+
+
+def edit(tasks, rng):
+    """Moves one random task to another day, as an update command would."""
+    task = dict(tasks[rng.randrange(len(tasks))])
+    task["date"] = (date.fromisoformat(task["date"]) + timedelta(days=1)).isoformat()
+    return [task if t["id"] == task["id"] else t for t in tasks]
+
+
+def write_externally(tasks, task_file):
+    """Replaces the file without going through write_tasks(), so no feed is told about it."""
+    temp_file = task_file + ".ext.tmp"
+    with open(temp_file, "w") as f:
+        json.dump(tasks, f)
+    os.replace(temp_file, task_file)
+
+
+def detection_latency(task_file, tasks, mode, rounds=10):
+    """Milliseconds from an external replace of the file until the feed has re-read it and reported the change."""
+    feed = StoreFeed(task_file)
+    feed.refresh()
+    seen = threading.Event()
+    feed.add_listener(lambda event: seen.set())
+    watcher = StoreWatcher(feed)
+    if mode == "poll":
+        watcher._watch_events = lambda: False
+    watcher.start()
+    latencies, rng = [], random.Random(8)
+    for _ in range(rounds):
+        tasks = edit(tasks, rng)
+        seen.clear()
+        write_externally(tasks, task_file)
+        started = time.perf_counter()
+        if seen.wait(5):
+            latencies.append((time.perf_counter() - started) * 1000)
+    watcher.stop()
+    return watcher.mode, latencies
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Change feed vs full reloads.")
+    parser.add_argument("--tasks", type=int, default=20_000)
+    parser.add_argument("--edits", type=int, default=20)
+    args = parser.parse_args()
+    today = date.today()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        task_file = os.path.join(work_dir, "tasks.json")
+        tasks = make_tasks(args.tasks, today)
+        write_tasks(tasks, task_file)
+        rng = random.Random(1)
+
+        # Readers reloading everything after each save
+        scheduler = ReminderScheduler(lambda task: None)
+        scheduler.sync(read_tasks(task_file))
+        reload_ms, save_ms = [], []
+        for _ in range(args.edits):
+            tasks = edit(tasks, rng)
+            started = time.perf_counter()
+            write_tasks(tasks, task_file)
+            save_ms.append((time.perf_counter() - started) * 1000)
+            started = time.perf_counter()
+            reloaded = read_tasks(task_file)
+            index = TaskDateIndex(reloaded)
+            scheduler.sync(reloaded)
+            reload_ms.append((time.perf_counter() - started) * 1000)
+
+        # Readers applying the feed's deltas (the save publishes the list it wrote)
+        feed = feed_for(task_file)
+        feed.refresh()
+        index = TaskDateIndex(feed.keyed())
+        scheduler = ReminderScheduler(lambda task: None)
+        scheduler.sync(feed.keyed())
+        version, publish_ms, apply_ms = feed.version, [], []
+        for _ in range(args.edits):
+            tasks = edit(tasks, rng)
+            started = time.perf_counter()
+            write_tasks(tasks, task_file)
+            write_ms = (time.perf_counter() - started) * 1000
+            started = time.perf_counter()
+            version, upserts, removed = feed.changes_since(version)
+            index.apply(upserts, removed)
+            scheduler.apply(upserts, removed)
+            apply_ms.append((time.perf_counter() - started) * 1000)
+            publish_ms.append(write_ms)
+
+        def rows(ordered):
+            return sorted((t["date"], t["start_time"], t["id"]) for t in ordered)
+        # Same tasks, still in (date, start_time) order; ties may sit in a different order than a fresh sort
+        assert rows(index.between("0000", "9999")) == rows(read_tasks(task_file)), "index drifted from the store"
+        assert [task_sort_key(t) for t in index.tasks] == sorted(task_sort_key(t) for t in index.tasks)
+
+        print(f"{args.tasks} tasks, {args.edits} single-task edits")
+        print(f"reload readers per edit      {statistics.median(reload_ms):8.2f} ms  (parse + index rebuild + scheduler sync)")
+        print(f"apply feed delta per edit    {statistics.median(apply_ms):8.2f} ms  (index + scheduler)")
+        print(f"save without a feed          {statistics.median(save_ms):8.2f} ms")
+        print(f"save publishing to the feed  {statistics.median(publish_ms):8.2f} ms  (the diff is paid once, by the writer)")
+
+        for mode in ("events", "poll"):
+            mode, latencies = detection_latency(task_file, tasks, mode)
+            if latencies:
+                print(f"external edit seen ({mode:<6})  {statistics.median(latencies):8.1f} ms median, "
+                      f"{max(latencies):.1f} ms max  ({len(latencies)} edits)")
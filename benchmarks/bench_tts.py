@@ -0,0 +1,76 @@
+# Time to first audio and to the whole reply for each text-to-speech backend, then which
+# backend the router ends up using. Backends that aren't installed (or, for gTTS, can't
+# reach the network) are reported as such and skipped.
+#
+# Usage: python benchmarks/bench_tts.py [--rounds 5] [--backends gtts,espeak,pyttsx3]
+
+import os
+import sys
+import time
+import argparse
+import statistics
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from tts import BACKEND_TYPES, TTSRouter, TTSError
+
+REPLIES = [
+    "Okay, adding 'gym' to your list.",
+    "You have 3 tasks tomorrow: standup at 09:00, lunch with Priya at 13:00 and gym at 18:00.",
+    "You have a fairly relaxed day with a few tasks spread out. Your first meeting is at ten, "
+    "and the evening is free after the call with the design team at five thirty.",
+]
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def measure(backend, text):
+    """(ms to the first audio chunk, ms to the whole reply, bytes)."""
+    started = time.perf_counter()
+    first, size = None, 0
+    for chunk in backend.stream(text):
+        if first is None:
+            first = (time.perf_counter() - started) * 1000
+        size += len(chunk)
+    return first, (time.perf_counter() - started) * 1000, size
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Text-to-speech backends: time to first audio.")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--backends", default=",".join(BACKEND_TYPES))
+    args = parser.parse_args()
+    backends = [BACKEND_TYPES[name]() for name in args.backends.split(",")]
+
+    print(f"{len(REPLIES)} replies ({', '.join(str(len(r)) for r in REPLIES)} chars) x {args.rounds} rounds; times in ms")
+    print(f"{'backend':<9}{'first p50':>11}{'first p95':>11}{'whole p50':>11}{'whole p95':>11}{'KB/reply':>10}")
+    for backend in backends:
+        if not backend.available():
+            print(f"{backend.name:<9}  not installed")
+            continue
+        try:
+            measure(backend, "Warming up.")  # Imports, engine start-up, first connection
+            samples = [measure(backend, text) for _ in range(args.rounds) for text in REPLIES]
+        except Exception as e:
+            print(f"{backend.name:<9}  failed: {e}")
+            continue
+        firsts, wholes = [s[0] for s in samples], [s[1] for s in samples]
+        print(f"{backend.name:<9}{statistics.median(firsts):>11.0f}{percentile(firsts, 0.95):>11.0f}"
+              f"{statistics.median(wholes):>11.0f}{percentile(wholes, 0.95):>11.0f}"
+              f"{statistics.mean(s[2] for s in samples) / 1024:>10.1f}")
+
+    # The router in front of the same backends: which one served each reply, and how long it took
+    router = TTSRouter(backends)
+    served, latencies = Counter(), []
+    for _ in range(args.rounds):
+        for text in REPLIES:
+            started = time.perf_counter()
+            try:
+                served[router.synthesize(text).backend] += 1
+            except TTSError:
+                served["no audio"] += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+    print(f"router: served by {dict(served)}, p50 {statistics.median(latencies):.0f} ms, p95 {percentile(latencies, 0.95):.0f} ms")
@@ -0,0 +1,118 @@
+# Bounded conversation history for the web app.
+#
+# Entries keep the intent as parsed data (never re-parsed on a rerun) and live in a
+# ring buffer, so a session's memory stays the same however long it runs. Entries
+# pushed out of the buffer are appended to a JSON-lines file when a spill directory
+# is configured (PULSEVOX_HISTORY_SPILL_DIR) and read back, newest first, when the
+# user asks for older history; otherwise they are dropped. A session's spill file is
+# deleted when its history is garbage-collected (the session ended), and files left
+# behind by a server that stopped uncleanly are pruned once they go stale.
+
+import os
+import json
+import time
+import weakref
+from collections import deque
+
+HISTORY_MAXLEN = int(os.getenv("PULSEVOX_HISTORY_MAXLEN", "50"))
+HISTORY_SPILL_DIR = os.getenv("PULSEVOX_HISTORY_SPILL_DIR", "")
+# Spill files untouched for this long belong to sessions that are gone
+HISTORY_SPILL_MAX_AGE_HOURS = float(os.getenv("PULSEVOX_HISTORY_SPILL_MAX_AGE_HOURS", "24"))
+_READ_BLOCK_BYTES = 64 * 1024
+
+
+def _read_lines_backwards(path, skip, count):
+    """Returns up to `count` lines from the end of a file, after skipping `skip` lines, newest first.
+
+    Reads fixed-size blocks from the end, so the cost depends on how far back you
+    go, not on how big the file has grown."""
+    lines, wanted = [], skip + count
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position, partial = f.tell(), b""
+        while position > 0 and len(lines) < wanted:
+            step = min(_READ_BLOCK_BYTES, position)
+            position -= step
+            f.seek(position)
+            chunks = (f.read(step) + partial).split(b"\n")
+            partial = chunks.pop(0)  # May continue in the previous block
+            lines.extend(line for line in reversed(chunks) if line)
+        if position == 0 and partial and len(lines) < wanted:
+            lines.append(partial)
+    return [line.decode("utf-8") for line in lines[skip:wanted]]
+
+
+def _remove_spill_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass  # Never written, or already pruned
+
+
+class ConversationHistory:
+    def __init__(self, maxlen=HISTORY_MAXLEN, spill_path=None):
+        self._entries = deque(maxlen=maxlen)
+        self.spill_path = spill_path
+        self.spilled = 0
+        if spill_path:
+            weakref.finalize(self, _remove_spill_file, spill_path)
+
+    def __len__(self):
+        return len(self._entries) + self.spilled
+
+    def append(self, user, data=None, raw=None, assistant=None):
+        """Adds an entry: `data` is the parsed intent, `raw` the model text when it couldn't be parsed."""
+        if len(self._entries) == self._entries.maxlen:
+            self._spill(self._entries[0])
+        entry = {"user": user, "data": data, "raw": raw, "assistant": assistant}
+        self._entries.append(entry)
+        return entry
+
+    def set_reply(self, assistant):
+        """Sets the assistant's reply on the newest entry."""
+        if self._entries:
+            self._entries[-1]["assistant"] = assistant
+
+    def _spill(self, entry):
+        if not self.spill_path:
+            return  # No spill file: the oldest entry is dropped
+        try:
+            os.makedirs(os.path.dirname(self.spill_path) or ".", exist_ok=True)
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+            self.spilled += 1
+        except OSError:
+            pass  # Losing old history is better than failing the command
+
+    def page(self, start, count):
+        """Entries newest first, from position `start` (0 = newest) up to `count` of them."""
+        in_memory = len(self._entries)
+        entries = [self._entries[in_memory - 1 - i] for i in range(start, min(start + count, in_memory))]
+        if len(entries) < count and self.spilled:
+            skip = max(0, start - in_memory)
+            try:
+                entries += [json.loads(line) for line in
+                            _read_lines_backwards(self.spill_path, skip, count - len(entries))]
+            except (OSError, ValueError):
+                pass
+        return entries
+
+
+def spill_path_for(session_id):
+    """The spill file for a browser session, or None when spilling is turned off."""
+    return os.path.join(HISTORY_SPILL_DIR, f"{session_id}.jsonl") if HISTORY_SPILL_DIR else None
+
+
+def prune_spill_files(spill_dir=HISTORY_SPILL_DIR, max_age_hours=HISTORY_SPILL_MAX_AGE_HOURS):
+    """Deletes spill files not written to for max_age_hours. Returns how many were removed."""
+    if not spill_dir or not os.path.isdir(spill_dir):
+        return 0
+    cutoff, removed = time.time() - max_age_hours * 3600, 0
+    for entry in os.scandir(spill_dir):
+        try:
+            if entry.name.endswith(".jsonl") and entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except OSError:
+            pass  # Removed by another process in the meantime
+    return removed
@@ -0,0 +1,252 @@
+# Intent execution shared by the web app and the HTTP API.
+#
+# Every handler here returns text instead of speaking or rendering it, and run_intent()
+# dispatches a parsed intent to them, so front ends only decide how to show the reply.
+# (The CLI in pulsevox.py keeps its own spoken variants.)
+
+import io
+from collections import namedtuple
+from datetime import datetime
+
+from task_store import task_transaction
+from pulsevox import (
+    TASK_FILE,
+    load_all_tasks,
+    save_all_tasks,
+    get_tasks_for_date,
+    get_tasks_for_range,
+    handle_task_removal,
+    handle_task_update,
+    summarize_range,
+)
+from summary_cache import get_summary
+from task_logic import (
+    get_task_description,
+    check_for_conflicts,
+    build_free_slot_response,
+    build_agenda_markdown,
+    new_task_id,
+)
+
+class TranscriptionError(Exception):
+    """Raised when uploaded audio can't be converted or the speech service fails."""
+
+
+# status: 'success' | 'info' | 'warning' | 'error'; label: short heading for the reply, or None
+Reply = namedtuple("Reply", ["status", "label", "text"])
+
+def schedule_reply(date_query, task_file=None):
+    """Describes a day's tasks in chronological order."""
+    all_tasks = load_all_tasks(task_file)
+    tasks_for_date = get_tasks_for_date(date_query, task_file, all_tasks)
+    if not all_tasks and not tasks_for_date: 
+        return "You don't have any tasks saved yet."
+    if not tasks_for_date: 
+        return f"You have nothing scheduled for {date_query}."
+    tasks_for_date.sort(key=lambda x: datetime.strptime(x.get('start_time', '00:00'), "%H:%M"))
+    task_descriptions = []
+    for task in tasks_for_date:
+        desc = get_task_description(task)
+        start_time_str = task.get('start_time'); end_time_str = task.get('end_time')
+        if start_time_str and end_time_str:
+            try:
+                start_obj = datetime.strptime(start_time_str, "%H:%M")
+                end_obj = datetime.strptime(end_time_str, "%H:%M")
+                start_natural = start_obj.strftime("%I:%M %p").lstrip('0')
+                end_natural = end_obj.strftime("%I:%M %p").lstrip('0')
+                if (end_obj - start_obj).total_seconds() > 60: # Use total_seconds() for reliability
+                    desc += f" from {start_natural} to {end_natural}"
+                else:
+                    desc += f" at {start_natural}"
+            except ValueError: desc += f" at {start_time_str}"
+        task_descriptions.append(desc)
+    if len(tasks_for_date) == 1:
+        return f"For {date_query}, you have one task: {task_descriptions[0]}."
+    else:
+        # Handle cases with 2 tasks correctly
+        if len(task_descriptions) == 2:
+             joined_tasks = f"{task_descriptions[0]} and {task_descriptions[1]}"
+        elif len(task_descriptions) > 2:
+             joined_tasks = ", ".join(task_descriptions[:-1]) + f", and {task_descriptions[-1]}"
+        else: # Should not happen if tasks_for_date is not empty, but good fallback
+             joined_tasks = task_descriptions[0] if task_descriptions else "nothing"
+        return f"For {date_query}, you have {len(tasks_for_date)} tasks: {joined_tasks}."
+
+def specific_time_reply(date_query, time_query, task_file=None):
+    """Says whether a time is taken, and by what."""
+    all_tasks = load_all_tasks(task_file)
+    tasks_for_date = get_tasks_for_date(date_query, task_file, all_tasks)
+    if not all_tasks and not tasks_for_date: 
+        return "You don't have any tasks saved yet."
+    try:
+        time_format = "%H:%M"; query_time = datetime.strptime(time_query, time_format).time()
+    except ValueError: 
+        return f"Sorry, I didn't understand the time {time_query}."
+    found_task = None
+    for task in tasks_for_date:
+        # Check date and ensure time keys exist before parsing
+        if task.get("date") == date_query and all(k in task for k in ["start_time", "end_time"]):
+            try:
+                start_time = datetime.strptime(task["start_time"], time_format).time()
+                end_time = datetime.strptime(task["end_time"], time_format).time()
+                # Check for overlap: query time is within [start_time, end_time)
+                if start_time <= query_time < end_time:
+                    found_task = task; break
+            except ValueError: 
+                continue # Ignore tasks with invalid time format
+    if found_task:
+        task_desc = get_task_description(found_task)
+        start_str = datetime.strptime(found_task['start_time'], time_format).strftime("%I:%M %p").lstrip('0')
+        end_str = datetime.strptime(found_task['end_time'], time_format).strftime("%I:%M %p").lstrip('0')
+        return f"Yes, at that time, you have '{task_desc}' scheduled from {start_str} to {end_str}."
+    else:
+        natural_query_time = datetime.strptime(time_query, time_format).strftime("%I:%M %p").lstrip('0')
+        return f"You appear to be free at {natural_query_time} on {date_query}."
+
+def free_slot_reply(date_query, end_date_query=None, min_duration_minutes=0, task_file=None):
+    """Lists the free intervals of a day or range."""
+    all_tasks = load_all_tasks(task_file)
+    return build_free_slot_response(all_tasks, date_query, end_date_query, min_duration_minutes)
+
+def summary_reply(date_query, summarizer_model, task_file=None):
+    """A day's summary from the summarizer model (cached per date until that day's tasks change)."""
+    if summarizer_model is None:
+        return "Summarizer model not initialized."
+
+    all_tasks = load_all_tasks(task_file)
+    tasks_for_date = get_tasks_for_date(date_query, task_file, all_tasks)
+    if not all_tasks and not tasks_for_date: 
+        return "You don't have any tasks saved yet."
+    if not tasks_for_date: 
+        return f"You have nothing scheduled for {date_query}."
+    try:
+        # Cached per date until that day's tasks change
+        return get_summary(task_file, date_query, tasks_for_date, summarizer_model)
+    except Exception as e:
+        return f"I found your tasks but had trouble summarizing them: {e}"
+
+def agenda_reply(start_date, end_date, task_file=None):
+    """The range's tasks as a Markdown agenda grouped by day."""
+    if end_date < start_date:
+        start_date, end_date = end_date, start_date
+    tasks = get_tasks_for_range(start_date, end_date, task_file)
+    if not tasks:
+        return f"You have nothing scheduled between {start_date} and {end_date}."
+    return f"{len(tasks)} task(s) from {start_date} to {end_date}:\n\n" + build_agenda_markdown(tasks)
+
+def range_summary_reply(start_date, end_date, summarizer_model, task_file=None):
+    """Per-day summaries for a range of days."""
+    if summarizer_model is None:
+        return "Summarizer model not initialized."
+    try:
+        return summarize_range(start_date, end_date, summarizer_model, task_file)
+    except ValueError:
+        return "Sorry, I couldn't understand the dates you asked about."
+    except Exception as e:
+        return f"I found your tasks but had trouble summarizing them: {e}"
+
+def add_tasks(new_tasks, task_file=None):
+    """Adds tasks unless one conflicts with the schedule (then nothing is added). Returns a Reply."""
+    task_file = task_file or TASK_FILE
+    # Load-modify-save under the file lock so edits from other sessions aren't lost
+    with task_transaction(task_file):
+        all_tasks = load_all_tasks(task_file) # Load fresh task list
+        tasks_to_add = []
+        for task in new_tasks:
+            # Add metadata before checking conflicts
+            task['id'] = new_task_id(); task['timestamp'] = datetime.now().isoformat(); task['status'] = 'pending'
+            conflicting_task = check_for_conflicts(task, all_tasks + tasks_to_add)
+            if conflicting_task:
+                conflict_desc = get_task_description(conflicting_task)
+                new_task_desc = get_task_description(task)
+                return Reply("error", "CONFLICT", f"Can't add '{new_task_desc}', it conflicts with '{conflict_desc}'.")
+            tasks_to_add.append(task)
+        if not save_all_tasks(all_tasks + tasks_to_add, task_file):
+            return Reply("error", "Error", "Failed to save updated task list.")
+    task_descs = " and ".join([f"'{get_task_description(t)}'" for t in tasks_to_add])
+    return Reply("success", "Success", f"Okay, adding {task_descs} to your list.")
+
+def run_intent(response_data, task_file=None, summarizer_model=None):
+    """Executes a parsed intent against a task file and returns a Reply.
+
+    Raises TaskStoreBusyError if the store stays locked by another session."""
+    task_file = task_file or TASK_FILE  # The lock needs a path; the readers would fall back to it anyway
+    intent = response_data.get("intent", "")
+    date_query = response_data.get("date_query")
+    end_date_query = response_data.get("end_date_query")
+
+    if intent == "add_task":
+        new_tasks = response_data.get("tasks", [])
+        if not new_tasks:
+            return Reply("warning", None, "I understood you wanted to add a task, but couldn't extract details.")
+        return add_tasks(new_tasks, task_file)
+
+    if intent in ("remove_task", "update_task"):
+        with task_transaction(task_file):
+            all_tasks = load_all_tasks(task_file)
+            if intent == "remove_task":
+                result_message = handle_task_removal(response_data.get("task_details"), all_tasks, task_file) # Saves internally
+            else:
+                result_message = handle_task_update(response_data.get("find_details"), response_data.get("update_details"),
+                                                    all_tasks, task_file) # Saves internally
+        if result_message.startswith("Okay, I've"):
+            return Reply("success", "Success", result_message)
+        return Reply("warning", None, result_message)
+
+    if intent == "summarize_schedule":
+        if not date_query:
+            return Reply("warning", None, "I understood you wanted a summary, but I missed which day.")
+        if end_date_query and end_date_query != date_query:
+            return Reply("info", "Summary", range_summary_reply(date_query, end_date_query, summarizer_model, task_file))
+        return Reply("info", "Summary", summary_reply(date_query, summarizer_model, task_file))
+
+    if intent == "query_schedule":
+        if not date_query:
+            return Reply("warning", None, "I understood you were asking about your schedule, but I missed which day.")
+        return Reply("info", "Schedule", schedule_reply(date_query, task_file))
+
+    if intent == "query_agenda":
+        if not date_query:
+            return Reply("warning", None, "I understood you were asking about your agenda, but I missed which days.")
+        return Reply("info", "Agenda", agenda_reply(date_query, end_date_query or date_query, task_file))
+
+    if intent == "query_specific_time":
+        time_query = response_data.get("time_query")
+        if not (date_query and time_query):
+            return Reply("warning", None, "I understood you were asking about a time, but I missed the date or time.")
+        return Reply("info", "Availability", specific_time_reply(date_query, time_query, task_file))
+
+    if intent == "find_free_slots":
+        if not date_query:
+            return Reply("warning", None, "I understood you were looking for free time, but I missed which day.")
+        return Reply("info", "Availability", free_slot_reply(date_query, end_date_query,
+                                                             response_data.get("min_duration_minutes") or 0, task_file))
+
+    # Handle cases where LLM gives JSON but no known intent
+    return Reply("warning", None, f"I received data but couldn't understand the intent: '{intent}'.")
+
+def transcribe_bytes(audio_bytes, recognizer=None):
+    """Transcribes recorded audio (webm/ogg/wav/...) to lower-case text; None if no speech was understood.
+
+    Raises TranscriptionError if the audio can't be converted (check FFmpeg) or the speech service fails."""
+    import speech_recognition as sr
+    from pydub import AudioSegment
+
+    r = recognizer or sr.Recognizer()
+    try:
+        # Convert to an in-memory WAV; pydub often guesses webm/ogg correctly
+        sound = AudioSegment.from_file(io.BytesIO(audio_bytes))
+        output_wav = io.BytesIO()
+        sound.export(output_wav, format="wav")
+        output_wav.seek(0)
+    except Exception as e:
+        raise TranscriptionError(f"Audio conversion error (check FFmpeg installation/path): {e}")
+
+    try:
+        with sr.AudioFile(output_wav) as source:
+            audio_data = r.record(source)
+        return r.recognize_google(audio_data, language="en-IN").lower()
+    except sr.UnknownValueError:
+        return None
+    except sr.RequestError as e:
+        raise TranscriptionError(f"Speech service error; {e}")
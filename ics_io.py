@@ -0,0 +1,219 @@
+# Streaming iCalendar (.ics, RFC 5545) reader and writer.
+#
+# The reader walks the file line by line and yields one VEVENT at a time, so memory
+# stays flat however large the calendar is. Events are mapped onto the task schema
+# (task_description, date, start_time, end_time, category); the writer streams
+# tasks back out as VEVENTs with floating local times.
+
+import re
+import hashlib
+from datetime import date, datetime, timedelta, timezone
+
+from task_logic import get_task_description
+
+ICS_CATEGORIES = {"work": "Work", "personal": "Personal", "errand": "Errand", "social": "Social",
+                  "business": "Work", "meeting": "Work", "holiday": "Personal", "family": "Personal"}
+PRODID = "-//PulseVox//Task Export//EN"
+
+_DURATION_RE = re.compile(r"([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$")
+
+
+def unfolded_lines(stream):
+    """Yields logical content lines; continuation lines (leading space or tab) are joined back on."""
+    pending = None
+    for raw_line in stream:
+        line = raw_line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and pending is not None:
+            pending += line[1:]
+            continue
+        if pending:
+            yield pending
+        pending = line
+    if pending:
+        yield pending
+
+
+def parse_content_line(line):
+    """'DTSTART;TZID=Asia/Kolkata:20251028T170000' -> ('DTSTART', {'TZID': 'Asia/Kolkata'}, '20251028T170000')."""
+    colon = line.find(":")
+    if colon == -1:
+        return None
+    head, value = line[:colon], line[colon + 1:]
+    if '"' in head:
+        # Quoted parameter values may contain colons; the value starts at the first colon outside quotes
+        in_quotes = False
+        for i, ch in enumerate(line):
+            if ch == '"':
+                in_quotes = not in_quotes
+            elif ch == ":" and not in_quotes:
+                head, value = line[:i], line[i + 1:]
+                break
+    if ";" not in head:
+        return head.upper(), {}, value
+    name, *raw_params = head.split(";")
+    params = {}
+    for param in raw_params:
+        key, _, param_value = param.partition("=")
+        params[key.upper()] = param_value.strip('"')
+    return name.upper(), params, value
+
+
+def iter_ics_events(stream):
+    """Yields each VEVENT as {PROPERTY: (params, value)}; nested components (VALARM) are skipped."""
+    event, depth = None, 0
+    for line in unfolded_lines(stream):
+        parsed = parse_content_line(line)
+        if parsed is None:
+            continue
+        name, params, value = parsed
+        if name == "BEGIN":
+            if value.upper() == "VEVENT" and event is None:
+                event, depth = {}, 0
+            elif event is not None:
+                depth += 1
+        elif name == "END":
+            if event is not None and depth:
+                depth -= 1
+            elif event is not None and value.upper() == "VEVENT":
+                yield event
+                event = None
+        elif event is not None and not depth and name not in event:
+            event[name] = (params, value)
+
+
+def unescape_text(value):
+    return re.sub(r"\\([\\;,nN])", lambda m: "\n" if m.group(1) in "nN" else m.group(1), value).strip()
+
+
+def escape_text(value):
+    return str(value).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+def parse_ics_datetime(value, params):
+    """Returns a local datetime, or a date for all-day values (VALUE=DATE). Raises ValueError."""
+    value = value.strip()
+    # Fixed-width fields, sliced directly: strptime dominates the import time otherwise
+    if not value[:8].isdigit():
+        raise ValueError(f"bad date-time '{value}'")
+    if params.get("VALUE", "").upper() == "DATE" or len(value) == 8:
+        return date(int(value[:4]), int(value[4:6]), int(value[6:8]))
+    if len(value) < 15 or value[8] != "T" or not value[9:15].isdigit():
+        raise ValueError(f"bad date-time '{value}'")
+    parsed = datetime(int(value[:4]), int(value[4:6]), int(value[6:8]), int(value[9:11]), int(value[11:13]), int(value[13:15]))
+    if value.endswith("Z"):  # UTC -> local wall-clock time
+        return parsed.replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+    if params.get("TZID"):
+        try:
+            from zoneinfo import ZoneInfo
+            return parsed.replace(tzinfo=ZoneInfo(params["TZID"])).astimezone().replace(tzinfo=None)
+        except Exception:
+            pass  # Unknown zone name (e.g. a Windows one): keep the wall-clock time
+    return parsed
+
+
+def parse_duration(value):
+    match = _DURATION_RE.match(value.strip())
+    if not match:
+        raise ValueError(f"bad duration '{value}'")
+    sign, weeks, days, hours, minutes, seconds = match.groups()
+    delta = timedelta(weeks=int(weeks or 0), days=int(days or 0), hours=int(hours or 0),
+                      minutes=int(minutes or 0), seconds=int(seconds or 0))
+    return -delta if sign == "-" else delta
+
+
+def event_to_task(event):
+    """Maps a parsed VEVENT onto a task dict; None for cancelled or undated events.
+
+    Recurring events (RRULE) are imported as their first occurrence only."""
+    if event.get("STATUS", ({}, ""))[1].upper() == "CANCELLED" or "DTSTART" not in event:
+        return None
+    try:
+        start = parse_ics_datetime(event["DTSTART"][1], event["DTSTART"][0])
+        if "DTEND" in event:
+            end = parse_ics_datetime(event["DTEND"][1], event["DTEND"][0])
+        elif "DURATION" in event:
+            end = start + parse_duration(event["DURATION"][1])
+        else:
+            end = None
+    except ValueError:
+        return None
+
+    task = {"task_description": unescape_text(event.get("SUMMARY", ({}, ""))[1]) or "Untitled event"}
+    if isinstance(start, datetime):
+        task["date"], task["start_time"] = start.date().isoformat(), f"{start.hour:02d}:{start.minute:02d}"
+        if not isinstance(end, datetime) or end <= start:
+            end = start + timedelta(minutes=30)  # Same default duration as spoken tasks
+        # Tasks live on a single day; an event running past midnight ends at 23:59
+        task["end_time"] = f"{end.hour:02d}:{end.minute:02d}" if end.date() == start.date() else "23:59"
+    else:
+        task["date"] = start.isoformat()  # All-day event: no times
+
+    category = "Personal"
+    for name in unescape_text(event.get("CATEGORIES", ({}, ""))[1]).split(","):
+        if name.strip().lower() in ICS_CATEGORIES:
+            category = ICS_CATEGORIES[name.strip().lower()]
+            break
+    task["category"] = category
+    if "UID" in event:
+        task["ics_uid"] = event["UID"][1].strip()
+    return task
+
+
+def _fold(line):
+    """Splits a content line into 75-octet chunks joined by CRLF + space."""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    chunks, start, limit = [], 0, 75
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        while end < len(encoded) and (encoded[end] & 0xC0) == 0x80:
+            end -= 1  # Never split a UTF-8 sequence
+        chunks.append(encoded[start:end].decode("utf-8"))
+        start, limit = end, 74  # Continuation lines start with a space
+    return "\r\n ".join(chunks) + "\r\n"
+
+
+def task_uid(task):
+    """The event UID: the one it was imported with, else a stable hash of the task."""
+    if task.get("ics_uid"):
+        return task["ics_uid"]
+    key = f"{get_task_description(task, '')}|{task.get('date')}|{task.get('start_time')}|{task.get('timestamp')}"
+    return hashlib.sha1(key.encode()).hexdigest() + "@pulsevox"
+
+
+def task_to_vevent(task, stamp):
+    """Returns the VEVENT text for a task, or None if it has no usable date."""
+    try:
+        day = datetime.strptime(task.get("date") or "", "%Y-%m-%d").date()
+    except ValueError:
+        return None
+    lines = ["BEGIN:VEVENT", f"UID:{task_uid(task)}", f"DTSTAMP:{stamp}"]
+    try:
+        start = datetime.combine(day, datetime.strptime(task["start_time"], "%H:%M").time())
+        end = datetime.combine(day, datetime.strptime(task.get("end_time") or "", "%H:%M").time()) \
+            if task.get("end_time") else start + timedelta(minutes=30)
+        if end <= start:
+            end = start + timedelta(minutes=30)
+        lines += [f"DTSTART:{start:%Y%m%dT%H%M%S}", f"DTEND:{end:%Y%m%dT%H%M%S}"]
+    except (KeyError, TypeError, ValueError):
+        lines += [f"DTSTART;VALUE=DATE:{day:%Y%m%d}", f"DTEND;VALUE=DATE:{day + timedelta(days=1):%Y%m%d}"]
+    lines.append(f"SUMMARY:{escape_text(get_task_description(task))}")
+    if task.get("category"):
+        lines.append(f"CATEGORIES:{escape_text(task['category'])}")
+    lines.append("END:VEVENT")
+    return "".join(_fold(line) for line in lines)
+
+
+def write_ics(tasks, stream):
+    """Streams tasks out as a VCALENDAR. Returns the number of events written."""
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    stream.write(_fold("BEGIN:VCALENDAR") + _fold("VERSION:2.0") + _fold(f"PRODID:{PRODID}") + _fold("CALSCALE:GREGORIAN"))
+    written = 0
+    for task in tasks:
+        vevent = task_to_vevent(task, stamp)
+        if vevent:
+            stream.write(vevent)
+            written += 1
+    stream.write(_fold("END:VCALENDAR"))
+    return written
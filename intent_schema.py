@@ -0,0 +1,290 @@
+# The intent JSON contract between the LLM and the handlers.
+#
+# INTENT_RESPONSE_SCHEMA is sent to Gemini as a structured-output schema. Whatever
+# comes back still goes through parse_intent_response(), which repairs near-valid
+# JSON locally (code fences, trailing commas, single quotes, unclosed brackets) and
+# normalizes field names and formats, so handlers only ever see the canonical keys.
+
+import re
+import json
+import threading
+from datetime import datetime, timedelta
+
+INTENTS = ["add_task", "query_schedule", "query_specific_time", "remove_task", "update_task",
+           "summarize_schedule", "find_free_slots", "query_agenda"]
+CATEGORIES = ["Work", "Personal", "Errand", "Social"]
+
+_TASK_PROPERTIES = {
+    "task_description": {"type": "string"},
+    "date": {"type": "string", "description": "YYYY-MM-DD"},
+    "start_time": {"type": "string", "description": "HH:MM, 24-hour"},
+    "end_time": {"type": "string", "description": "HH:MM, 24-hour"},
+    "category": {"type": "string", "enum": CATEGORIES},
+}
+_DETAILS_SCHEMA = {"type": "object", "properties": _TASK_PROPERTIES}
+
+INTENT_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "intent": {"type": "string", "enum": INTENTS},
+        "tasks": {"type": "array", "items": {"type": "object", "properties": _TASK_PROPERTIES,
+                                             "required": ["task_description", "date", "start_time", "end_time", "category"]}},
+        "date_query": {"type": "string", "description": "YYYY-MM-DD"},
+        "end_date_query": {"type": "string", "description": "YYYY-MM-DD"},
+        "time_query": {"type": "string", "description": "HH:MM, 24-hour"},
+        "min_duration_minutes": {"type": "integer"},
+        "task_details": _DETAILS_SCHEMA,
+        "find_details": _DETAILS_SCHEMA,
+        "update_details": _DETAILS_SCHEMA,
+    },
+    "required": ["intent"],
+}
+
+# Common near-misses the model produces, mapped to the canonical names
+INTENT_ALIASES = {
+    "add": "add_task", "create_task": "add_task", "add_tasks": "add_task", "schedule_task": "add_task",
+    "query": "query_schedule", "get_schedule": "query_schedule", "show_schedule": "query_schedule",
+    "query_time": "query_specific_time", "check_availability": "query_specific_time",
+    "remove": "remove_task", "delete_task": "remove_task", "delete": "remove_task", "cancel_task": "remove_task",
+    "update": "update_task", "move_task": "update_task", "reschedule_task": "update_task", "edit_task": "update_task",
+    "summarize": "summarize_schedule", "summary": "summarize_schedule", "summarize_day": "summarize_schedule",
+    "find_free_slot": "find_free_slots", "free_slots": "find_free_slots", "find_free_time": "find_free_slots",
+    "agenda": "query_agenda", "query_range": "query_agenda", "query_week": "query_agenda",
+    "query_month": "query_agenda", "weekly_agenda": "query_agenda", "query_schedule_range": "query_agenda",
+}
+TASK_KEY_ALIASES = {
+    "task": "task_description", "title": "task_description", "description": "task_description",
+    "name": "task_description", "event": "task_description",
+    "start": "start_time", "time": "start_time", "starttime": "start_time",
+    "end": "end_time", "endtime": "end_time",
+    "day": "date",
+}
+TOP_LEVEL_ALIASES = {
+    "date": "date_query", "day": "date_query", "start_date": "date_query", "start_date_query": "date_query",
+    "end_date": "end_date_query", "time": "time_query",
+    "duration": "min_duration_minutes", "duration_minutes": "min_duration_minutes", "min_duration": "min_duration_minutes",
+    "task": "tasks", "details": "task_details", "find": "find_details", "updates": "update_details", "update": "update_details",
+}
+
+# Parse outcomes since start: valid as returned, repaired locally, or unusable
+intent_parse_stats = {"total": 0, "valid": 0, "repaired": 0, "failed": 0}
+_stats_lock = threading.Lock()
+
+
+class IntentParseError(ValueError):
+    """The LLM output could not be turned into a usable intent, even after repair."""
+
+
+def _count(outcome):
+    with _stats_lock:
+        intent_parse_stats["total"] += 1
+        intent_parse_stats[outcome] += 1
+
+
+def parse_rates():
+    """Returns (repair rate, failure rate) over all intent responses parsed so far."""
+    total = intent_parse_stats["total"] or 1
+    return intent_parse_stats["repaired"] / total, intent_parse_stats["failed"] / total
+
+
+def _strip_fences(text):
+    match = re.search(r"```(?:json|JSON)?\s*(.*?)```", text, re.S)
+    return (match.group(1) if match else text).strip()
+
+
+_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+
+def _repair_json(text):
+    """Fixes the usual ways LLM JSON is almost-valid. Returns the parsed value or raises ValueError.
+
+    One pass over the text that knows when it's inside a string, so string values are
+    copied as they are: outside strings it quotes bare keys, turns single-quoted strings into
+    double-quoted ones, lowercases Python literals, drops trailing commas, cuts anything
+    after the outermost value and closes whatever was left open."""
+    start = min((i for i in (text.find("{"), text.find("[")) if i != -1), default=-1)
+    if start == -1:
+        raise ValueError("no JSON object found")
+    text = text[start:]
+    out, closers, close_quote = [], [], None
+    i, n = 0, len(text)
+    while i < n:
+        ch = text[i]
+        if close_quote:
+            if ch == "\\" and i + 1 < n:
+                out.append("'" if text[i + 1] == "'" else text[i:i + 2])  # \' isn't a JSON escape
+                i += 2
+                continue
+            if ch in close_quote:
+                out.append('"')
+                close_quote = None
+            else:
+                out.append('\\"' if ch == '"' else ch)  # A double quote inside a '...' or “...” string
+            i += 1
+            continue
+        word = re.match(r"[A-Za-z_][A-Za-z0-9_]*", text[i:]) if ch.isalpha() or ch == "_" else None
+        if ch in "\"'“”":
+            # Each string's own opening quote decides how it ends, so Python-style 'key': 'value'
+            # and "Mom's call" can share one text
+            out.append('"')
+            close_quote = "”“\"" if ch in "“”" else ch
+        elif word:
+            value = word.group(0)
+            after = text[word.end() + i:].lstrip()
+            before = "".join(out).rstrip()[-1:]
+            if after.startswith(":") and before in ("{", ","):
+                value = f'"{value}"'  # Bare key
+            out.append(_LITERALS.get(value, value))
+            i += word.end()
+            continue
+        elif ch == ",":
+            if text[i + 1:].lstrip()[:1] not in ("}", "]", ""):
+                out.append(ch)  # Trailing commas are dropped
+        elif ch in "{[":
+            closers.append("}" if ch == "{" else "]")
+            out.append(ch)
+        elif ch in "}]" and closers:
+            closers.pop()
+            out.append(ch)
+            if not closers:
+                break  # Anything after the outermost value is dropped
+        else:
+            out.append(ch)
+        i += 1
+    if close_quote:
+        out.append('"')
+    text = re.sub(r",\s*$", "", "".join(out).rstrip()) + "".join(reversed(closers))
+    return json.loads(text)
+
+
+def normalize_time(value):
+    """'6pm', '6:30 PM', '18:00:00', '1830' -> 'HH:MM'; None if it can't be read."""
+    if not isinstance(value, str) and not isinstance(value, int):
+        return None
+    text = str(value).strip().lower().replace(".", "")
+    match = re.fullmatch(r"(\d{1,2})(?::?(\d{2}))?(?::\d{2})?\s*(am|pm)?", text)
+    if not match:
+        return None
+    hour, minute = int(match.group(1)), int(match.group(2) or 0)
+    if match.group(3) == "pm" and hour < 12: hour += 12
+    if match.group(3) == "am" and hour == 12: hour = 0
+    if hour > 23 or minute > 59:
+        return None
+    return f"{hour:02d}:{minute:02d}"
+
+
+def normalize_date(value):
+    """'2025-10-28', '2025/10/28', '2025-10-28T00:00:00' -> 'YYYY-MM-DD'; None if it can't be read."""
+    if not isinstance(value, str):
+        return None
+    match = re.match(r"\s*(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})", value)
+    if not match:
+        return None
+    try:
+        return datetime(int(match.group(1)), int(match.group(2)), int(match.group(3))).date().isoformat()
+    except ValueError:
+        return None
+
+
+def _normalize_task_fields(task):
+    """Canonical keys and formats for a task or a find/update details dict."""
+    normalized = {}
+    for key, value in task.items():
+        canonical = TASK_KEY_ALIASES.get(key.lower(), key.lower()) if isinstance(key, str) else key
+        if canonical in normalized and canonical != key:
+            continue  # The canonical key wins over an alias
+        normalized[canonical] = value
+    for key in ("start_time", "end_time"):
+        if key in normalized:
+            normalized[key] = normalize_time(normalized[key]) or normalized[key]
+    if "date" in normalized:
+        normalized["date"] = normalize_date(normalized["date"]) or normalized["date"]
+    if "category" in normalized:
+        category = str(normalized["category"]).strip().capitalize()
+        normalized["category"] = category if category in CATEGORIES else "Personal"
+    return normalized
+
+
+def normalize_intent(data):
+    """Maps near-valid intent data onto the schema. Returns (data, changed)."""
+    original = json.dumps(data, sort_keys=True, default=str)
+    if isinstance(data, list):  # A bare list of tasks
+        data = {"intent": "add_task", "tasks": data}
+    if not isinstance(data, dict):
+        raise IntentParseError("intent response is not a JSON object")
+
+    normalized = {}
+    for key, value in data.items():
+        canonical = TOP_LEVEL_ALIASES.get(key.lower(), key.lower()) if isinstance(key, str) else key
+        if canonical in normalized and canonical != key:
+            continue
+        normalized[canonical] = value
+
+    intent = str(normalized.get("intent", "")).strip().lower().replace(" ", "_").replace("-", "_")
+    intent = INTENT_ALIASES.get(intent, intent)
+    if intent not in INTENTS:
+        raise IntentParseError(f"unknown intent '{normalized.get('intent')}'")
+    normalized["intent"] = intent
+
+    if intent == "add_task":
+        tasks = normalized.get("tasks") or []
+        tasks = [tasks] if isinstance(tasks, dict) else tasks
+        normalized_tasks = []
+        for task in tasks:
+            if not isinstance(task, dict): continue
+            task = _normalize_task_fields(task)
+            # Same default duration the prompt asks for: 30 minutes
+            if task.get("start_time") and not task.get("end_time"):
+                start = normalize_time(task["start_time"])
+                if start:
+                    task["end_time"] = (datetime.strptime(start, "%H:%M") + timedelta(minutes=30)).strftime("%H:%M")
+            normalized_tasks.append(task)
+        normalized["tasks"] = normalized_tasks
+    if intent == "remove_task" and "task_details" not in normalized and isinstance(normalized.get("tasks"), dict):
+        normalized["task_details"] = normalized.pop("tasks")
+    for key in ("task_details", "find_details", "update_details"):
+        if isinstance(normalized.get(key), dict):
+            normalized[key] = _normalize_task_fields(normalized[key])
+
+    for key in ("date_query", "end_date_query"):
+        if key in normalized:
+            normalized[key] = normalize_date(normalized[key]) or normalized[key]
+    if "time_query" in normalized:
+        normalized["time_query"] = normalize_time(normalized["time_query"]) or normalized["time_query"]
+    if "min_duration_minutes" in normalized:
+        try:
+            normalized["min_duration_minutes"] = int(float(normalized["min_duration_minutes"]))
+        except (TypeError, ValueError):
+            normalized.pop("min_duration_minutes")
+    # A schedule query over several days is an agenda
+    if intent == "query_schedule" and normalized.get("end_date_query") not in (None, "", normalized.get("date_query")):
+        normalized["intent"] = "query_agenda"
+
+    return normalized, json.dumps(normalized, sort_keys=True, default=str) != original
+
+
+def parse_intent_response(raw_text):
+    """Turns the intent model's raw text into normalized intent data.
+
+    Valid output is only normalized; near-valid output is repaired locally rather
+    than spending another LLM round trip. Raises IntentParseError if nothing usable
+    can be recovered. Outcomes are counted in intent_parse_stats."""
+    text = _strip_fences(raw_text or "")
+    repaired = False
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        try:
+            data = _repair_json(text)
+            repaired = True
+        except ValueError as e:
+            _count("failed")
+            raise IntentParseError(f"could not repair the LLM output: {e}") from e
+    try:
+        data, changed = normalize_intent(data)
+    except IntentParseError:
+        _count("failed")
+        raise
+    _count("repaired" if repaired or changed else "valid")
+    return data
+
@@ -0,0 +1,288 @@
+# Gemini setup for PulseVox: the prompts and model construction.
+# google.generativeai and dotenv are only imported (and configured) on first use.
+#
+# The intent system prompt is static: today's date goes into a small preamble on
+# each request instead (see IntentModel), so a long-running process never resolves
+# "kal" against the day it started, and the big instruction block is byte-for-byte
+# the same on every request, which lets Gemini serve it from a context cache.
+
+import os
+import time
+import threading
+from datetime import datetime, timedelta
+
+MODEL_NAME = 'models/gemini-2.5-flash'
+
+# "gemini" (default) or "stub" for the local stand-in in llm_stub.py
+LLM_BACKEND = os.getenv("PULSEVOX_LLM_BACKEND", "gemini")
+# How often an idle connection is pinged so it stays open (0 disables)
+KEEPALIVE_SECONDS = float(os.getenv("PULSEVOX_LLM_KEEPALIVE_SECONDS", "240"))
+# Lifetime of the context cache holding the intent system prompt; it's extended while the process runs (0: no cache)
+CONTEXT_CACHE_TTL_SECONDS = int(os.getenv("PULSEVOX_CONTEXT_CACHE_TTL_SECONDS", "3600"))
+# Errors meaning the context cache is gone (expired or deleted): use the plain model from then on
+CACHE_GONE_ERRORS = {"NotFound", "PermissionDenied"}
+
+# System Prompt (The "Brain's" Rules)
+# UPDATED with Hinglish, Category, and Summarize rules
+# Kept free of anything that changes (like the date) so it can be cached; see date_preamble()
+system_prompt = """
+You are an expert task parsing engine. Your job is to extract events and intents from a user's command.
+The output must be a single, valid JSON object.
+
+CONTEXT: Each user message starts with a CONTEXT line giving today's date and the local time. Resolve every relative date against that line of the latest message.
+
+CRITICAL: Use the conversation history to resolve pronouns or ambiguous commands. 
+For example, if the user says "add a call at 6" and then "move it to 7", you must understand "it" refers to the "call at 6".
+
+CRITICAL: The user may speak in Hinglish (a mix of Hindi and English). Your job is to understand the command and extract the English entities (like 'call mom' or 'tomorrow at 6').
+
+CRITICAL (Hinglish Time): The user will use Hindi words for time. You MUST interpret these and map them to the correct date.
+- 'aaj' = today.
+- 'kal' = 'tomorrow' . *For scheduling, "kal" ALWAYS means tomorrow, not yesterday.*
+- 'parson' = 'day after tomorrow'.
+- 'shaam ko' = 'in the evening' (e.g., 19:00).
+- 'subah' = 'in the morning' (e.g., 09:00).
+- 'dopahar ko' = 'in the afternoon' (e.g., 14:00).
+Example 1: "kal shaam ko karaoke" means "karaoke tomorrow in the evening".
+Example 2: "parson subah meeting" means "meeting day after tomorrow in the morning".
+
+First, determine the user's "intent". It must be one of: "add_task", "query_schedule", "query_specific_time", "remove_task", "update_task", "summarize_schedule", "find_free_slots", or "query_agenda".
+
+- If "add_task": Respond with a "tasks" list. 
+  Each task MUST use keys: "task_description", "date", "start_time", "end_time", and "category".
+  The "category" MUST be one of: 'Work', 'Personal', 'Errand', or 'Social'.
+  Example: {"intent": "add_task", "tasks": [{"task_description": "Call Mom", "date": "2025-10-28", "start_time": "17:00", "end_time": "17:30", "category": "Personal"}]}
+
+- If "query_schedule" (e.g., "what's on my schedule tomorrow?"): Respond with: 
+  {"intent": "query_schedule", "date_query": "YYYY-MM-DD"}
+
+- If "query_specific_time" (e.g., "am I free at 6pm?"): Respond with: 
+  {"intent": "query_specific_time", "date_query": "YYYY-MM-DD", "time_query": "HH:MM"}
+
+- If "summarize_schedule" (e.g., "summarize my day", "what's my plan?"): Respond with:
+  {"intent": "summarize_schedule", "date_query": "YYYY-MM-DD"}
+  For a range of days (e.g., "summarize my week"), add "end_date_query": "YYYY-MM-DD".
+
+- If "query_agenda" (e.g., "what's on this week?", "is hafte kya kya hai", "next 7 days", "what do I have this month?"): Respond with the first and last day of the range:
+  {"intent": "query_agenda", "date_query": "YYYY-MM-DD", "end_date_query": "YYYY-MM-DD"}
+  "this week" = Monday to Sunday of the current week; "next 7 days" = today and the 6 days after; "this month" = the whole current month.
+  Hinglish: 'is hafte' = this week, 'agle hafte' = next week, 'is mahine' = this month.
+
+- If "find_free_slots" (e.g., "when am I free tomorrow?", "kal 1 ghante ka free slot kab hai", "any free time this week?"): Respond with:
+  {"intent": "find_free_slots", "date_query": "YYYY-MM-DD", "end_date_query": "YYYY-MM-DD", "min_duration_minutes": 60}
+  "end_date_query" is only needed for a range of days (e.g., "this week"); omit it for a single day.
+  "min_duration_minutes" is only needed when the user asks for a slot of a certain length; omit it otherwise.
+
+- If "remove_task" (e.g., "remove my 6pm call"): Respond with details.
+  Example 1: {"intent": "remove_task", "task_details": {"date": "2025-10-27", "start_time": "18:00"}}
+
+- If "update_task" (e.g., "move my 6pm call to 7"): 
+  You MUST find the original task using context.
+  You MUST extract the *new* details.
+  The output MUST have two keys: "find_details" (to locate the old task) and "update_details" (the new info).
+  Example 1: {"intent": "update_task", "find_details": {"task_description": "call", "start_time": "18:00"}, "update_details": {"start_time": "19:00", "end_time": "19:30"}}
+
+CRITICAL RULES FOR TIME EXTRACTION:
+1. Resolve all relative dates ("tomorrow", "today").
+2. Handle Durations: "from 6pm to 8pm" -> start_time "18:00", end_time "20:00".
+3. Default Duration: "at 6pm" -> start_time "18:00", end_time "18:30".
+
+The user's command will follow. Respond ONLY with the valid JSON object.
+"""
+
+summarizer_system_prompt = "You are a helpful assistant. You answer user requests in natural, conversational language. You do NOT output JSON."
+
+_genai_configured = False
+
+def get_genai():
+    """Imports google.generativeai and configures the API key the first time it's needed."""
+    global _genai_configured
+    import google.generativeai as genai
+    if not _genai_configured:
+        from dotenv import load_dotenv
+        load_dotenv()
+        genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+        _genai_configured = True
+    return genai
+
+def date_preamble(now=None):
+    """The per-request context: today's date and the local time."""
+    now = now or datetime.now()
+    return f"CONTEXT: Today is {now.strftime('%A, %B %d, %Y')} ({now.date().isoformat()}); the local time is {now.strftime('%H:%M')}."
+
+def with_date_context(contents, now=None):
+    """contents with date_preamble() as an extra first part of the newest user turn (the history itself isn't changed)."""
+    preamble = date_preamble(now)
+    if isinstance(contents, str):
+        return [{"role": "user", "parts": [preamble, contents]}]
+    contents = list(contents)
+    last = contents[-1]
+    contents[-1] = {**last, "parts": [preamble] + list(last["parts"])}
+    return contents
+
+def _create_model(system_instruction, generation_config=None):
+    if LLM_BACKEND == "stub":
+        from llm_stub import StubGenerativeModel
+        return StubGenerativeModel(MODEL_NAME, system_instruction=system_instruction, generation_config=generation_config)
+    return get_genai().GenerativeModel(MODEL_NAME, system_instruction=system_instruction, generation_config=generation_config)
+
+_context_cache = None  # The intent prompt's context cache: None until tried, False if caching isn't possible
+_context_cache_lock = threading.Lock()
+
+def _create_context_cache():
+    ttl = timedelta(seconds=CONTEXT_CACHE_TTL_SECONDS)
+    if LLM_BACKEND == "stub":
+        from llm_stub import StubCachedContent
+        return StubCachedContent(MODEL_NAME, system_instruction=system_prompt, ttl=ttl)
+    return get_genai().caching.CachedContent.create(model=MODEL_NAME, system_instruction=system_prompt, ttl=ttl)
+
+def _drop_context_cache(cache):
+    """Marks the cache as gone, so use_context_cache() stops handing it out; models using it fall back on their next call."""
+    global _context_cache
+    with _context_cache_lock:
+        if _context_cache is cache:
+            _context_cache = False
+
+def _keep_cache_alive(cache):
+    """Pushes the cache's expiry forward every half TTL until that fails or the cache is dropped."""
+    while True:
+        time.sleep(CONTEXT_CACHE_TTL_SECONDS / 2)
+        if _context_cache is not cache:
+            return
+        try:
+            cache.update(ttl=timedelta(seconds=CONTEXT_CACHE_TTL_SECONDS))
+        except Exception:
+            _drop_context_cache(cache)
+            return
+
+def intent_prompt_cache():
+    """The process-wide context cache holding system_prompt (created on first use); None if caching is
+    off or not possible, e.g. when the prompt is below the model's minimum size for caching."""
+    global _context_cache
+    if CONTEXT_CACHE_TTL_SECONDS <= 0:
+        return None
+    with _context_cache_lock:
+        if _context_cache is None:
+            try:
+                _context_cache = _create_context_cache()
+            except Exception:
+                _context_cache = False  # Not worth retrying on every model: requests just send the prompt
+            else:
+                threading.Thread(target=_keep_cache_alive, args=(_context_cache,), name="pulsevox-context-cache", daemon=True).start()
+        return _context_cache or None
+
+
+class IntentModel:
+    """The intent model, adding the date preamble to every request.
+
+    Requests go to a model built on the prompt's context cache once use_context_cache()
+    has found one (the static prompt is then sent by reference, not with every turn),
+    otherwise, or once the cache is gone, to the plain model."""
+
+    def __init__(self, model, generation_config):
+        self.model = model
+        self.generation_config = generation_config
+        self.cache = None
+        self.cached_model = None
+
+    def use_context_cache(self):
+        """Switches requests to the context cache if there is one. Returns whether it did."""
+        cache = intent_prompt_cache()
+        if cache is not None and self.cached_model is None:
+            self.cache = cache
+            if LLM_BACKEND == "stub":
+                from llm_stub import StubGenerativeModel
+                self.cached_model = StubGenerativeModel.from_cached_content(cache, generation_config=self.generation_config)
+            else:
+                self.cached_model = get_genai().GenerativeModel.from_cached_content(cached_content=cache, generation_config=self.generation_config)
+        return self.cached_model is not None
+
+    def generate_content(self, contents, **kwargs):
+        contents = with_date_context(contents)
+        cached_model = self.cached_model
+        if cached_model is not None:
+            try:
+                return cached_model.generate_content(contents, **kwargs)
+            except Exception as e:
+                if type(e).__name__ not in CACHE_GONE_ERRORS:
+                    raise
+                self.cached_model = None
+                _drop_context_cache(self.cache)  # Or the next use_context_cache() would attach it again
+        return self.model.generate_content(contents, **kwargs)
+
+    def count_tokens(self, contents, **kwargs):
+        return self.model.count_tokens(contents, **kwargs)
+
+    def start_chat(self, history=None):
+        chat = self.model.start_chat(history=history)
+        chat.model = self  # send_chat_message() calls chat.model.generate_content()
+        return chat
+
+def create_intent_model():
+    """The JSON expert (main brain) that turns commands into intents, constrained to the intent schema."""
+    from intent_schema import INTENT_RESPONSE_SCHEMA
+    generation_config = {"response_mime_type": "application/json", "response_schema": INTENT_RESPONSE_SCHEMA}
+    return IntentModel(_create_model(system_prompt, generation_config=generation_config), generation_config)
+
+def create_summarizer_model():
+    """The generalist that answers in natural language."""
+    return _create_model(summarizer_system_prompt)
+
+
+class SharedModels:
+    """The intent and summarizer models, built once per process and shared by every session.
+
+    The SDK sends every model's requests over one process-wide client, so one model of
+    each kind is all a process needs; only the chat history is per session. warm_up()
+    opens that client's connection ahead of the first command, and a keep-alive thread
+    pings it when no LLM request has gone out for a while, so it isn't dropped."""
+
+    def __init__(self):
+        self._intent_model = create_intent_model()
+        self._summarizer_model = create_summarizer_model()
+        self._keepalive_thread = None
+
+    def intent_model(self):
+        return self._intent_model
+
+    def summarizer_model(self):
+        return self._summarizer_model
+
+    def start_chat(self):
+        """Starts a per-user chat session on the shared intent model."""
+        return self._intent_model.start_chat(history=[])
+
+    def _ping(self):
+        # count_tokens is a cheap round trip that doesn't generate (or bill) any output
+        try:
+            self._intent_model.count_tokens("ping")
+        except Exception:
+            pass  # Warm-up is best effort; the real call will surface any error
+
+    def _warm_up(self):
+        # Moving the intent prompt into a context cache is part of warming up (one request, then shared)
+        try:
+            self._intent_model.use_context_cache()
+        except Exception:
+            pass
+        self._ping()
+
+    def _keepalive_loop(self):
+        from llm_policy import policy_stats, rate_limiter, PRIORITY_BACKGROUND
+        last_attempts = policy_stats["attempts"]
+        while True:
+            time.sleep(KEEPALIVE_SECONDS)
+            # Only ping a connection that sat idle for the whole interval, and only with quota to spare
+            if policy_stats["attempts"] == last_attempts and rate_limiter.try_acquire(PRIORITY_BACKGROUND):
+                self._ping()
+            last_attempts = policy_stats["attempts"]
+
+    def warm_up(self, background=True):
+        """Opens the connection now (in a daemon thread by default) and starts the keep-alive."""
+        if background:
+            threading.Thread(target=self._warm_up, name="pulsevox-llm-warmup", daemon=True).start()
+        else:
+            self._warm_up()
+        if KEEPALIVE_SECONDS > 0 and self._keepalive_thread is None:
+            self._keepalive_thread = threading.Thread(target=self._keepalive_loop, name="pulsevox-llm-keepalive", daemon=True)
+            self._keepalive_thread.start()
@@ -0,0 +1,320 @@
+# Call policy for LLM requests: per-call-type deadlines, retries with jittered
+# exponential back-off, and optional hedging (a second, duplicate request fired when
+# the first one runs past the observed p95 latency; whichever finishes first wins).
+#
+# Every request (attempts, retries and hedges alike) first takes a token from one
+# process-wide, priority-aware token bucket sized to the API key's quota, so a burst
+# of summaries can't spend the quota that interactive intent calls need. Calls that
+# can't get a token before their queue deadline are shed with LLMOverloaded, and the
+# caller answers locally instead.
+
+import os
+import time
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Errors that retrying won't fix (bad request, auth, blocked prompt); everything else is treated as transient
+NON_RETRYABLE_ERRORS = {"InvalidArgument", "PermissionDenied", "Unauthenticated", "NotFound",
+                        "BlockedPromptException", "StopCandidateException", "ValueError", "TypeError",
+                        "LLMOverloaded"}
+# The API's "quota exceeded" (HTTP 429) errors: the limiter empties its bucket when one comes back
+QUOTA_ERRORS = {"ResourceExhausted", "TooManyRequests"}
+
+# Requests per minute the API key allows (0 turns the limiter off) and how many may go out back to back.
+# Set it a little under the real quota: the bucket's burst comes on top of the steady rate.
+LLM_RPM = float(os.getenv("PULSEVOX_LLM_RPM", "900"))
+LLM_BURST = int(os.getenv("PULSEVOX_LLM_BURST", "10"))
+
+# Priority classes, highest first
+PRIORITY_INTERACTIVE, PRIORITY_SUMMARY, PRIORITY_BACKGROUND = 0, 1, 2
+PRIORITY_NAMES = ["interactive", "summary", "background"]
+# Per priority: (longest wait in the queue in seconds, most calls waiting); past either the call is shed
+QUEUE_LIMITS = [(3.0, 64), (10.0, 32), (30.0, 8)]
+
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="pulsevox-llm")
+
+
+class LLMDeadlineExceeded(Exception):
+    """Raised when no attempt finished within the call's deadline."""
+
+
+class LLMOverloaded(Exception):
+    """Raised when the rate limiter sheds a call: its queue was full, or no token came before its queue deadline."""
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies (seconds) for one call type."""
+
+    def __init__(self, window=200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def count(self):
+        return len(self._samples)
+
+    def percentile(self, q):
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+class CallPolicy:
+    def __init__(self, deadline, attempt_timeout, max_attempts=3, base_backoff=0.2, max_backoff=2.0,
+                 hedge=True, hedge_quantile=0.95, min_hedge_delay=0.5, min_samples=20, priority=PRIORITY_INTERACTIVE):
+        self.deadline = deadline  # Seconds for the whole call, retries included
+        self.attempt_timeout = attempt_timeout  # Seconds before a single attempt is given up and retried
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.min_hedge_delay = min_hedge_delay  # Never hedge sooner than this
+        self.min_samples = min_samples  # Don't hedge until the latency estimate means something
+        self.priority = priority  # Rate limiter class (PRIORITY_*)
+        self.latency = LatencyTracker()
+
+    def hedge_delay(self):
+        """When to fire the hedge request, or None if hedging is off or not warmed up yet."""
+        if not self.hedge or self.latency.count() < self.min_samples:
+            return None
+        return max(self.min_hedge_delay, self.latency.percentile(self.hedge_quantile))
+
+    def backoff(self, attempt):
+        """Full-jitter exponential back-off before retry number `attempt` (1-based)."""
+        return random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** (attempt - 1)))
+
+
+# Deadlines per call type: intent parsing is on the interactive path, summaries can take longer,
+# and background jobs (summary pre-generation) only run on quota nobody else needs
+CALL_POLICIES = {
+    "intent": CallPolicy(deadline=12.0, attempt_timeout=5.0),
+    "summary": CallPolicy(deadline=25.0, attempt_timeout=12.0, priority=PRIORITY_SUMMARY),
+    "background": CallPolicy(deadline=60.0, attempt_timeout=25.0, hedge=False, priority=PRIORITY_BACKGROUND),
+}
+
+
+class PriorityRateLimiter:
+    """Token bucket shared by every LLM request in the process (one API key, one quota).
+
+    Waiting calls are served strictly by priority, first come first served within a
+    priority, and the lower priorities must leave a few tokens in the bucket, so a
+    burst of summaries never leaves an interactive call waiting for it to refill."""
+
+    def __init__(self, requests_per_minute=LLM_RPM, burst=LLM_BURST, queue_limits=QUEUE_LIMITS):
+        self.rate = requests_per_minute / 60.0  # Tokens per second
+        self.capacity = max(1, burst)
+        self.queue_limits = queue_limits
+        # Tokens each priority has to leave for the ones above it
+        reserve = max(1, self.capacity // 4)
+        self.reserve = [min(level * reserve, self.capacity - 1) for level in range(len(PRIORITY_NAMES))]
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._cond = threading.Condition()
+        self._queues = [deque() for _ in PRIORITY_NAMES]
+        self.wait_times = [LatencyTracker() for _ in PRIORITY_NAMES]
+        self.stats = {name: {"granted": 0, "shed": 0, "max_depth": 0} for name in PRIORITY_NAMES}
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _blocked(self, priority, ticket=None):
+        """True if a call ahead (higher priority, or earlier at this one) is waiting."""
+        queue = self._queues[priority]
+        return any(self._queues[p] for p in range(priority)) or (bool(queue) and queue[0] is not ticket)
+
+    def _take(self, priority):
+        if self._tokens >= 1 + self.reserve[priority]:
+            self._tokens -= 1
+            return True
+        return False
+
+    def acquire(self, priority, timeout):
+        """Waits up to `timeout` seconds (capped by the priority's queue limit) for a token.
+        Returns the seconds waited; raises LLMOverloaded if the call is shed."""
+        name = PRIORITY_NAMES[priority]
+        if self.rate <= 0:
+            self.stats[name]["granted"] += 1
+            return 0.0
+        max_wait, max_depth = self.queue_limits[priority]
+        started = time.monotonic()
+        deadline = started + min(timeout, max_wait)
+        ticket = object()
+        with self._cond:
+            queue = self._queues[priority]
+            if len(queue) >= max_depth:
+                self.stats[name]["shed"] += 1
+                raise LLMOverloaded(f"Too many {name} LLM calls waiting")
+            queue.append(ticket)
+            self.stats[name]["max_depth"] = max(self.stats[name]["max_depth"], len(queue))
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if not self._blocked(priority, ticket) and self._take(priority):
+                        break
+                    if now >= deadline:
+                        self.stats[name]["shed"] += 1
+                        raise LLMOverloaded(f"No LLM quota for a {name} call within {now - started:.1f}s")
+                    if self._blocked(priority, ticket):
+                        self._cond.wait(deadline - now)  # Woken when a call ahead leaves the queue
+                    else:
+                        shortfall = 1 + self.reserve[priority] - self._tokens
+                        self._cond.wait(min(deadline - now, shortfall / self.rate))
+            finally:
+                queue.remove(ticket)
+                self._cond.notify_all()
+        waited = time.monotonic() - started
+        self.stats[name]["granted"] += 1
+        self.wait_times[priority].record(waited)
+        return waited
+
+    def try_acquire(self, priority):
+        """Takes a token only if one is free right now (for optional requests such as hedges)."""
+        if self.rate <= 0:
+            return True
+        with self._cond:
+            self._refill(time.monotonic())
+            return not self._blocked(priority) and self._take(priority)
+
+    def penalize(self):
+        """The API said the quota is used up: empty the bucket so nothing goes out until it refills."""
+        with self._cond:
+            self._tokens = min(self._tokens, 0.0)
+
+    def queue_stats(self):
+        """Per priority: granted, shed, current and max queue depth, and p50/p95 wait in ms."""
+        report = {}
+        for priority, name in enumerate(PRIORITY_NAMES):
+            waits = self.wait_times[priority]
+            p50, p95 = waits.percentile(0.5), waits.percentile(0.95)
+            report[name] = {**self.stats[name], "depth": len(self._queues[priority]),
+                            "wait_p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+                            "wait_p95_ms": round(p95 * 1000, 1) if p95 is not None else None}
+        return report
+
+
+rate_limiter = PriorityRateLimiter()
+
+# Counters for reporting (attempts, retries, hedges fired/won, deadline misses, shed calls, input tokens of chat turns)
+policy_stats = {"calls": 0, "attempts": 0, "retries": 0, "hedges": 0, "hedge_wins": 0, "deadline_exceeded": 0,
+                "shed": 0, "quota_errors": 0, "chat_turns": 0, "prompt_tokens": 0, "cached_tokens": 0}
+
+
+def usage_tokens(response):
+    """(input tokens, of which served from a context cache) from a response's usage metadata."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return 0, 0
+    if isinstance(usage, dict):
+        return usage.get("prompt_token_count") or 0, usage.get("cached_content_token_count") or 0
+    return getattr(usage, "prompt_token_count", 0) or 0, getattr(usage, "cached_content_token_count", 0) or 0
+
+
+def _is_retryable(error):
+    return type(error).__name__ not in NON_RETRYABLE_ERRORS
+
+
+def _run_attempt(fn, policy, time_left):
+    """Runs one attempt, hedged if the primary request is slower than the p95."""
+    # Time spent waiting for quota comes out of the attempt's own budget
+    time_left -= rate_limiter.acquire(policy.priority, time_left)
+    if time_left <= 0:
+        raise LLMDeadlineExceeded("No LLM quota before the deadline")
+    started = time.monotonic()
+    primary = _executor.submit(fn, time_left)
+    pending, futures = {primary}, [primary]
+    hedge_delay = policy.hedge_delay()
+    if hedge_delay is not None and hedge_delay < time_left:
+        done, _ = wait(pending, timeout=hedge_delay)
+        # A hedge is optional, so it only goes out if a token is free right away
+        if not done and rate_limiter.try_acquire(policy.priority):
+            policy_stats["hedges"] += 1
+            futures.append(_executor.submit(fn, time_left - hedge_delay))
+            pending = set(futures)
+
+    error = None
+    while pending:
+        remaining = time_left - (time.monotonic() - started)
+        done, pending = wait(pending, timeout=max(0, remaining), return_when=FIRST_COMPLETED)
+        if not done:
+            break  # Out of time; the abandoned requests finish in the background
+        for future in done:
+            if future.exception() is None:
+                policy.latency.record(time.monotonic() - started)
+                if future is not primary:
+                    policy_stats["hedge_wins"] += 1
+                return future.result()
+            error = future.exception()
+            if type(error).__name__ in QUOTA_ERRORS:
+                policy_stats["quota_errors"] += 1
+                rate_limiter.penalize()
+    if error is not None and not pending:
+        raise error
+    raise LLMDeadlineExceeded(f"No response within {time_left:.1f}s")
+
+
+def _call(fn, policy):
+    deadline = time.monotonic() + policy.deadline
+    attempt = 0
+    while True:
+        attempt += 1
+        policy_stats["attempts"] += 1
+        time_left = deadline - time.monotonic()
+        if time_left <= 0:
+            raise LLMDeadlineExceeded(f"No response within {policy.deadline:.1f}s")
+        try:
+            return _run_attempt(fn, policy, min(time_left, policy.attempt_timeout))
+        except Exception as e:
+            timed_out = isinstance(e, LLMDeadlineExceeded)
+            if attempt >= policy.max_attempts or not (timed_out or _is_retryable(e)):
+                raise
+            # A timed-out attempt already waited long enough; only errors back off
+            pause = 0 if timed_out else policy.backoff(attempt)
+            if time.monotonic() + pause >= deadline:
+                raise
+            policy_stats["retries"] += 1
+            time.sleep(pause)
+
+
+def call_with_policy(fn, call_type="intent"):
+    """Calls fn(timeout_seconds) under the policy for call_type and returns its result."""
+    policy_stats["calls"] += 1
+    try:
+        return _call(fn, CALL_POLICIES[call_type])
+    except LLMDeadlineExceeded:
+        policy_stats["deadline_exceeded"] += 1
+        raise
+    except LLMOverloaded:
+        policy_stats["shed"] += 1
+        raise
+
+
+def generate_with_policy(model, prompt, call_type="summary"):
+    """model.generate_content() with the call policy and a per-attempt timeout."""
+    return call_with_policy(lambda timeout: model.generate_content(prompt, request_options={"timeout": timeout}), call_type)
+
+
+def send_chat_message(chat_session, message, call_type="intent"):
+    """chat_session.send_message() with the call policy.
+
+    The history is only extended once a response wins, so a hedged or retried
+    request never leaves duplicate turns in the conversation."""
+    user_turn = {"role": "user", "parts": [message]}
+    contents = list(chat_session.history) + [user_turn]
+    response = call_with_policy(
+        lambda timeout: chat_session.model.generate_content(contents, request_options={"timeout": timeout}), call_type)
+    chat_session.history = list(chat_session.history) + [user_turn, {"role": "model", "parts": [response.text]}]
+    prompt_tokens, cached_tokens = usage_tokens(response)
+    policy_stats["chat_turns"] += 1
+    policy_stats["prompt_tokens"] += prompt_tokens
+    policy_stats["cached_tokens"] += cached_tokens
+    return response
@@ -0,0 +1,219 @@
+# Local stand-in for the Gemini models, used for benchmarks and offline development.
+# Enable it with PULSEVOX_LLM_BACKEND=stub. It mimics the parts of the
+# google.generativeai API PulseVox uses (generate_content, start_chat/send_message,
+# count_tokens, context caches) and simulates network behaviour: a one-off connection setup per
+# client (TCP + TLS handshake), a per-request latency and, optionally, injected
+# faults (a slow tail of requests and transient "503" errors) and a per-key quota
+# (requests past it in any one-second window fail with "429").
+
+import os
+import re
+import json
+import time
+import random
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+
+CONNECT_LATENCY_MS = float(os.getenv("PULSEVOX_STUB_CONNECT_MS", "300"))
+REQUEST_LATENCY_MS = float(os.getenv("PULSEVOX_STUB_LATENCY_MS", "50"))
+# Fault injection: share of requests that are slow, how slow, and share that fail
+SLOW_RATE = float(os.getenv("PULSEVOX_STUB_SLOW_RATE", "0"))
+SLOW_LATENCY_MS = float(os.getenv("PULSEVOX_STUB_SLOW_MS", "3000"))
+ERROR_RATE = float(os.getenv("PULSEVOX_STUB_ERROR_RATE", "0"))
+# Requests per second the simulated API key allows across all clients (0: unlimited)
+QUOTA_RPS = int(os.getenv("PULSEVOX_STUB_QUOTA_RPS", "0"))
+
+
+class ServiceUnavailable(Exception):
+    """Transient server error, like the API's 503."""
+
+
+class DeadlineExceeded(Exception):
+    """The request outlived its timeout, like the API's 504."""
+
+
+class ResourceExhausted(Exception):
+    """Quota exceeded, like the API's 429."""
+
+
+class StubQuota:
+    """Sliding one-second window of requests shared by every client, like one API key's quota."""
+
+    def __init__(self, requests_per_second=QUOTA_RPS):
+        self.requests_per_second = requests_per_second
+        self._sent = deque()
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def take(self):
+        if self.requests_per_second <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            while self._sent and self._sent[0] <= now - 1.0:
+                self._sent.popleft()
+            if len(self._sent) >= self.requests_per_second:
+                self.rejected += 1
+                raise ResourceExhausted("Stub quota exceeded")
+            self._sent.append(now)
+
+
+quota = StubQuota()
+
+
+class StubResponse:
+    def __init__(self, text, prompt_tokens=0, cached_tokens=0):
+        self.text = text
+        self.usage_metadata = {"prompt_token_count": prompt_tokens, "cached_content_token_count": cached_tokens,
+                               "candidates_token_count": len(text.split())}
+
+
+class StubCachedContent:
+    """Drop-in for genai.caching.CachedContent (a system instruction stored server-side)."""
+
+    def __init__(self, model_name, system_instruction=None, ttl=None):
+        self.model_name = model_name
+        self.system_instruction = system_instruction or ""
+        self.ttl = ttl
+
+    def update(self, ttl=None, **kwargs):
+        self.ttl = ttl
+
+
+class StubClient:
+    """Simulated connection: the first request pays the setup cost, later ones reuse it."""
+
+    def __init__(self, connect_latency_ms=None, request_latency_ms=None):
+        self.connect_latency = (CONNECT_LATENCY_MS if connect_latency_ms is None else connect_latency_ms) / 1000
+        self.request_latency = (REQUEST_LATENCY_MS if request_latency_ms is None else request_latency_ms) / 1000
+        self.slow_rate, self.slow_latency, self.error_rate = SLOW_RATE, SLOW_LATENCY_MS / 1000, ERROR_RATE
+        self._connected = False
+        self._lock = threading.Lock()
+        self.request_count = 0
+
+    def call(self, timeout=None):
+        with self._lock:
+            if not self._connected:
+                time.sleep(self.connect_latency)
+                self._connected = True
+            self.request_count += 1
+        quota.take()
+        latency = self.slow_latency if random.random() < self.slow_rate else self.request_latency
+        if timeout is not None and latency > timeout:
+            time.sleep(timeout)
+            raise DeadlineExceeded(f"Stub request timed out after {timeout:.2f}s")
+        time.sleep(latency)
+        if random.random() < self.error_rate:
+            raise ServiceUnavailable("Stub injected a transient error")
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def default_client():
+    """The process-wide StubClient (created, unconnected, on first use)."""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = StubClient()
+        return _default_client
+
+
+def _stub_date(text):
+    today = datetime.now().date()
+    if "parson" in text or "day after tomorrow" in text:
+        return (today + timedelta(days=2)).isoformat()
+    if "kal" in text or "tomorrow" in text:
+        return (today + timedelta(days=1)).isoformat()
+    return today.isoformat()
+
+
+def _stub_time(text):
+    match = re.search(r"\b(\d{1,2})(?::(\d{2}))?\s*(am|pm)?\b", text)
+    if not match:
+        return "19:00" if "shaam" in text or "evening" in text else "09:00"
+    hour, minute = int(match.group(1)) % 24, int(match.group(2) or 0)
+    if match.group(3) == "pm" and hour < 12: hour += 12
+    return f"{hour:02d}:{minute:02d}"
+
+
+def stub_intent(text):
+    """A tiny keyword parser that returns the same JSON shapes as the real intent model."""
+    text = text.lower()
+    date_query, start_time = _stub_date(text), _stub_time(text)
+    if "free slot" in text or "free time" in text or "when am i free" in text:
+        return {"intent": "find_free_slots", "date_query": date_query}
+    if "am i free" in text or "busy at" in text:
+        return {"intent": "query_specific_time", "date_query": date_query, "time_query": start_time}
+    range_days = 7 if ("week" in text or "hafte" in text) else 30 if ("month" in text or "mahine" in text) else 0
+    range_end = (datetime.now().date() + timedelta(days=range_days - 1)).isoformat()
+    if "summar" in text or "plan" in text:
+        if range_days:
+            return {"intent": "summarize_schedule", "date_query": datetime.now().date().isoformat(), "end_date_query": range_end}
+        return {"intent": "summarize_schedule", "date_query": date_query}
+    if range_days:
+        return {"intent": "query_agenda", "date_query": datetime.now().date().isoformat(), "end_date_query": range_end}
+    if "remove" in text or "delete" in text or "cancel" in text:
+        return {"intent": "remove_task", "task_details": {"date": date_query, "start_time": start_time}}
+    if "move" in text or "change" in text or "reschedule" in text:
+        return {"intent": "update_task", "find_details": {"task_description": text.split()[-1]},
+                "update_details": {"start_time": start_time}}
+    if "schedule" in text or "what" in text or "kya" in text:
+        return {"intent": "query_schedule", "date_query": date_query}
+    end_time = (datetime.strptime(start_time, "%H:%M") + timedelta(minutes=30)).strftime("%H:%M")
+    return {"intent": "add_task", "tasks": [{"task_description": text, "date": date_query, "start_time": start_time,
+                                             "end_time": end_time, "category": "Personal"}]}
+
+
+class StubGenerativeModel:
+    """Drop-in for genai.GenerativeModel. Models share one process-wide client, like the SDK's default client."""
+
+    def __init__(self, model_name, system_instruction=None, client=None, **kwargs):
+        self.model_name = model_name
+        self._system_instruction = system_instruction or ""
+        self._client = client or default_client()
+        self._json_output = "JSON" in self._system_instruction and "do NOT output JSON" not in self._system_instruction
+        self._cached_tokens = 0
+
+    @classmethod
+    def from_cached_content(cls, cached_content, generation_config=None):
+        """A model whose system instruction comes from a context cache (and is counted as cached tokens)."""
+        model = cls(cached_content.model_name, system_instruction=cached_content.system_instruction,
+                    generation_config=generation_config)
+        model._cached_tokens = len(model._system_instruction.split())
+        return model
+
+    def generate_content(self, contents, request_options=None, **kwargs):
+        self._client.call((request_options or {}).get("timeout"))
+        prompt = contents if isinstance(contents, str) else json.dumps(contents, default=str)
+        if self._json_output:
+            # The command is the last part of the newest turn (a date preamble part may come before it)
+            last_message = contents if isinstance(contents, str) else str(contents[-1]["parts"][-1])
+            text = json.dumps(stub_intent(last_message))
+        else:
+            text = "You have a fairly relaxed day with a few tasks spread out."
+            # Batched summary requests get one '### YYYY-MM-DD' section per day, like the real model
+            dates = re.findall(r"^### (\d{4}-\d{2}-\d{2})$", prompt, re.M) if isinstance(contents, str) else []
+            if dates:
+                text = "\n\n".join(f"### {d}\n{text}" for d in dates)
+        return StubResponse(text, prompt_tokens=len((self._system_instruction + prompt).split()), cached_tokens=self._cached_tokens)
+
+    def count_tokens(self, contents, **kwargs):
+        self._client.call()
+        return {"total_tokens": len(str(contents).split())}
+
+    def start_chat(self, history=None):
+        return StubChatSession(self, history)
+
+
+class StubChatSession:
+    def __init__(self, model, history=None):
+        self.model = model
+        self.history = list(history or [])
+
+    def send_message(self, content, **kwargs):
+        response = self.model.generate_content(content, **kwargs)
+        self.history += [{"role": "user", "parts": [content]}, {"role": "model", "parts": [response.text]}]
+        return response
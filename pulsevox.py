@@ -1,110 +1,78 @@
 import os
-import json
-from datetime import datetime
-import speech_recognition as sr
-from gtts import gTTS
-from rich.console import Console
-from rich.panel import Panel
-from rich.syntax import Syntax
-from dotenv import load_dotenv
-import google.generativeai as genai
-
-load_dotenv()
-API_KEY = os.getenv("GEMINI_API_KEY")
-# if not API_KEY:
-#     print("ERROR: GEMINI_API_KEY is not set or couldn't be found in .env file.")
-#     # exit()
-
-genai.configure(api_key=API_KEY)
-TASK_FILE = "tasks.json" 
-console = Console()
-
-# System Prompt (The "Brain's" Rules)
-# UPDATED with Hinglish, Category, and Summarize rules
-system_prompt = f"""
-You are an expert task parsing engine. Your job is to extract events and intents from a user's command.
-The output must be a single, valid JSON object.
-
-CONTEXT: The current date is {datetime.now().strftime('%A, %B %d, %Y')}.
-
-CRITICAL: Use the conversation history to resolve pronouns or ambiguous commands. 
-For example, if the user says "add a call at 6" and then "move it to 7", you must understand "it" refers to the "call at 6".
-
-CRITICAL: The user may speak in Hinglish (a mix of Hindi and English). Your job is to understand the command and extract the English entities (like 'call mom' or 'tomorrow at 6').
-
-CRITICAL (Hinglish Time): The user will use Hindi words for time. You MUST interpret these and map them to the correct date.
-- 'aaj' = today.
-- 'kal' = 'tomorrow' . *For scheduling, "kal" ALWAYS means tomorrow, not yesterday.*
-- 'parson' = 'day after tomorrow'.
-- 'shaam ko' = 'in the evening' (e.g., 19:00).
-- 'subah' = 'in the morning' (e.g., 09:00).
-- 'dopahar ko' = 'in the afternoon' (e.g., 14:00).
-Example 1: "kal shaam ko karaoke" means "karaoke tomorrow in the evening".
-Example 2: "parson subah meeting" means "meeting day after tomorrow in the morning".
-
-First, determine the user's "intent". It must be one of: "add_task", "query_schedule", "query_specific_time", "remove_task", "update_task", or "summarize_schedule".
-
-- If "add_task": Respond with a "tasks" list. 
-  Each task MUST use keys: "task_description", "date", "start_time", "end_time", and "category".
-  The "category" MUST be one of: 'Work', 'Personal', 'Errand', or 'Social'.
-  Example: {{"intent": "add_task", "tasks": [{{"task_description": "Call Mom", "date": "2025-10-28", "start_time": "17:00", "end_time": "17:30", "category": "Personal"}}]}}
-
-- If "query_schedule" (e.g., "what's on my schedule tomorrow?"): Respond with: 
-  {{"intent": "query_schedule", "date_query": "YYYY-MM-DD"}}
-
-- If "query_specific_time" (e.g., "am I free at 6pm?"): Respond with: 
-  {{"intent": "query_specific_time", "date_query": "YYYY-MM-DD", "time_query": "HH:MM"}}
-
-- If "summarize_schedule" (e.g., "summarize my day", "what's my plan?"): Respond with:
-  {{"intent": "summarize_schedule", "date_query": "YYYY-MM-DD"}}
-
-- If "remove_task" (e.g., "remove my 6pm call"): Respond with details.
-  Example 1: {{"intent": "remove_task", "task_details": {{"date": "2025-10-27", "start_time": "18:00"}}}}
-
-- If "update_task" (e.g., "move my 6pm call to 7"): 
-  You MUST find the original task using context.
-  You MUST extract the *new* details.
-  The output MUST have two keys: "find_details" (to locate the old task) and "update_details" (the new info).
-  Example 1: {{"intent": "update_task", "find_details": {{"task_description": "call", "start_time": "18:00"}}, "update_details": {{"start_time": "19:00", "end_time": "19:30"}}}}
-
-CRITICAL RULES FOR TIME EXTRACTION:
-1. Resolve all relative dates ("tomorrow", "today").
-2. Handle Durations: "from 6pm to 8pm" -> start_time "18:00", end_time "20:00".
-3. Default Duration: "at 6pm" -> start_time "18:00", end_time "18:30".
-
-The user's command will follow. Respond ONLY with the valid JSON object.
-"""
-
-# llm_model = genai.GenerativeModel(
-#     'models/gemini-2.5-flash',
-#     system_instruction=system_prompt
-# )
-# chat_session = llm_model.start_chat(history=[])
+import sys
+from datetime import datetime, timedelta
+import heapq
+import threading
+from task_store import task_file_for, task_transaction, read_tasks, write_tasks, TaskStoreBusyError
+from store_feed import feed_for, watch_store
+from llm import SharedModels
+from llm_policy import send_chat_message, LLMOverloaded
+from intent_schema import parse_intent_response, IntentParseError
+from task_archive import archive_dir_for, append_to_archive, query_archive, archived_partitions, DEFAULT_QUERY_COLUMNS
+from summary_cache import get_summary, cached_summary, peek_summary, prewarm_summaries, local_summary
+from task_logic import (
+    get_task_description,
+    assign_task_ids,
+    check_for_conflicts,
+    build_free_slot_response,
+    TaskDateIndex,
+    task_sort_key,
+    build_agenda_response,
+    group_by_date,
+    ConflictIndex,
+    new_task_id,
+)
+
+# Heavy dependencies (speech_recognition, TTS engines, rich, google.generativeai, numpy) are
+# imported where they are used, so importing this module stays cheap for app.py and tools.
+
+class _LazyConsole:
+    """Creates the rich Console on first use."""
+    _console = None
+
+    def __getattr__(self, name):
+        if _LazyConsole._console is None:
+            from rich.console import Console
+            _LazyConsole._console = Console()
+        return getattr(_LazyConsole._console, name)
+
+# Each user/tenant gets their own shard; without PULSEVOX_USER the shared tasks.json is used
+TASK_FILE = task_file_for(os.getenv("PULSEVOX_USER"))
+console = _LazyConsole()
+
+# Tasks dated more than this many days ago are moved to the columnar archive
+ARCHIVE_AFTER_DAYS = int(os.getenv("PULSEVOX_ARCHIVE_AFTER_DAYS", "30"))
+# How often the background job refreshes today's and tomorrow's summaries (0 disables it)
+SUMMARY_PREWARM_SECONDS = int(os.getenv("PULSEVOX_SUMMARY_PREWARM_SECONDS", "600"))
+# Set to 0 to turn off spoken/notified reminders at task start times
+REMINDERS_ENABLED = os.getenv("PULSEVOX_REMINDERS", "1") != "0"
+# Longest range a multi-day summary covers (one batched summarizer request)
+MAX_SUMMARY_RANGE_DAYS = 31
 
 llm_model = None
 chat_session = None
 summarizer_model = None
 
-summarizer_system_prompt = "You are a helpful assistant. You answer user requests in natural, conversational language. You do NOT output JSON."
-# summarizer_model = genai.GenerativeModel(
-#     'models/gemini-2.5-flash',
-#     system_instruction=summarizer_system_prompt
-# )
-
 def speak(text, lang='en'):
-    """Converts text to speech and plays it."""
+    """Converts text to speech (with the fastest working TTS backend) and plays it."""
     try:
+        import tempfile
         from playsound import playsound
-        tts = gTTS(text=text, lang=lang, slow=False)
-        filename = "response.mp3"
-        tts.save(filename)
-        playsound(filename)
-        os.remove(filename)
+        from tts import synthesize
+        audio = synthesize(text, lang)
+        fd, filename = tempfile.mkstemp(suffix=f".{audio.format}")
+        with os.fdopen(fd, "wb") as f:
+            f.write(audio.data)
+        try:
+            playsound(filename)
+        finally:
+            os.remove(filename)
     except Exception as e:
         console.print(f"[bold red]Error in text-to-speech: {e}[/bold red]")
 
 def listen_for_command():
     """Listens for a command from the user and returns the transcribed text."""
+    import speech_recognition as sr
     r = sr.Recognizer()
     with sr.Microphone() as source:
         r.adjust_for_ambient_noise(source, duration=1)
@@ -125,73 +93,121 @@ def listen_for_command():
         return None
 
 def get_llm_response(transcribed_text):
-    """Sends transcribed text to the global chat session and gets structured task data."""
+    """Sends transcribed text to the global chat session and returns the raw (schema-constrained) JSON text."""
     console.print("[yellow]Analyzing with PulseVox Engine...[/yellow]")
     try:
-        response = chat_session.send_message(transcribed_text)
-        json_response_text = response.text.strip().lstrip("```json").rstrip("```").strip()
-        return json_response_text
+        response = send_chat_message(chat_session, transcribed_text)
+        return response.text.strip()
+    except LLMOverloaded:
+        console.print("[bold yellow]PulseVox is handling too many requests right now; please try again in a moment.[/bold yellow]")
+        return None
     except Exception as e:
         console.print(f"[bold red]LLM API Error: {e}[/bold red]")
         return None
 
-def get_task_description(task_dict, fallback="an unnamed task"):
-    """Gets the task description from various possible keys."""
-    if not task_dict: return fallback
-    return task_dict.get('task_description') or \
-           task_dict.get('task') or \
-           task_dict.get('title') or \
-           task_dict.get('description') or \
-           fallback
-
-def load_all_tasks():
-    """Loads all tasks from the JSON file."""
-    if os.path.exists(TASK_FILE):
-        with open(TASK_FILE, 'r') as f:
-            try: 
-                return json.load(f)
-            except json.JSONDecodeError: 
-                return []
-    return []
-
-def save_all_tasks(all_tasks):
-    """Saves the entire task list back to the JSON file."""
+def load_all_tasks(task_file=None):
+    """Loads all tasks from the JSON file (the user's shard if one is given).
+
+    A store with tasks saved before ids existed is rewritten once with ids, before any
+    edit, so removing one of several identical legacy tasks can't shift the others' keys."""
+    task_file = task_file or TASK_FILE
+    all_tasks = read_tasks(task_file)
+    if any(isinstance(task, dict) and not task.get('id') for task in all_tasks):
+        try:
+            with task_transaction(task_file):
+                all_tasks = read_tasks(task_file)
+                if assign_task_ids(all_tasks):
+                    write_tasks(all_tasks, task_file)
+        except TaskStoreBusyError:
+            pass  # Keys are still deterministic; the next load migrates
+    return all_tasks
+
+def save_all_tasks(all_tasks, task_file=None):
+    """Saves the entire task list back to the JSON file, atomically and under the file lock."""
     try:
-        with open(TASK_FILE, 'w') as f:
-            json.dump(all_tasks, f, indent=4)
+        write_tasks(all_tasks, task_file or TASK_FILE)
         return True
     except Exception as e:
         console.print(f"[bold red]Error saving tasks: {e}[/bold red]")
         return False
 
-def check_for_conflicts(new_task, all_tasks):
-    """Checks if a new task conflicts with any existing tasks on the same day."""
-    if not all(k in new_task for k in ["date", "start_time", "end_time"]): return None
-    time_format = "%H:%M"
-    try:
-        new_start = datetime.strptime(new_task["start_time"], time_format).time()
-        new_end = datetime.strptime(new_task["end_time"], time_format).time()
-    except ValueError:
-        return None 
-    for existing_task in all_tasks:
-        if existing_task.get("date") == new_task.get("date") and all(k in existing_task for k in ["start_time", "end_time"]):
-            try:
-                existing_start = datetime.strptime(existing_task["start_time"], time_format).time()
-                existing_end = datetime.strptime(existing_task["end_time"], time_format).time()
-                if new_start < existing_end and new_end > existing_start:
-                    return existing_task
-            except ValueError:
-                continue
-    return None
+def _is_archivable(task, cutoff_date):
+    task_date = task.get('date')
+    return isinstance(task_date, str) and len(task_date) == 10 and task_date < cutoff_date
+
+def archive_old_tasks(task_file=None, cutoff_date=None):
+    """Moves tasks dated before the cutoff (default: ARCHIVE_AFTER_DAYS ago) into the columnar archive."""
+    task_file = task_file or TASK_FILE
+    cutoff_date = cutoff_date or (datetime.now().date() - timedelta(days=ARCHIVE_AFTER_DAYS)).isoformat()
+    with task_transaction(task_file):
+        all_tasks = load_all_tasks(task_file)
+        old_tasks = [task for task in all_tasks if _is_archivable(task, cutoff_date)]
+        if not old_tasks:
+            return 0
+        # Archive first: a crash in between leaves the tasks in both places, never lost, and the
+        # next run's append skips the ones already archived
+        archived = append_to_archive(old_tasks, archive_dir_for(task_file), get_task_description)
+        if not save_all_tasks([task for task in all_tasks if not _is_archivable(task, cutoff_date)], task_file):
+            return 0
+    return archived
+
+def get_tasks_for_date(date_query, task_file=None, all_tasks=None):
+    """Returns the tasks on a date from the hot store plus any archived history for it."""
+    task_file = task_file or TASK_FILE
+    if all_tasks is None:
+        all_tasks = load_all_tasks(task_file)
+    tasks_for_date = [task for task in all_tasks if task.get('date') == date_query]
+    if isinstance(date_query, str) and date_query:
+        tasks_for_date += query_archive(archive_dir_for(task_file), date_query)
+    return tasks_for_date
+
+_date_indexes = {}  # task_file -> (feed version, TaskDateIndex)
+_date_index_lock = threading.Lock()
+
+def hot_date_index(task_file=None):
+    """The date index over the hot store, kept current by applying the store's change feed."""
+    task_file = task_file or TASK_FILE
+    feed = feed_for(task_file)
+    feed.refresh()  # Just a stat() unless another process rewrote the file
+    with _date_index_lock:
+        cached = _date_indexes.get(task_file)
+        changes = feed.changes_since(cached[0]) if cached else None
+        if changes is None:
+            cached = (feed.version, TaskDateIndex(feed.keyed()))
+        elif changes[0] != cached[0]:
+            version, upserts, removed = changes
+            index = cached[1].copy()  # Other threads may be reading the current one
+            index.apply(upserts, removed)
+            cached = (version, index)
+        _date_indexes[task_file] = cached
+    return cached[1]
+
+def get_tasks_for_range(start_date, end_date, task_file=None):
+    """Returns the tasks dated in [start_date, end_date], sorted by date and start time.
+
+    The hot store is binary-searched through its date index and only the archive's
+    month partitions in range are read; both come back sorted, so they're merged."""
+    task_file = task_file or TASK_FILE
+    if end_date < start_date:
+        start_date, end_date = end_date, start_date
+    hot_tasks = hot_date_index(task_file).between(start_date, end_date)
+    archived_tasks = query_archive(archive_dir_for(task_file), start_date, end_date)
+    if not archived_tasks:
+        return list(hot_tasks)
+    return list(heapq.merge(archived_tasks, hot_tasks, key=task_sort_key))
+
+def answer_agenda_query(start_date, end_date):
+    """Speaks the agenda for a range of days, grouped by day."""
+    response_text = build_agenda_response(get_tasks_for_range(start_date, end_date), start_date, end_date)
+    console.print(f"[bold green]Assistant Response:[/bold green] {response_text}"); speak(response_text)
 
 def answer_schedule_query(date_query):
     """Reads tasks.json and answers questions about the schedule in chronological order."""
     all_tasks = load_all_tasks()
-    if not all_tasks: 
+    tasks_for_date = get_tasks_for_date(date_query, all_tasks=all_tasks)
+    if not all_tasks and not tasks_for_date: 
         speak("You don't have any tasks saved yet."); return
     
-    tasks_for_date = [task for task in all_tasks if task.get('date') == date_query]
-    
     if not tasks_for_date:
         response_text = f"You have nothing scheduled for {date_query}."
     else:
@@ -222,7 +238,8 @@ def answer_schedule_query(date_query):
 def answer_specific_time_query(date_query, time_query):
     """Checks for a task at a specific time and responds."""
     all_tasks = load_all_tasks()
-    if not all_tasks: 
+    tasks_for_date = get_tasks_for_date(date_query, all_tasks=all_tasks)
+    if not all_tasks and not tasks_for_date: 
         speak("You don't have any tasks saved yet."); return
 
     try:
@@ -231,7 +248,7 @@ def answer_specific_time_query(date_query, time_query):
         speak(f"Sorry, I didn't understand the time {time_query}."); return
 
     found_task = None
-    for task in all_tasks:
+    for task in tasks_for_date:
         if task.get("date") == date_query and all(k in task for k in ["start_time", "end_time"]):
             try:
                 start_time = datetime.strptime(task["start_time"], time_format).time(); end_time = datetime.strptime(task["end_time"], time_format).time()
@@ -250,12 +267,17 @@ def answer_specific_time_query(date_query, time_query):
         response_text = f"You appear to be free at {natural_query_time} on {date_query}."
     console.print(f"[bold green]Assistant Response:[/bold green] {response_text}"); speak(response_text)
 
-def handle_task_removal(task_details, all_tasks):
+def answer_free_slot_query(date_query, end_date_query=None, min_duration_minutes=0):
+    """Finds the free intervals for a day or a date range and speaks them."""
+    response_text = build_free_slot_response(load_all_tasks(), date_query, end_date_query, min_duration_minutes)
+    console.print(f"[bold green]Assistant Response:[/bold green] {response_text}"); speak(response_text)
+
+def handle_task_removal(task_details, all_tasks, task_file=None):
     """Finds and removes the *best matching* task from the JSON file."""
     if not task_details:
         return "Sorry, I didn't catch the details of the task you want to remove."
 
-    desc_to_match = (task_details.get('task_description') or task_details.get('title') or task_details.get('description') or "").lower()
+    desc_to_match = (task_details.get('task_description') or "").lower() # Field names are normalized by intent_schema
     time_to_match = task_details.get('start_time')
     date_to_match = task_details.get('date') 
     best_score, best_match_index = -1, -1
@@ -285,14 +307,14 @@ def handle_task_removal(task_details, all_tasks):
     if best_match_index != -1 and best_score >= 10:
         removed_task = all_tasks.pop(best_match_index)
         task_desc = get_task_description(removed_task)
-        if save_all_tasks(all_tasks):
+        if save_all_tasks(all_tasks, task_file):
             return f"Okay, I've removed '{task_desc}' from your schedule."
         else:
             return "Found task, but failed to save updated file."
     else:
         return "Sorry, I couldn't find that specific task to remove."
 
-def handle_task_update(find_details, update_details, all_tasks):
+def handle_task_update(find_details, update_details, all_tasks, task_file=None):
     """Finds the best-matching task and applies updates."""
     if not find_details or not update_details:
         return "Sorry, I didn't catch what you wanted to change or what you wanted to change it to."
@@ -334,7 +356,7 @@ def handle_task_update(find_details, update_details, all_tasks):
         for key, value in update_details.items():
             task_to_update[key] = value
         
-        if save_all_tasks(all_tasks):
+        if save_all_tasks(all_tasks, task_file):
             updated_desc = get_task_description(task_to_update)
             return f"Okay, I've updated '{original_desc}' to '{updated_desc}'."
         else:
@@ -346,45 +368,233 @@ def handle_task_update(find_details, update_details, all_tasks):
 def handle_summarization(date_query):
     """Loads tasks for a day and asks the SUMMARIZER LLM to review them."""
     all_tasks = load_all_tasks()
-    if not all_tasks: 
+    tasks_for_date = get_tasks_for_date(date_query, all_tasks=all_tasks)
+    if not all_tasks and not tasks_for_date: 
         return "You don't have any tasks saved yet."
     
-    tasks_for_date = [task for task in all_tasks if task.get('date') == date_query]
-    
     if not tasks_for_date:
         return f"You have nothing scheduled for {date_query}."
     
-    # Prepare a simple list of tasks for the summarizer
-    tasks_for_date.sort(key=lambda x: datetime.strptime(x.get('start_time', '00:00'), "%H:%M"))
-    task_descriptions = []
-    for task in tasks_for_date:
-        desc = get_task_description(task)
-        start = task.get('start_time', 'all day')
-        task_descriptions.append(f"- {desc} at {start}")
-    
-    tasks_str = "\n".join(task_descriptions)
-    
-    # Send to the separate SUMMARIZER model
+    # Unchanged days are answered from the summary cache; otherwise ask the SUMMARIZER model
     console.print("[yellow]Generating summary...[/yellow]")
     try:
-        summary_prompt = (f"Here is a list of my tasks for {date_query}:\n{tasks_str}\n\n"
-                          f"Please write a brief, natural language summary of my day (in one or two sentences).")
-        
-        # Use the new, "vanilla" model that isn't locked to JSON output
-        response = summarizer_model.generate_content(summary_prompt) 
-        
-        return response.text.strip()
+        return get_summary(TASK_FILE, date_query, tasks_for_date, summarizer_model)
+    except Exception as e:
+        console.print(f"[bold red]Summarization LLM Error: {e}[/bold red]")
+        return "I found your tasks but had trouble summarizing them."
+
+def summarize_range(start_date, end_date, model, task_file=None):
+    """Summarizes each busy day in a range; days not cached yet are summarized in one batched request."""
+    task_file = task_file or TASK_FILE
+    end_date = min(end_date, (datetime.strptime(start_date, "%Y-%m-%d").date()
+                              + timedelta(days=MAX_SUMMARY_RANGE_DAYS - 1)).isoformat())
+    groups = group_by_date(get_tasks_for_range(start_date, end_date, task_file))
+    if not groups:
+        return f"You have nothing scheduled between {start_date} and {end_date}."
+    # Days already cached are hits; the rest are generated in one batched request
+    summaries = {day: cached_summary(task_file, day, tasks) for day, tasks in groups}
+    missing = {day: tasks for day, tasks in groups if summaries[day] is None}
+    if missing:
+        try:
+            prewarm_summaries(task_file, missing, model)
+            summarize_day = get_summary
+        except LLMOverloaded:
+            # No quota for the batch, so don't queue one call per day either: answer the uncached days locally
+            summarize_day = lambda task_file, day, tasks, model: local_summary(tasks)
+        for day, tasks in missing.items():
+            summaries[day] = peek_summary(task_file, day, tasks) or summarize_day(task_file, day, tasks, model)
+    day_summaries = []
+    for day, tasks in groups:
+        summary = summaries[day]
+        day_summaries.append(f"{datetime.strptime(day, '%Y-%m-%d').strftime('%A')} ({day}): {summary}")
+    return " ".join(day_summaries)
+
+def handle_range_summarization(start_date, end_date):
+    """CLI wrapper around summarize_range()."""
+    console.print("[yellow]Generating summary...[/yellow]")
+    try:
+        return summarize_range(start_date, end_date, summarizer_model)
+    except ValueError:
+        return "Sorry, I couldn't understand the dates you asked about."
     except Exception as e:
         console.print(f"[bold red]Summarization LLM Error: {e}[/bold red]")
         return "I found your tasks but had trouble summarizing them."
 
+def prewarm_daily_summaries(model, task_file=None, days=2):
+    """Caches summaries for today and the following days with one batched, background-priority summarizer request."""
+    task_file = task_file or TASK_FILE
+    all_tasks = load_all_tasks(task_file)
+    today = datetime.now().date()
+    dates = [(today + timedelta(days=offset)).isoformat() for offset in range(days)]
+    return prewarm_summaries(task_file, {d: get_tasks_for_date(d, task_file, all_tasks) for d in dates}, model, "background")
+
+def start_summary_prewarmer(model, task_file=None, interval=None):
+    """Runs prewarm_daily_summaries every `interval` seconds on a daemon thread. Returns the thread."""
+    import time
+    interval = SUMMARY_PREWARM_SECONDS if interval is None else interval
+
+    def loop():
+        while True:
+            try:
+                prewarm_daily_summaries(model, task_file)
+            except Exception:
+                pass  # Best effort: a missed refresh just means the next summary is generated on demand
+            time.sleep(interval)
+
+    thread = threading.Thread(target=loop, name="pulsevox-summary-prewarm", daemon=True)
+    thread.start()
+    return thread
+
+
+def start_reminder_service(on_due, task_file=None):
+    """Starts the background reminder service for a task file and returns it."""
+    from reminders import ReminderService
+    return ReminderService(watch_store(task_file or TASK_FILE), on_due).start()
+
+def announce_reminder(task):
+    """Reminder callback for the CLI: print and speak it."""
+    from reminders import reminder_text
+    text = reminder_text(task)
+    console.print(f"\n[bold magenta]⏰ {text}[/bold magenta]"); speak(text)
+
+def announce_store_change(event):
+    """Change-feed listener for the CLI: mentions edits made outside this process (e.g. in the web app)."""
+    if event.external:
+        console.print(f"\n[dim]Schedule updated elsewhere: {len(event.added)} added, "
+                      f"{len(event.updated)} updated, {len(event.removed)} removed.[/dim]")
+
+def import_ics(ics_path, task_file=None, allow_conflicts=False):
+    """Imports the events of an .ics file as tasks. Returns a stats dict.
+
+    Events are parsed one at a time and checked against a per-day index of the
+    store (plus what was imported so far), so conflict detection stays cheap for
+    large calendars. Only the archive months the events fall in are read. Conflicting
+    events are skipped unless allow_conflicts is set; events already imported (same UID)
+    are skipped as duplicates."""
+    from ics_io import iter_ics_events, event_to_task
+    task_file = task_file or TASK_FILE
+    stats = {"events": 0, "imported": 0, "conflicts": 0, "duplicates": 0, "unusable": 0, "conflict_examples": []}
+    with task_transaction(task_file, timeout=60):
+        all_tasks = load_all_tasks(task_file)
+        conflicts = ConflictIndex(all_tasks)
+        known_uids = {task['ics_uid'] for task in all_tasks if task.get('ics_uid')}
+        # Imported events can be in the past, so archived tasks count for conflicts and UIDs too;
+        # a month's partition is read the first time an event falls in it, not the whole archive
+        archive_dir = archive_dir_for(task_file)
+        unread_months = set(archived_partitions(archive_dir, "0000-01-01", "9999-12-31"))
+        new_tasks, imported_at = [], datetime.now().isoformat()
+        with open(ics_path, encoding="utf-8", errors="replace", newline="") as ics_file:
+            for event in iter_ics_events(ics_file):
+                stats["events"] += 1
+                task = event_to_task(event)
+                if task is None:
+                    stats["unusable"] += 1; continue
+                month = task['date'][:7]
+                if month in unread_months:
+                    unread_months.discard(month)
+                    for archived in query_archive(archive_dir, f"{month}-01", f"{month}-31",
+                                                  columns=['task_description', 'date', 'start_time', 'end_time', 'extra']):
+                        conflicts.add(archived)
+                        if archived.get('ics_uid'): known_uids.add(archived['ics_uid'])
+                if task.get('ics_uid') in known_uids:
+                    stats["duplicates"] += 1; continue
+                conflicting_task = conflicts.find_conflict(task)
+                if conflicting_task and not allow_conflicts:
+                    stats["conflicts"] += 1
+                    if len(stats["conflict_examples"]) < 5:
+                        stats["conflict_examples"].append((get_task_description(task), get_task_description(conflicting_task), task['date']))
+                    continue
+                task['id'] = new_task_id(); task['timestamp'] = imported_at; task['status'] = 'pending'
+                conflicts.add(task)
+                if task.get('ics_uid'): known_uids.add(task['ics_uid'])
+                new_tasks.append(task)
+        if new_tasks and save_all_tasks(all_tasks + new_tasks, task_file):
+            stats["imported"] = len(new_tasks)
+    if stats["imported"]:
+        archive_old_tasks(task_file)  # Past events go straight on to the archive
+    return stats
+
+def iter_tasks_for_export(task_file=None, start_date=None, end_date=None):
+    """Yields archived tasks one month partition at a time, then the hot store's tasks.
+    Archived tasks keep their timestamp and extra fields, so their UIDs survive archiving."""
+    task_file = task_file or TASK_FILE
+    start_date, end_date = start_date or "0000-01-01", end_date or "9999-12-31"
+    archive_dir = archive_dir_for(task_file)
+    columns = DEFAULT_QUERY_COLUMNS + ['timestamp', 'extra']
+    for partition in archived_partitions(archive_dir, start_date, end_date):
+        yield from query_archive(archive_dir, max(start_date, f"{partition}-01"), min(end_date, f"{partition}-31"), columns=columns)
+    yield from hot_date_index(task_file).between(start_date, end_date)
+
+def export_ics(ics_path, task_file=None, start_date=None, end_date=None):
+    """Streams tasks (optionally only a date range) out to an .ics file. Returns the event count."""
+    from ics_io import write_ics
+    temp_path = f"{ics_path}.tmp"
+    with open(temp_path, "w", encoding="utf-8", newline="") as ics_file:
+        written = write_ics(iter_tasks_for_export(task_file, start_date, end_date), ics_file)
+    os.replace(temp_path, ics_path)
+    return written
+
+def run_tool_command(argv):
+    """Non-interactive commands: `python pulsevox.py import-ics FILE` / `export-ics FILE`."""
+    import argparse
+    parser = argparse.ArgumentParser(prog="pulsevox", description="PulseVox calendar tools.")
+    parser.add_argument("--user", default=os.getenv("PULSEVOX_USER"), help="task shard to use (default: PULSEVOX_USER)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_parser = commands.add_parser("import-ics", help="import events from an .ics file")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--allow-conflicts", action="store_true", help="import events that overlap existing tasks")
+    export_parser = commands.add_parser("export-ics", help="export tasks to an .ics file")
+    export_parser.add_argument("path")
+    export_parser.add_argument("--from", dest="start_date", help="first date (YYYY-MM-DD)")
+    export_parser.add_argument("--to", dest="end_date", help="last date (YYYY-MM-DD)")
+    args = parser.parse_args(argv)
+
+    task_file = task_file_for(args.user)
+    try:
+        if args.command == "import-ics":
+            stats = import_ics(args.path, task_file, args.allow_conflicts)
+            console.print(f"[bold green]Imported {stats['imported']} of {stats['events']} events into {task_file}.[/bold green] "
+                          f"Skipped: {stats['conflicts']} conflicting, {stats['duplicates']} already imported, "
+                          f"{stats['unusable']} cancelled or undated.")
+            for new_desc, existing_desc, day in stats["conflict_examples"]:
+                console.print(f"[yellow]  Conflict on {day}: '{new_desc}' overlaps '{existing_desc}'.[/yellow]")
+        else:
+            written = export_ics(args.path, task_file, args.start_date, args.end_date)
+            console.print(f"[bold green]Exported {written} tasks from {task_file} to {args.path}.[/bold green]")
+    except (OSError, TaskStoreBusyError) as e:
+        console.print(f"[bold red]Error: {e}[/bold red]")
+        return 1
+    return 0
+
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(run_tool_command(sys.argv[1:]))
+
+    from rich.panel import Panel
+    from rich.syntax import Syntax
+
     console.print(Panel.fit("[bold magenta]Welcome to PulseVox 🗣️✨[/bold magenta]\nYour Command-Line Planning Assistant"))
 
-    llm_model = genai.GenerativeModel('models/gemini-2.5-flash', system_instruction=system_prompt)
-    chat_session = llm_model.start_chat(history=[])
-    summarizer_model = genai.GenerativeModel('models/gemini-2.5-flash', system_instruction=summarizer_system_prompt)
+    # Open the Gemini connections in the background while the microphone calibrates
+    models = SharedModels()
+    models.warm_up(background=True)
+    llm_model = models.intent_model()
+    chat_session = models.start_chat()
+    summarizer_model = models.summarizer_model()
+
+    # Keep the hot store small: move old tasks to the archive before the first command
+    try:
+        archived_count = archive_old_tasks()
+    except TaskStoreBusyError:
+        archived_count = 0  # Another session is saving; archiving waits for the next start
+    if archived_count:
+        console.print(f"[dim]Archived {archived_count} past task(s).[/dim]")
+    if SUMMARY_PREWARM_SECONDS > 0:
+        start_summary_prewarmer(summarizer_model)
+    watch_store(TASK_FILE).add_listener(announce_store_change)
+    if REMINDERS_ENABLED:
+        start_reminder_service(announce_reminder)
     
     while True:
         command = listen_for_command()
@@ -402,10 +612,9 @@ if __name__ == "__main__":
                 syntax = Syntax(json_tasks_str, "json", theme="monokai", line_numbers=True); console.print(syntax)
                 
                 try:
-                    response_data = json.loads(json_tasks_str)
+                    response_data = parse_intent_response(json_tasks_str) # Validates, repairs and normalizes locally
                     intent = response_data.get("intent", "")
                     response_text = "" # To store the spoken response
-                    all_tasks = load_all_tasks() # Load tasks once per command
 
                     if intent == "query_specific_time":
                         if not all(k in response_data for k in ["date_query", "time_query"]):
@@ -419,22 +628,41 @@ if __name__ == "__main__":
                         else:
                             answer_schedule_query(response_data.get("date_query"))
                     
+                    elif intent == "query_agenda":
+                        if not response_data.get("date_query"):
+                            response_text = "I understood you were asking about your agenda, but I missed which days."
+                        else:
+                            answer_agenda_query(response_data["date_query"],
+                                                response_data.get("end_date_query") or response_data["date_query"])
+
+                    elif intent == "find_free_slots":
+                        if not response_data.get("date_query"):
+                            response_text = "I understood you were looking for free time, but I missed which day."
+                        else:
+                            answer_free_slot_query(response_data.get("date_query"), response_data.get("end_date_query"),
+                                                   response_data.get("min_duration_minutes") or 0)
+
                     # Handle Summarization
                     elif intent == "summarize_schedule":
                         date_query = response_data.get("date_query")
                         if not date_query:
                             response_text = "I understood you wanted a summary, but I missed which day."
+                        elif response_data.get("end_date_query", date_query) != date_query:
+                            response_text = handle_range_summarization(date_query, response_data["end_date_query"])
                         else:
                             response_text = handle_summarization(date_query)
                     
                     elif intent == "remove_task":
                         task_details = response_data.get("task_details")
-                        response_text = handle_task_removal(task_details, all_tasks)
+                        # Load-modify-save under the file lock so edits from other sessions aren't lost
+                        with task_transaction(TASK_FILE):
+                            response_text = handle_task_removal(task_details, load_all_tasks())
                     
                     elif intent == "update_task":
                         find_details = response_data.get("find_details")
                         update_details = response_data.get("update_details")
-                        response_text = handle_task_update(find_details, update_details, all_tasks)
+                        with task_transaction(TASK_FILE):
+                            response_text = handle_task_update(find_details, update_details, load_all_tasks())
                             
                     elif intent == "add_task":
                         # Category is now automatically handled by the LLM
@@ -442,28 +670,30 @@ if __name__ == "__main__":
                         if not new_tasks:
                             response_text = "I understood you wanted to add a task, but I couldn't extract the details."
                         else:
-                            conflict_found = False
-                            tasks_to_add = []
-                            for task in new_tasks:
-                                task['timestamp'] = datetime.now().isoformat(); task['status'] = 'pending'
-                                conflicting_task = check_for_conflicts(task, all_tasks + tasks_to_add) 
-                                if conflicting_task:
-                                    conflict_desc = get_task_description(conflicting_task)
-                                    new_task_desc = get_task_description(task)
-                                    response_text = (f"Hold on. You have a conflict. You want to schedule '{new_task_desc}', but you already have "
-                                                    f"'{conflict_desc}'. I haven't added the new task.")
-                                    conflict_found = True
-                                    break 
-                                else:
-                                    tasks_to_add.append(task) 
-
-                            if not conflict_found and tasks_to_add:
-                                all_tasks.extend(tasks_to_add) 
-                                if save_all_tasks(all_tasks): 
-                                    task_descriptions = " and ".join([f"'{get_task_description(t)}'" for t in tasks_to_add])
-                                    response_text = f"Okay, adding {task_descriptions} to your list."
-                                else:
-                                    response_text = "I extracted the tasks, but there was an error saving the file."
+                            with task_transaction(TASK_FILE):
+                                all_tasks = load_all_tasks()
+                                conflict_found = False
+                                tasks_to_add = []
+                                for task in new_tasks:
+                                    task['id'] = new_task_id(); task['timestamp'] = datetime.now().isoformat(); task['status'] = 'pending'
+                                    conflicting_task = check_for_conflicts(task, all_tasks + tasks_to_add) 
+                                    if conflicting_task:
+                                        conflict_desc = get_task_description(conflicting_task)
+                                        new_task_desc = get_task_description(task)
+                                        response_text = (f"Hold on. You have a conflict. You want to schedule '{new_task_desc}', but you already have "
+                                                        f"'{conflict_desc}'. I haven't added the new task.")
+                                        conflict_found = True
+                                        break 
+                                    else:
+                                        tasks_to_add.append(task) 
+
+                                if not conflict_found and tasks_to_add:
+                                    all_tasks.extend(tasks_to_add) 
+                                    if save_all_tasks(all_tasks): 
+                                        task_descriptions = " and ".join([f"'{get_task_description(t)}'" for t in tasks_to_add])
+                                        response_text = f"Okay, adding {task_descriptions} to your list."
+                                    else:
+                                        response_text = "I extracted the tasks, but there was an error saving the file."
                     
                     else:
                         response_text = "I'm not sure what you wanted to do with that."
@@ -473,9 +703,12 @@ if __name__ == "__main__":
                         console.print(f"[bold green]Assistant Response:[/bold green] {response_text}")
                         speak(response_text)
                 
-                except json.JSONDecodeError:
-                    console.print("[bold red]Error: Could not decode the LLM response.[/bold red]"); 
+                except IntentParseError as e:
+                    console.print(f"[bold red]Error: Could not decode the LLM response ({e}).[/bold red]"); 
                     speak("Sorry, I had a problem processing that.")
+                except TaskStoreBusyError:
+                    console.print("[bold red]Error: The task file is locked by another session.[/bold red]")
+                    speak("Your schedule is busy being updated elsewhere. Please try again in a moment.")
             
             else:
                 console.print("[bold red]Error: The PulseVox Engine (LLM) failed to respond.[/bold red]")
@@ -0,0 +1,266 @@
+# Reminders at task start times.
+#
+# ReminderScheduler keeps a min-heap of (due time, task) and sleeps until the
+# earliest one; nothing scans the store to find due tasks. When the store changes,
+# sync() diffs it against the scheduled set and only pushes the tasks whose reminder
+# moved or appeared. Superseded heap entries are skipped lazily when they surface,
+# and the heap is compacted once they outnumber the live ones.
+#
+# ReminderService runs a scheduler on a daemon thread for one task file. It follows
+# the store's change feed (store_feed.py): it wakes when the feed reports a change
+# and applies just the changed tasks, so an idle service costs almost no CPU. The
+# clock and the wait function can be injected for tests and benchmarks.
+
+import os
+import time
+import heapq
+import threading
+from collections import deque
+from datetime import datetime
+
+from task_logic import task_key, get_task_description
+
+# Minutes before the start time that a reminder fires
+REMINDER_LEAD_MINUTES = int(os.getenv("PULSEVOX_REMINDER_LEAD_MINUTES", "10"))
+# Reminders missed by more than this (e.g. while PulseVox was closed) are not fired late
+REMINDER_GRACE_SECONDS = 300
+STORE_CHECK_SECONDS = 2.0
+
+
+def task_due_time(task, lead_minutes=REMINDER_LEAD_MINUTES):
+    """Epoch seconds when the task's reminder is due, or None (no start time, or already done)."""
+    if task.get('status') == 'done':
+        return None
+    day, start = task.get('date'), task.get('start_time')
+    if not isinstance(day, str) or not isinstance(start, str) or len(day) != 10 or len(start) != 5:
+        return None
+    try:
+        # Sliced by hand: strptime would dominate a sync over a large store
+        start_dt = datetime(int(day[:4]), int(day[5:7]), int(day[8:10]), int(start[:2]), int(start[3:5]))
+    except ValueError:
+        return None
+    return start_dt.timestamp() - lead_minutes * 60
+
+
+class ReminderScheduler:
+    def __init__(self, on_due, clock=time.time, lead_minutes=REMINDER_LEAD_MINUTES, grace_seconds=REMINDER_GRACE_SECONDS):
+        self.on_due = on_due  # Called with the task when its reminder is due
+        self.clock = clock
+        self.lead_minutes = lead_minutes
+        self.grace_seconds = grace_seconds
+        self._heap = []  # (due, seq, key)
+        self._scheduled = {}  # key -> (due, seq, task); heap entries that don't match are stale
+        self._synced = {}  # key -> task as of the last sync()
+        self._fired = set()  # Keys fired at their current due time, so a re-sync doesn't repeat them
+        self._seq = 0
+        self._lock = threading.Lock()
+        self.changed = threading.Event()  # Set when the earliest deadline may have moved
+
+    def __len__(self):
+        return len(self._scheduled)
+
+    def upsert(self, task, key=None):
+        """Schedules (or reschedules) one task's reminder. Returns True if the schedule changed."""
+        with self._lock:
+            changed = self._upsert(task, key or task_key(task), self.clock(), self._heap)
+        if changed:
+            self.changed.set()
+        return changed
+
+    def _upsert(self, task, key, now, pushes):
+        """upsert() under the lock; new heap entries go to `pushes` (the heap itself, or a batch)."""
+        due = task_due_time(task, self.lead_minutes)
+        current = self._scheduled.get(key)
+        if due is None or due < now - self.grace_seconds or (key, due) in self._fired:
+            if current:
+                del self._scheduled[key]
+            return current is not None
+        if current and current[0] == due:
+            self._scheduled[key] = (due, current[1], task)  # Same time; just keep the latest details
+            return False
+        self._seq += 1
+        self._scheduled[key] = (due, self._seq, task)
+        if pushes is self._heap:
+            heapq.heappush(self._heap, (due, self._seq, key))
+            self._maybe_compact()
+        else:
+            pushes.append((due, self._seq, key))
+        return True
+
+    def remove(self, key):
+        with self._lock:
+            removed = self._scheduled.pop(key, None) is not None
+        if removed:
+            self.changed.set()
+        return removed
+
+    def sync(self, all_tasks):
+        """Brings the schedule in line with the store, touching only what changed. Returns the change count.
+
+        all_tasks is a list, or {key: task} as a store feed's keyed() returns it."""
+        items = all_tasks.items() if isinstance(all_tasks, dict) else ((task_key(task), task) for task in all_tasks)
+        synced, changes, pushes = {}, 0, []
+        with self._lock:
+            now = self.clock()
+            for key, task in items:
+                synced[key] = task
+                if self._synced.get(key) != task:
+                    changes += self._upsert(task, key, now, pushes)
+            for key in self._synced.keys() - synced.keys():
+                changes += self._scheduled.pop(key, None) is not None
+            self._synced = synced
+            self._push_all(pushes)
+        if changes:
+            self.changed.set()
+        return changes
+
+    def apply(self, upserts, removed):
+        """Applies a change-feed delta ({key: task} added or updated, removed keys). Returns the change count."""
+        changes, pushes = 0, []
+        with self._lock:
+            now = self.clock()
+            for key, task in upserts.items():
+                self._synced[key] = task
+                changes += self._upsert(task, key, now, pushes)
+            for key in removed:
+                self._synced.pop(key, None)
+                changes += self._scheduled.pop(key, None) is not None
+            self._push_all(pushes)
+        if changes:
+            self.changed.set()
+        return changes
+
+    def _push_all(self, pushes):
+        # A few changes are pushed one by one; a large batch (e.g. the first sync) is merged in O(n)
+        if len(pushes) > 64:
+            self._heap.extend(pushes)
+            heapq.heapify(self._heap)
+        else:
+            for entry in pushes:
+                heapq.heappush(self._heap, entry)
+        self._maybe_compact()
+
+    def _maybe_compact(self):
+        if len(self._heap) > 64 and len(self._heap) > 2 * len(self._scheduled):
+            self._heap = [(due, seq, key) for key, (due, seq, _) in self._scheduled.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_stale(self):
+        while self._heap:
+            due, seq, key = self._heap[0]
+            current = self._scheduled.get(key)
+            if current is not None and current[1] == seq:
+                return
+            heapq.heappop(self._heap)
+
+    def next_due(self):
+        """Epoch seconds of the earliest pending reminder, or None."""
+        with self._lock:
+            self._pop_stale()
+            return self._heap[0][0] if self._heap else None
+
+    def run_pending(self, now=None):
+        """Fires every reminder due by `now` (default: the clock). Returns the fired tasks."""
+        now = self.clock() if now is None else now
+        due_tasks = []
+        with self._lock:
+            self._pop_stale()
+            while self._heap and self._heap[0][0] <= now:
+                due, _, key = heapq.heappop(self._heap)
+                task = self._scheduled.pop(key)[2]
+                self._fired.add((key, due))
+                due_tasks.append(task)
+                self._pop_stale()
+            if len(self._fired) > 4 * len(self._scheduled) + 1024:
+                self._fired = {(k, d) for k, d in self._fired if d > now - self.grace_seconds}
+        for task in due_tasks:
+            try:
+                self.on_due(task)
+            except Exception:
+                pass  # A failing notifier must not stop later reminders
+        return due_tasks
+
+
+def reminder_text(task):
+    start = task.get('start_time')
+    try:
+        start = datetime.strptime(start, "%H:%M").strftime("%I:%M %p").lstrip('0')
+    except (TypeError, ValueError):
+        pass
+    return f"Reminder: {get_task_description(task)} starts at {start}."
+
+
+class ReminderFeed:
+    """Recently fired reminders, numbered, so each web session can show the ones it hasn't seen."""
+
+    def __init__(self, maxlen=100):
+        self._items = deque(maxlen=maxlen)
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def append(self, task):
+        with self._lock:
+            self._seq += 1
+            self._items.append((self._seq, reminder_text(task)))
+
+    def latest_seq(self):
+        return self._seq
+
+    def since(self, seq):
+        """[(seq, text), ...] fired after `seq`."""
+        with self._lock:
+            return [item for item in self._items if item[0] > seq]
+
+
+class ReminderService:
+    """Runs a ReminderScheduler for one task file on a daemon thread, following its change feed."""
+
+    def __init__(self, feed, on_due, clock=time.time, wait=None,
+                 lead_minutes=REMINDER_LEAD_MINUTES, check_seconds=STORE_CHECK_SECONDS):
+        self.feed = feed  # store_feed.StoreFeed for the task file
+        self.scheduler = ReminderScheduler(on_due, clock, lead_minutes)
+        self.check_seconds = check_seconds
+        self._stop = threading.Event()
+        self._wait = wait or self.scheduler.changed.wait
+        self._version = None
+        self._thread = None
+        feed.add_listener(lambda event: self.scheduler.changed.set())  # Wake up as soon as the store changes
+
+    def refresh(self):
+        """Applies the store's changes since the last look; a full sync only at first or after falling behind."""
+        self.feed.refresh()
+        changes = self.feed.changes_since(self._version)
+        if changes is None:
+            self._version = self.feed.version
+            self.scheduler.sync(self.feed.keyed())
+        elif changes[0] != self._version:
+            self._version, upserts, removed = changes
+            self.scheduler.apply(upserts, removed)
+
+    def step(self):
+        """One loop iteration: pick up store changes, fire what's due, then sleep until the
+        next deadline (or the next store check, whichever comes first)."""
+        self.scheduler.changed.clear()  # Before refreshing, so a change that lands meanwhile still wakes the wait
+        self.refresh()
+        self.scheduler.run_pending()
+        next_due = self.scheduler.next_due()
+        timeout = self.check_seconds
+        if next_due is not None:
+            timeout = max(0.0, min(timeout, next_due - self.scheduler.clock()))
+        self._wait(timeout)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.step()
+            except Exception:
+                self._stop.wait(self.check_seconds)  # e.g. the file is mid-replace; try again shortly
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="pulsevox-reminders", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self.scheduler.changed.set()
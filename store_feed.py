@@ -0,0 +1,211 @@
+# Change feed for the task store.
+#
+# A StoreFeed keeps one parsed copy of a task file and a version number that goes up
+# every time the file's contents change. Each change is recorded as an event listing
+# the task keys (task_key) that were added, updated and removed, so readers such as
+# the date index, the reminder scheduler and the web app's schedule table catch up by
+# applying changes_since(their version) instead of reloading the whole store.
+#
+# Writes made in this process through write_tasks() are published straight from the
+# list being saved, with no re-read. Writes from other processes (the CLI, another
+# server) are picked up by refresh(), which re-reads the file only when its stat()
+# changed. A StoreWatcher calls refresh() on file-system events (inotify etc. via
+# watchdog, which ships with Streamlit), or on a short stat() poll without watchdog.
+
+import os
+import threading
+from collections import deque, namedtuple
+from contextlib import contextmanager
+
+from task_store import read_tasks, store_version, register_change_feed
+from task_logic import keyed_tasks
+
+FEED_POLL_SECONDS = float(os.getenv("PULSEVOX_FEED_POLL_SECONDS", "0.5"))
+FEED_HISTORY = 256  # Events kept; a reader further behind than this reloads from tasks()
+WATCH_FALLBACK_SECONDS = 5.0  # With file-system events, still stat() this often in case one is missed
+
+# version: the feed version after the change; external: written by another process (or by hand)
+ChangeEvent = namedtuple("ChangeEvent", ["version", "added", "updated", "removed", "external"])
+
+
+class StoreFeed:
+    def __init__(self, task_file, load_tasks=read_tasks, version_of=store_version, history=FEED_HISTORY):
+        self.task_file = task_file
+        self.load_tasks = load_tasks
+        self.version_of = version_of
+        self.version = 0
+        self._tasks = {}
+        self._token = object()  # version_of() as of the last read or publish
+        self._loaded = False
+        self._events = deque(maxlen=history)
+        self._lock = threading.RLock()
+        self._listeners = []
+        self.stats = {"reads": 0, "published": 0, "events": 0}
+
+    def tasks(self):
+        """The current tasks. They're shared with every reader: copy one before editing it."""
+        with self._lock:
+            return list(self._tasks.values())
+
+    def keyed(self):
+        """{key: task} for the current tasks (the same keys the events use)."""
+        with self._lock:
+            return dict(self._tasks)
+
+    def add_listener(self, callback):
+        """Calls callback(event) after each change (on the thread that made or noticed it)."""
+        self._listeners.append(callback)
+
+    def refresh(self):
+        """Re-reads the file if it changed since the last read or publish. Returns the new ChangeEvent or None."""
+        if self.version_of(self.task_file) == self._token:
+            return None  # The common case: one stat(), no lock
+        with self._lock:
+            # stat() before reading: if the file is replaced in between, the next refresh reads it again
+            token = self.version_of(self.task_file)
+            if token == self._token:
+                return None
+            self.stats["reads"] += 1
+            return self._apply(self.load_tasks(self.task_file), token, external=True)
+
+    @contextmanager
+    def publishing(self, all_tasks):
+        """Wraps the file replace in write_tasks(): the saved list becomes the current state without a re-read."""
+        with self._lock:
+            yield
+            self.stats["published"] += 1
+            self._apply(all_tasks, self.version_of(self.task_file), external=False)
+
+    def _apply(self, all_tasks, token, external):
+        new, old = keyed_tasks(all_tasks), self._tasks
+        added = [key for key in new if key not in old]
+        updated = [key for key, task in new.items() if key in old and old[key] != task]
+        removed = [key for key in old if key not in new]
+        self._tasks, self._token = new, token
+        if not self._loaded:
+            # The first read is the starting point, not a change: readers (all behind it) reload from keyed()
+            self._loaded = True
+            self.version += 1
+            return None
+        if not (added or updated or removed):
+            return None
+        self.version += 1
+        self.stats["events"] += 1
+        event = ChangeEvent(self.version, added, updated, removed, external)
+        self._events.append(event)
+        for callback in list(self._listeners):
+            try:
+                callback(event)
+            except Exception:
+                pass  # A failing reader must not break the writer
+        return event
+
+    def events_since(self, version):
+        """ChangeEvents after `version`, oldest first; None if some have already been dropped."""
+        with self._lock:
+            if version == self.version:
+                return []
+            if version is None or version > self.version or not self._events or self._events[0].version > version + 1:
+                return None
+            return [event for event in self._events if event.version > version]
+
+    def changes_since(self, version):
+        """(current version, {key: task} added or updated, [removed keys]) since `version`, merged
+        across events; None if the reader is too far behind and should reload from keyed()."""
+        with self._lock:
+            events = self.events_since(version)
+            if events is None:
+                return None
+            touched = set()
+            for event in events:
+                touched.update(event.added, event.updated, event.removed)
+            upserts = {key: self._tasks[key] for key in touched if key in self._tasks}
+            return self.version, upserts, [key for key in touched if key not in self._tasks]
+
+
+class StoreWatcher:
+    """Keeps a feed current on a daemon thread: refreshes on file-system events for the
+    task file when watchdog is available, otherwise polls its stat() every poll_seconds."""
+
+    def __init__(self, feed, poll_seconds=FEED_POLL_SECONDS):
+        self.feed = feed
+        self.poll_seconds = poll_seconds
+        self.mode = None  # 'events' or 'poll' once started
+        self._path = os.path.abspath(feed.task_file)
+        self._kick = threading.Event()
+        self._stop = threading.Event()
+        self._observer = None
+
+    def _watch_events(self):
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            return False
+        path, kick = self._path, self._kick
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                # write_tasks() renames a temp file over the store, so the store shows up as dest_path
+                if path in (event.src_path, getattr(event, "dest_path", None)):
+                    kick.set()
+
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._observer = Observer()
+            self._observer.daemon = True
+            self._observer.schedule(Handler(), os.path.dirname(path), recursive=False)
+            self._observer.start()
+        except Exception:
+            self._observer = None
+            return False
+        return True
+
+    def _loop(self):
+        interval = WATCH_FALLBACK_SECONDS if self.mode == "events" else self.poll_seconds
+        while not self._stop.is_set():
+            try:
+                self.feed.refresh()
+            except Exception:
+                pass  # e.g. mid-replace on Windows; the next wake-up tries again
+            self._kick.wait(interval)
+            self._kick.clear()
+
+    def start(self):
+        self.mode = "events" if self._watch_events() else "poll"
+        threading.Thread(target=self._loop, name="pulsevox-store-watcher", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._kick.set()
+        if self._observer is not None:
+            self._observer.stop()
+
+
+_feeds = {}  # Absolute path -> StoreFeed
+_watchers = {}  # Absolute path -> StoreWatcher
+_registry_lock = threading.Lock()
+
+
+def feed_for(task_file):
+    """The process-wide feed for a task file (created, and hooked into write_tasks, on first use)."""
+    path = os.path.abspath(task_file)
+    feed = _feeds.get(path)
+    if feed is None:
+        with _registry_lock:
+            feed = _feeds.get(path)
+            if feed is None:
+                feed = _feeds[path] = StoreFeed(task_file)
+                register_change_feed(task_file, feed)
+    return feed
+
+
+def watch_store(task_file):
+    """Starts (once per process) a watcher for a task file and returns its feed."""
+    feed = feed_for(task_file)
+    path = os.path.abspath(task_file)
+    with _registry_lock:
+        if path not in _watchers:
+            _watchers[path] = StoreWatcher(feed).start()
+    return feed
@@ -0,0 +1,120 @@
+# Memoized daily summaries.
+#
+# A summary is cached per (task file, date) together with a fingerprint of that
+# date's task set. Adding, updating or removing a task on the date changes the
+# fingerprint, so the stale summary is never served and is replaced on the next
+# request. prewarm_summaries() fills the cache ahead of time, batching several
+# dates into a single summarizer request. When the rate limiter sheds a summary
+# call, get_summary() answers with local_summary() instead, which isn't cached.
+
+import re
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from task_logic import get_task_description
+from llm_policy import generate_with_policy, LLMOverloaded
+
+MAX_CACHED_SUMMARIES = 512
+
+_cache = OrderedDict()  # (task_file, date) -> (fingerprint, summary), least recently used first
+_cache_lock = threading.Lock()
+summary_cache_stats = {"hits": 0, "misses": 0, "prewarmed": 0, "local": 0}
+
+
+def tasks_fingerprint(tasks_for_date):
+    """Hash of the fields a summary depends on; independent of task order."""
+    rows = sorted(json.dumps([get_task_description(t), t.get('start_time'), t.get('end_time'),
+                              t.get('category'), t.get('status')], default=str) for t in tasks_for_date)
+    return hashlib.sha1("\n".join(rows).encode()).hexdigest()
+
+
+def _task_lines(tasks_for_date):
+    tasks_for_date = sorted(tasks_for_date, key=lambda x: datetime.strptime(x.get('start_time') or '00:00', "%H:%M"))
+    return "\n".join(f"- {get_task_description(task)} at {task.get('start_time', 'all day')}" for task in tasks_for_date)
+
+
+def local_summary(tasks_for_date):
+    """A plain summary built without the LLM, for when it has no quota to spare."""
+    tasks_for_date = sorted(tasks_for_date, key=lambda x: datetime.strptime(x.get('start_time') or '00:00', "%H:%M"))
+    items = [f"{get_task_description(task)} at {task['start_time']}" if task.get('start_time') else get_task_description(task)
+             for task in tasks_for_date]
+    if not items:
+        return "You have nothing scheduled."
+    listed = items[0] if len(items) == 1 else ", ".join(items[:-1]) + " and " + items[-1]
+    return f"You have {len(items)} task{'s' if len(items) != 1 else ''}: {listed}."
+
+
+def _count(stat, n=1):
+    with _cache_lock:
+        summary_cache_stats[stat] += n
+
+
+def peek_summary(task_file, date_query, tasks_for_date):
+    """Returns the cached summary if it still matches the date's tasks, else None, without counting a hit."""
+    key, fingerprint = (task_file, date_query), tasks_fingerprint(tasks_for_date)
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry and entry[0] == fingerprint:
+            _cache.move_to_end(key)
+            return entry[1]
+    return None
+
+
+def cached_summary(task_file, date_query, tasks_for_date):
+    """peek_summary(), counted as a cache hit when it's served to a user."""
+    summary = peek_summary(task_file, date_query, tasks_for_date)
+    if summary is not None:
+        _count("hits")
+    return summary
+
+
+def store_summary(task_file, date_query, tasks_for_date, summary):
+    with _cache_lock:
+        _cache[(task_file, date_query)] = (tasks_fingerprint(tasks_for_date), summary)
+        _cache.move_to_end((task_file, date_query))
+        while len(_cache) > MAX_CACHED_SUMMARIES:
+            _cache.popitem(last=False)
+
+
+def get_summary(task_file, date_query, tasks_for_date, summarizer_model, call_type="summary"):
+    """The day's summary: from the cache when the tasks are unchanged, otherwise from the summarizer."""
+    summary = cached_summary(task_file, date_query, tasks_for_date)
+    if summary is not None:
+        return summary
+    _count("misses")
+    summary_prompt = (f"Here is a list of my tasks for {date_query}:\n{_task_lines(tasks_for_date)}\n\n"
+                      f"Please write a brief, natural language summary of my day (in one or two sentences).")
+    try:
+        summary = generate_with_policy(summarizer_model, summary_prompt, call_type).text.strip()
+    except LLMOverloaded:
+        _count("local")
+        return local_summary(tasks_for_date)
+    store_summary(task_file, date_query, tasks_for_date, summary)
+    return summary
+
+
+def prewarm_summaries(task_file, tasks_by_date, summarizer_model, call_type="summary"):
+    """Generates summaries for every date whose cache entry is missing or stale, in one request.
+
+    tasks_by_date maps 'YYYY-MM-DD' -> that date's tasks. Returns how many were cached."""
+    stale = {d: tasks for d, tasks in sorted(tasks_by_date.items())
+             if tasks and peek_summary(task_file, d, tasks) is None}
+    if not stale:
+        return 0
+    sections = "\n\n".join(f"### {d}\n{_task_lines(tasks)}" for d, tasks in stale.items())
+    batch_prompt = (f"Here are my tasks for several days:\n\n{sections}\n\n"
+                    f"For each day, write a brief, natural language summary of that day (in one or two sentences). "
+                    f"Answer with one section per day, each starting with the same '### YYYY-MM-DD' line.")
+    response_text = generate_with_policy(summarizer_model, batch_prompt, call_type).text
+    # Split the reply back into per-date sections; dates the model skipped just stay uncached
+    parts = re.split(r"^\s*#+\s*(\d{4}-\d{2}-\d{2})\s*$", response_text, flags=re.M)
+    cached = 0
+    for date_query, summary in zip(parts[1::2], parts[2::2]):
+        if date_query in stale and summary.strip():
+            store_summary(task_file, date_query, stale[date_query], summary.strip())
+            cached += 1
+    _count("prewarmed", cached)
+    return cached
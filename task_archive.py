@@ -0,0 +1,174 @@
+# Columnar archive for past tasks.
+#
+# Old tasks are moved out of the hot JSON store into one directory per month,
+# holding one .npy file per column. Every column is a fixed-width NumPy array
+# sorted by (date, start_time), so reads are memory-mapped and a query only
+# touches the columns it asks for, in the month partitions its dates fall in.
+#
+# A partition is never rewritten in place: each write goes to a new versioned
+# directory ("2025-01.3/") and then manifest.json, which maps each month to its
+# current version, is replaced atomically. Readers (which take no lock) always see
+# a complete version, and a crash mid-write leaves the previous one in effect.
+# The version before the current one is kept, for readers still holding it.
+
+import os
+import json
+import shutil
+
+# NumPy is imported inside the functions that need it, so code paths that never
+# touch the archive (most commands) don't pay for it.
+
+ARCHIVE_COLUMNS = ['task_description', 'category', 'date', 'start_time', 'end_time', 'status', 'timestamp', 'extra']
+DEFAULT_QUERY_COLUMNS = ['task_description', 'category', 'date', 'start_time', 'end_time', 'status']
+MANIFEST_FILE = "manifest.json"
+
+
+def archive_dir_for(task_file):
+    """Returns the archive directory that belongs to a task file (e.g. tasks.json -> tasks_archive/)."""
+    base, _ = os.path.splitext(task_file)
+    return f"{base}_archive"
+
+
+def _partition_key(date_str):
+    return date_str[:7]  # 'YYYY-MM'
+
+
+def _to_record(task, get_description):
+    """Flattens a task dict into archive columns; unknown keys are kept as JSON in 'extra'."""
+    known_keys = {'task_description', 'task', 'title', 'description', 'category', 'date',
+                  'start_time', 'end_time', 'status', 'timestamp'}
+    extra = {k: v for k, v in task.items() if k not in known_keys}
+    return {
+        'task_description': str(get_description(task, "")),
+        'category': str(task.get('category') or ""),
+        'date': str(task.get('date') or ""),
+        'start_time': str(task.get('start_time') or ""),
+        'end_time': str(task.get('end_time') or ""),
+        'status': str(task.get('status') or ""),
+        'timestamp': str(task.get('timestamp') or ""),
+        'extra': json.dumps(extra) if extra else "",
+    }
+
+
+def _read_manifest(archive_dir):
+    """{'YYYY-MM': partition directory name} for the current version of every month."""
+    try:
+        with open(os.path.join(archive_dir, MANIFEST_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        if not os.path.isdir(archive_dir):
+            return {}
+        # Archives written before the manifest: one plain 'YYYY-MM' directory per month
+        return {name: name for name in os.listdir(archive_dir)
+                if len(name) == 7 and os.path.isdir(os.path.join(archive_dir, name))}
+
+
+def _write_manifest(archive_dir, manifest):
+    path = os.path.join(archive_dir, MANIFEST_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def _read_partition(partition_dir, columns, mmap=True):
+    """Reads the given columns of one partition (memory-mapped unless told otherwise)."""
+    import numpy as np
+    return {col: np.load(os.path.join(partition_dir, f"{col}.npy"), mmap_mode='r' if mmap else None)
+            for col in columns}
+
+
+def _write_partition(archive_dir, key, records, manifest):
+    """Writes records as a new, sorted version of a month partition and points the manifest at it."""
+    import numpy as np
+    records.sort(key=lambda r: (r['date'], r['start_time']))
+    previous = manifest.get(key)
+    version = int(previous.rpartition(".")[2]) + 1 if previous and "." in previous else 1
+    name = f"{key}.{version}"
+    partition_dir = os.path.join(archive_dir, name)
+    shutil.rmtree(partition_dir, ignore_errors=True)  # Left behind by a write that crashed before the manifest swap
+    os.makedirs(partition_dir)
+    for col in ARCHIVE_COLUMNS:
+        values = [r[col] for r in records]
+        width = max(1, max((len(v) for v in values), default=1))
+        np.save(os.path.join(partition_dir, f"{col}.npy"), np.array(values, dtype=f"<U{width}"))
+    manifest[key] = name
+    _write_manifest(archive_dir, manifest)
+    # Keep the previous version for readers that looked at the manifest just before the swap
+    for stale in os.listdir(archive_dir):
+        if stale.startswith(key) and stale not in (name, previous) and os.path.isdir(os.path.join(archive_dir, stale)):
+            shutil.rmtree(os.path.join(archive_dir, stale), ignore_errors=True)
+
+
+def _record_identity(record):
+    """A task's id (kept in 'extra'), or the whole record for legacy tasks without one."""
+    task_id = json.loads(record['extra']).get('id') if record['extra'] else None
+    return task_id or tuple(record[col] for col in ARCHIVE_COLUMNS)
+
+
+def append_to_archive(tasks, archive_dir, get_description):
+    """Adds tasks to their month partitions (existing rows are kept). Tasks already in the
+    archive (same id) are skipped, so a retried move never duplicates them. Returns how many were added."""
+    by_partition = {}
+    for task in tasks:
+        record = _to_record(task, get_description)
+        if len(record['date']) < 7: continue  # Undated tasks stay in the hot store
+        by_partition.setdefault(_partition_key(record['date']), []).append(record)
+
+    os.makedirs(archive_dir, exist_ok=True)
+    manifest = _read_manifest(archive_dir)
+    archived = 0
+    for key, records in by_partition.items():
+        existing_records = []
+        if key in manifest:
+            existing = _read_partition(os.path.join(archive_dir, manifest[key]), ARCHIVE_COLUMNS, mmap=False)
+            existing_records = [{col: str(existing[col][i]) for col in ARCHIVE_COLUMNS}
+                                for i in range(len(existing['date']))]
+        seen = {_record_identity(record) for record in existing_records}
+        new_records = []
+        for record in records:
+            identity = _record_identity(record)
+            if identity not in seen:
+                seen.add(identity)
+                new_records.append(record)
+        if new_records:
+            _write_partition(archive_dir, key, existing_records + new_records, manifest)
+            archived += len(new_records)
+    return archived
+
+
+def archived_partitions(archive_dir, start_date, end_date):
+    """Lists the month partitions (in order) that can hold dates in [start_date, end_date]."""
+    first, last = _partition_key(start_date), _partition_key(end_date)
+    return sorted(key for key in _read_manifest(archive_dir) if first <= key <= last)
+
+
+def query_archive(archive_dir, start_date, end_date=None, columns=None):
+    """Returns archived tasks dated in [start_date, end_date], sorted by date and start time.
+
+    Only the requested columns of the matching month partitions are read, and the
+    date column is binary-searched so only the rows in range are materialized."""
+    end_date = end_date or start_date
+    manifest = _read_manifest(archive_dir)  # Read once, so every partition comes from the same snapshot
+    first, last = _partition_key(start_date), _partition_key(end_date)
+    partitions = sorted(key for key in manifest if first <= key <= last)
+    if not partitions:
+        return []
+    import numpy as np
+    columns = list(columns or DEFAULT_QUERY_COLUMNS)
+    read_columns = columns if 'date' in columns else columns + ['date']
+    results = []
+    for key in partitions:
+        partition = _read_partition(os.path.join(archive_dir, manifest[key]), read_columns)
+        dates = partition['date']
+        lo = int(np.searchsorted(dates, start_date, side='left'))
+        hi = int(np.searchsorted(dates, end_date, side='right'))
+        if lo >= hi: continue
+        sliced = {col: partition[col][lo:hi].tolist() for col in columns}
+        for i in range(hi - lo):
+            task = {col: sliced[col][i] for col in columns if sliced[col][i] != ""}
+            extra = task.pop('extra', None)
+            if extra:
+                task.update(json.loads(extra))
+            task['archived'] = True
+            results.append(task)
+    return results
@@ -0,0 +1,303 @@
+# Pure task logic for PulseVox: no file I/O, no LLM, no audio.
+# Kept dependency-free so it is cheap to import from the CLI, the web app and tools.
+
+import uuid
+import hashlib
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+
+# Window searched by the free-slot finder (nobody wants a 3 AM slot suggested)
+FREE_SLOT_DAY_START = "08:00"
+FREE_SLOT_DAY_END = "22:00"
+# Longest range the free-slot finder covers (every day is one spoken clause); longer ones are cut
+FREE_SLOT_MAX_DAYS = 14
+
+# Named agenda ranges for the web view (the LLM resolves spoken ranges itself)
+AGENDA_PERIODS = ["Next 7 days", "This week", "This month", "Next 90 days"]
+
+def get_task_description(task_dict, fallback="an unnamed task"):
+    """Gets the task description from various possible keys."""
+    if not task_dict: return fallback
+    return task_dict.get('task_description') or \
+           task_dict.get('task') or \
+           task_dict.get('title') or \
+           task_dict.get('description') or \
+           fallback
+
+def new_task_id():
+    """A fresh id for a task being added to the store."""
+    return uuid.uuid4().hex
+
+def task_key(task):
+    """Stable identity of a task: its id, or for tasks saved before ids existed, a hash of
+    its creation time, import UID, date, start time and description. Saving the store
+    gives such tasks their key as a permanent id (assign_task_ids), so this is temporary."""
+    if task.get('id'):
+        return task['id']
+    seed = (f"{task.get('timestamp')}|{task.get('ics_uid')}|{task.get('date')}|{task.get('start_time')}|"
+            f"{get_task_description(task, '')}")
+    return "legacy-" + hashlib.sha1(seed.encode()).hexdigest()[:16]
+
+def keyed_tasks(all_tasks):
+    """{key: task} in file order. Identical legacy tasks share a task_key, so repeats get '#2', '#3', ..."""
+    keyed, repeats = {}, {}
+    for task in all_tasks:
+        if not isinstance(task, dict):
+            continue
+        key = base = task_key(task)
+        if key in keyed:
+            n = repeats.get(base, 1)
+            while key in keyed:
+                n += 1
+                key = f"{base}#{n}"
+            repeats[base] = n
+        keyed[key] = task
+    return keyed
+
+def assign_task_ids(all_tasks):
+    """Gives tasks without an id their current key as one, so their key no longer depends on
+    their contents or position. Returns how many tasks got an id."""
+    assigned = 0
+    for key, task in keyed_tasks(all_tasks).items():
+        if not task.get('id'):
+            task['id'] = key
+            assigned += 1
+    return assigned
+
+def check_for_conflicts(new_task, all_tasks):
+    """Checks if a new task conflicts with any existing tasks on the same day."""
+    if not all(k in new_task for k in ["date", "start_time", "end_time"]): return None
+    time_format = "%H:%M"
+    try:
+        new_start = datetime.strptime(new_task["start_time"], time_format).time()
+        new_end = datetime.strptime(new_task["end_time"], time_format).time()
+    except ValueError:
+        return None 
+    for existing_task in all_tasks:
+        if existing_task.get("date") == new_task.get("date") and all(k in existing_task for k in ["start_time", "end_time"]):
+            try:
+                existing_start = datetime.strptime(existing_task["start_time"], time_format).time()
+                existing_end = datetime.strptime(existing_task["end_time"], time_format).time()
+                if new_start < existing_end and new_end > existing_start:
+                    return existing_task
+            except ValueError:
+                continue
+    return None
+
+def _time_to_minutes(time_str):
+    """Converts an 'HH:MM' string to minutes since midnight (None if invalid)."""
+    try:
+        hours, minutes = time_str.split(":")
+        total = int(hours) * 60 + int(minutes)
+    except (AttributeError, ValueError):
+        return None
+    return total if 0 <= total <= 24 * 60 else None
+
+class ConflictIndex:
+    """Busy intervals bucketed by date, for checking many new tasks at once (bulk import):
+    each check only looks at tasks on the same day instead of scanning the whole store.
+    Same overlap rule as check_for_conflicts()."""
+
+    def __init__(self, all_tasks=()):
+        self._by_date = {}
+        for task in all_tasks:
+            self.add(task)
+
+    @staticmethod
+    def _interval(task):
+        if not all(task.get(k) for k in ["date", "start_time", "end_time"]): return None
+        start, end = _time_to_minutes(task["start_time"]), _time_to_minutes(task["end_time"])
+        return None if start is None or end is None else (start, end)
+
+    def add(self, task):
+        interval = self._interval(task)
+        if interval:
+            self._by_date.setdefault(task["date"], []).append((interval[0], interval[1], task))
+
+    def find_conflict(self, task):
+        """Returns the first existing task overlapping `task`, or None."""
+        interval = self._interval(task)
+        if not interval: return None
+        for start, end, existing_task in self._by_date.get(task["date"], ()):
+            if interval[0] < end and interval[1] > start:
+                return existing_task
+        return None
+
+def _minutes_to_natural(total_minutes):
+    """Converts minutes since midnight to a spoken time like '4:30 PM'."""
+    if total_minutes >= 24 * 60: return "midnight"
+    return datetime.strptime(f"{total_minutes // 60:02d}:{total_minutes % 60:02d}", "%H:%M").strftime("%I:%M %p").lstrip('0')
+
+def find_free_slots(all_tasks, start_date, end_date=None, min_duration_minutes=0, day_start=FREE_SLOT_DAY_START, day_end=FREE_SLOT_DAY_END):
+    """Returns {date: [(start_minute, end_minute), ...]} of free intervals for each day in the range.
+
+    A reversed range is put in order, and only its first FREE_SLOT_MAX_DAYS days are covered.
+    Busy intervals are bucketed per day in one pass over the store, then sorted and
+    merged, so the gaps between them are the free slots."""
+    end_date = end_date or start_date
+    try:
+        first_day = datetime.strptime(start_date, "%Y-%m-%d").date()
+        last_day = datetime.strptime(end_date, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return None
+    if first_day > last_day:
+        first_day, last_day = last_day, first_day
+    last_day = min(last_day, first_day + timedelta(days=FREE_SLOT_MAX_DAYS - 1))
+    start_date, end_date = first_day.isoformat(), last_day.isoformat()
+    window_start, window_end = _time_to_minutes(day_start), _time_to_minutes(day_end)
+    if window_start is None or window_end is None or window_start >= window_end:
+        return None
+
+    # ISO dates compare correctly as strings, so no per-task date parsing is needed
+    busy_by_date = {}
+    for task in all_tasks:
+        task_date = task.get("date")
+        if not isinstance(task_date, str) or not (start_date <= task_date <= end_date): continue
+        start, end = _time_to_minutes(task.get("start_time")), _time_to_minutes(task.get("end_time"))
+        if start is None or end is None or end <= start: continue
+        busy_by_date.setdefault(task_date, []).append((start, end))
+
+    min_duration_minutes = max(int(min_duration_minutes or 0), 1)
+    free_slots = {}
+    day, one_day = first_day, timedelta(days=1)
+    while day <= last_day:
+        date_str = day.isoformat()
+        slots, cursor = [], window_start
+        for start, end in sorted(busy_by_date.get(date_str, [])):
+            if start > cursor and min(start, window_end) - cursor >= min_duration_minutes:
+                slots.append((cursor, min(start, window_end)))
+            cursor = max(cursor, end)
+            if cursor >= window_end: break
+        if window_end - cursor >= min_duration_minutes:
+            slots.append((cursor, window_end))
+        free_slots[date_str] = slots
+        day += one_day
+    return free_slots
+
+def build_free_slot_response(all_tasks, date_query, end_date_query=None, min_duration_minutes=0):
+    """Finds free slots and phrases them as a natural language reply."""
+    free_slots = find_free_slots(all_tasks, date_query, end_date_query, min_duration_minutes)
+    if free_slots is None:
+        return "Sorry, I couldn't understand the dates you asked about."
+    duration_text = f" of at least {int(min_duration_minutes)} minutes" if min_duration_minutes else ""
+    requested_days = abs((datetime.strptime(end_date_query or date_query, "%Y-%m-%d")
+                          - datetime.strptime(date_query, "%Y-%m-%d")).days) + 1
+    if requested_days > FREE_SLOT_MAX_DAYS:
+        duration_text += f" over the first {FREE_SLOT_MAX_DAYS} days"
+    day_descriptions = []
+    for date_str, slots in free_slots.items():
+        if not slots:
+            day_descriptions.append(f"on {date_str} you have no free slots{duration_text}")
+            continue
+        slot_texts = [f"from {_minutes_to_natural(start)} to {_minutes_to_natural(end)}" for start, end in slots]
+        joined_slots = slot_texts[0] if len(slot_texts) == 1 else ", ".join(slot_texts[:-1]) + f" and {slot_texts[-1]}"
+        day_descriptions.append(f"on {date_str} you are free {joined_slots}")
+    if len(day_descriptions) == 1:
+        return day_descriptions[0][0].upper() + day_descriptions[0][1:] + "."
+    return f"Here are your free slots{duration_text}: " + "; ".join(day_descriptions) + "."
+
+def agenda_range(period, today=None):
+    """Returns (start_date, end_date) as 'YYYY-MM-DD' strings for one of AGENDA_PERIODS."""
+    today = today or date.today()
+    if period == "This week":  # Monday to Sunday
+        start = today - timedelta(days=today.weekday())
+        return start.isoformat(), (start + timedelta(days=6)).isoformat()
+    if period == "This month":
+        next_month = (today.replace(day=28) + timedelta(days=4)).replace(day=1)
+        return today.replace(day=1).isoformat(), (next_month - timedelta(days=1)).isoformat()
+    days = 90 if period == "Next 90 days" else 7
+    return today.isoformat(), (today + timedelta(days=days - 1)).isoformat()
+
+def task_sort_key(task):
+    """(date, start_time) ordering shared by the date index and the archive."""
+    return (str(task.get('date') or ""), str(task.get('start_time') or ""))
+
+class TaskDateIndex:
+    """Tasks sorted by (date, start_time) with a parallel list of dates, so a date
+    range is two binary searches and a slice instead of a scan of the whole store.
+
+    Built from {key: task} (a store feed's keyed()) it can also apply a feed's deltas."""
+
+    def __init__(self, all_tasks):
+        self.by_key = dict(all_tasks) if isinstance(all_tasks, dict) else {}
+        tasks = self.by_key.values() if isinstance(all_tasks, dict) else all_tasks
+        self.tasks = sorted((t for t in tasks if isinstance(t.get('date'), str)), key=task_sort_key)
+        self.dates = [t['date'] for t in self.tasks]
+
+    def between(self, start_date, end_date):
+        """Tasks dated in [start_date, end_date] (ISO strings), in agenda order."""
+        return self.tasks[bisect_left(self.dates, start_date):bisect_right(self.dates, end_date)]
+
+    def copy(self):
+        """A copy to apply deltas to while readers keep this one. It copies the lists and the
+        key map (pointers, not tasks), so it's O(n), but far cheaper than the sort it replaces."""
+        clone = TaskDateIndex({})
+        clone.by_key, clone.tasks, clone.dates = dict(self.by_key), list(self.tasks), list(self.dates)
+        return clone
+
+    def _day_bounds(self, date_str):
+        return bisect_left(self.dates, date_str), bisect_right(self.dates, date_str)
+
+    def apply(self, upserts, removed):
+        """Applies a change-feed delta in place: {key: task} added or updated, and removed keys.
+        Each change only touches the task's own day, found by binary search; the list insert or
+        delete still shifts the tail. Copy first if other threads may be reading the index."""
+        for key in list(removed) + list(upserts):
+            old = self.by_key.pop(key, None)
+            if old is None or not isinstance(old.get('date'), str):
+                continue
+            low, high = self._day_bounds(old['date'])
+            for i in range(low, high):
+                if self.tasks[i] is old:
+                    del self.tasks[i], self.dates[i]
+                    break
+        for key, task in upserts.items():
+            self.by_key[key] = task
+            if not isinstance(task.get('date'), str):
+                continue
+            low, high = self._day_bounds(task['date'])
+            sort_key = task_sort_key(task)
+            while low < high and task_sort_key(self.tasks[low]) <= sort_key:
+                low += 1
+            self.tasks.insert(low, task)
+            self.dates.insert(low, task['date'])
+
+def group_by_date(sorted_tasks):
+    """Groups tasks already sorted by date into [(date, [tasks]), ...]."""
+    groups = []
+    for task in sorted_tasks:
+        if not groups or groups[-1][0] != task['date']:
+            groups.append((task['date'], []))
+        groups[-1][1].append(task)
+    return groups
+
+def _day_label(date_str):
+    try:
+        return datetime.strptime(date_str, "%Y-%m-%d").strftime("%A, %B %d").replace(" 0", " ")
+    except ValueError:
+        return date_str
+
+def _agenda_item(task):
+    start = _time_to_minutes(task.get('start_time'))
+    return get_task_description(task) + (f" at {_minutes_to_natural(start)}" if start is not None else "")
+
+def build_agenda_response(sorted_tasks, start_date, end_date):
+    """Phrases a date range's tasks as a spoken agenda, one sentence per busy day."""
+    groups = group_by_date(sorted_tasks)
+    if not groups:
+        return f"You have nothing scheduled between {start_date} and {end_date}."
+    day_sentences = [f"{_day_label(day)}: " + ", ".join(_agenda_item(t) for t in tasks) + "."
+                     for day, tasks in groups]
+    task_count = sum(len(tasks) for _, tasks in groups)
+    return (f"From {start_date} to {end_date} you have {task_count} task{'s' if task_count != 1 else ''} "
+            f"on {len(groups)} day{'s' if len(groups) != 1 else ''}. " + " ".join(day_sentences))
+
+def build_agenda_markdown(sorted_tasks):
+    """The same agenda as a Markdown list grouped under a heading per day."""
+    blocks = []
+    for day, tasks in group_by_date(sorted_tasks):
+        items = [f"- {t.get('start_time') or 'all day'}"
+                 f"{'–' + t['end_time'] if t.get('end_time') else ''} · {get_task_description(t)}"
+                 f"{' (' + t['category'] + ')' if t.get('category') else ''}" for t in tasks]
+        blocks.append(f"**{_day_label(day)}** ({day})\n\n" + "\n".join(items))
+    return "\n\n".join(blocks)
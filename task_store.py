@@ -0,0 +1,149 @@
+# Task storage for PulseVox: per-user shards, file locking and atomic writes.
+
+import os
+import re
+import json
+import time
+import random
+import threading
+from urllib.parse import quote
+from contextlib import contextmanager, nullcontext
+
+from task_logic import assign_task_ids
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+DEFAULT_TASK_FILE = "tasks.json"
+TASK_SHARD_DIR = "task_shards"  # One JSON file per user/tenant lives here
+
+LOCK_TIMEOUT_SECONDS = 10
+LOCK_RETRY_SECONDS = 0.005  # Base back-off between lock attempts (jittered)
+
+# Locks held by the current thread, so nested transactions don't deadlock on themselves
+_held_locks = threading.local()
+
+
+class TaskStoreBusyError(Exception):
+    """Raised when a task file stays locked by another session for too long."""
+
+
+_change_feeds = {}  # Absolute path -> StoreFeed (store_feed.py) that in-process writes are published to
+
+
+def register_change_feed(task_file, feed):
+    """Makes write_tasks() publish each saved list to `feed` as it replaces the file."""
+    _change_feeds[os.path.abspath(task_file)] = feed
+
+
+def task_file_for(user_id=None):
+    """Returns the task file (shard) for a user or tenant; the shared default file if no user is given.
+
+    The id is percent-encoded (and a leading dot too), so ids made of letters, digits and
+    '_.-~' keep their plain file name and different ids never share a shard."""
+    if not user_id:
+        return DEFAULT_TASK_FILE
+    safe_id = quote(str(user_id), safe="")
+    safe_id = re.sub(r"^\.", "%2E", safe_id)  # No hidden files, no '..'
+    return os.path.join(TASK_SHARD_DIR, f"{safe_id}.json")
+
+
+def _try_lock(fd):
+    """Attempts a non-blocking exclusive lock on an open file descriptor."""
+    if fcntl:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+
+
+def _unlock(fd):
+    if fcntl:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def task_transaction(task_file=DEFAULT_TASK_FILE, timeout=LOCK_TIMEOUT_SECONDS):
+    """Holds an exclusive lock on a task file for a whole load-modify-save cycle.
+
+    The lock lives in a '<file>.lock' sidecar, so it works across processes and
+    across Streamlit session threads. Re-entering it from the same thread is a no-op."""
+    key = os.path.abspath(task_file)
+    held = _held_locks.__dict__.setdefault("depths", {})
+    if held.get(key):
+        held[key] += 1
+        try:
+            yield
+        finally:
+            held[key] -= 1
+        return
+
+    os.makedirs(os.path.dirname(key), exist_ok=True)
+    lock_fd = os.open(key + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        deadline = time.monotonic() + timeout
+        attempt = 0
+        while True:
+            try:
+                _try_lock(lock_fd)
+                break
+            except OSError:
+                if time.monotonic() >= deadline:
+                    raise TaskStoreBusyError(f"Timed out waiting for the lock on {task_file}")
+                # Jittered exponential back-off, capped so waiters stay responsive
+                attempt += 1
+                time.sleep(random.uniform(0, LOCK_RETRY_SECONDS * min(2 ** attempt, 32)))
+        held[key] = 1
+        try:
+            yield
+        finally:
+            held.pop(key, None)
+            _unlock(lock_fd)
+    finally:
+        os.close(lock_fd)
+
+
+def read_tasks(task_file=DEFAULT_TASK_FILE):
+    """Reads the task list from a file (an empty list if it is missing or corrupt)."""
+    try:
+        with open(task_file, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+    except json.JSONDecodeError:
+        return []
+
+
+def write_tasks(all_tasks, task_file=DEFAULT_TASK_FILE):
+    """Atomically replaces the task file, so readers never see a half-written list.
+    Tasks saved before ids existed are given one (their current key) on the way out."""
+    assign_task_ids(all_tasks)
+    with task_transaction(task_file):
+        directory = os.path.dirname(os.path.abspath(task_file))
+        temp_file = os.path.join(directory, f".{os.path.basename(task_file)}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(temp_file, 'w') as f:
+                json.dump(all_tasks, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            feed = _change_feeds.get(os.path.abspath(task_file))
+            with feed.publishing(all_tasks) if feed else nullcontext():
+                os.replace(temp_file, task_file)
+        finally:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+
+
+def store_version(task_file=DEFAULT_TASK_FILE):
+    """Returns a cheap version token for a task file that changes whenever it is rewritten."""
+    try:
+        stat = os.stat(task_file)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
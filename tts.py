@@ -0,0 +1,175 @@
+# Text-to-speech backends.
+#
+# Each backend turns text into audio bytes in memory: gTTS (Google's online TTS,
+# MP3), espeak-ng (a local engine, WAV on stdout) and pyttsx3 (the OS's own voices
+# through SAPI5 / NSSpeechSynthesizer / espeak, WAV). A TTSRouter tries them in
+# preference order, but picks by latency: a backend that errors, or takes longer
+# than the latency budget, is benched for a cool-down period and the next one is
+# used, so replies keep being spoken (by the local engine) while the network is
+# slow or down. Once the cool-down ends the preferred backend is tried again.
+
+import os
+import time
+import shutil
+import tempfile
+import threading
+import subprocess
+import importlib.util
+from collections import namedtuple
+
+from llm_policy import LatencyTracker
+
+# Backends in order of preference (the first one that's available, healthy and fast enough is used)
+TTS_BACKENDS = [name.strip() for name in os.getenv("PULSEVOX_TTS_BACKENDS", "gtts,espeak,pyttsx3").split(",") if name.strip()]
+# A backend slower than this (whole reply) is benched for TTS_COOLDOWN_SECONDS
+TTS_LATENCY_BUDGET_MS = float(os.getenv("PULSEVOX_TTS_LATENCY_BUDGET_MS", "1500"))
+TTS_COOLDOWN_SECONDS = float(os.getenv("PULSEVOX_TTS_COOLDOWN_SECONDS", "60"))
+# Network timeout for online backends
+TTS_TIMEOUT_SECONDS = float(os.getenv("PULSEVOX_TTS_TIMEOUT_SECONDS", "5"))
+
+# data: the encoded audio; format: 'mp3' or 'wav'; backend: the backend's name
+SpeechAudio = namedtuple("SpeechAudio", ["data", "format", "backend"])
+
+
+class TTSError(Exception):
+    """Raised when no backend could produce audio."""
+
+
+class GTTSBackend:
+    """Google Translate's TTS over HTTPS (one request per ~100-character chunk)."""
+    name, format = "gtts", "mp3"
+
+    def __init__(self, timeout=TTS_TIMEOUT_SECONDS):
+        self.timeout = timeout
+
+    def available(self):
+        return importlib.util.find_spec("gtts") is not None
+
+    def stream(self, text, lang="en"):
+        """Yields MP3 chunks as they arrive, one per chunk of text."""
+        from gtts import gTTS
+        yield from gTTS(text=text, lang=lang, slow=False, timeout=self.timeout).stream()
+
+
+class EspeakBackend:
+    """espeak-ng (or espeak) run locally, writing a WAV to stdout."""
+    name, format = "espeak", "wav"
+
+    def __init__(self, executable=None):
+        self.executable = executable or shutil.which("espeak-ng") or shutil.which("espeak")
+
+    def available(self):
+        return self.executable is not None
+
+    def stream(self, text, lang="en", chunk_size=16384):
+        """Yields the WAV as espeak writes it (the header comes first, so playback can start early)."""
+        process = subprocess.Popen([self.executable, "--stdout", "--stdin", "-v", lang.split("-")[0]],
+                                   stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        try:
+            process.stdin.write(text.encode())
+            process.stdin.close()
+            while chunk := process.stdout.read1(chunk_size):
+                yield chunk
+        finally:
+            process.stdout.close()
+            if process.wait() != 0:
+                raise TTSError(f"espeak exited with status {process.returncode}")
+
+
+class Pyttsx3Backend:
+    """The platform's own speech engine through pyttsx3. It can only write to a file, so the
+    WAV goes through a temporary file; one engine is shared, and it isn't thread-safe."""
+    name, format = "pyttsx3", "wav"
+
+    def __init__(self):
+        self._engine = None
+        self._lock = threading.Lock()
+
+    def available(self):
+        return importlib.util.find_spec("pyttsx3") is not None
+
+    def stream(self, text, lang="en"):
+        import pyttsx3
+        fd, path = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
+        try:
+            with self._lock:
+                if self._engine is None:
+                    self._engine = pyttsx3.init()
+                self._engine.save_to_file(text, path)
+                self._engine.runAndWait()
+            with open(path, "rb") as f:
+                data = f.read()
+        finally:
+            os.remove(path)
+        if not data:
+            raise TTSError("pyttsx3 produced no audio")
+        yield data
+
+
+BACKEND_TYPES = {backend.name: backend for backend in (GTTSBackend, EspeakBackend, Pyttsx3Backend)}
+
+
+class TTSRouter:
+    """Synthesizes with the first backend (in preference order) that isn't benched."""
+
+    def __init__(self, backends, latency_budget=TTS_LATENCY_BUDGET_MS / 1000, cooldown=TTS_COOLDOWN_SECONDS):
+        self.backends = backends
+        self.latency_budget = latency_budget
+        self.cooldown = cooldown
+        self.latency = {backend.name: LatencyTracker(window=50) for backend in backends}
+        self.stats = {backend.name: {"calls": 0, "failures": 0, "slow": 0} for backend in backends}
+        self._benched_until = {backend.name: 0.0 for backend in backends}
+
+    def candidates(self):
+        """Available backends to try, in order: healthy ones by preference, then benched ones, fastest first."""
+        now = time.monotonic()
+        available = [backend for backend in self.backends if backend.available()]
+        healthy = [backend for backend in available if self._benched_until[backend.name] <= now]
+        benched = sorted((backend for backend in available if backend not in healthy),
+                         key=lambda backend: self.latency[backend.name].percentile(0.5) or float("inf"))
+        return healthy + benched
+
+    def _bench(self, backend):
+        self._benched_until[backend.name] = time.monotonic() + self.cooldown
+
+    def synthesize(self, text, lang="en"):
+        """SpeechAudio for text; falls back to the next backend on errors. Raises TTSError if all fail."""
+        errors = []
+        for backend in self.candidates():
+            self.stats[backend.name]["calls"] += 1
+            started = time.monotonic()
+            try:
+                data = b"".join(backend.stream(text, lang))
+            except Exception as e:
+                self.stats[backend.name]["failures"] += 1
+                self._bench(backend)
+                errors.append(f"{backend.name}: {e}")
+                continue
+            elapsed = time.monotonic() - started
+            self.latency[backend.name].record(elapsed)
+            if elapsed > self.latency_budget:
+                # Still use this reply, but give the next backend a turn until the cool-down ends
+                self.stats[backend.name]["slow"] += 1
+                self._bench(backend)
+            return SpeechAudio(data, backend.format, backend.name)
+        raise TTSError("No text-to-speech backend worked: " + ("; ".join(errors) or "none is installed"))
+
+    def tts_stats(self):
+        """Per backend: calls, failures, slow replies, p50 latency in ms and whether it's benched."""
+        now = time.monotonic()
+        report = {}
+        for backend in self.backends:
+            p50 = self.latency[backend.name].percentile(0.5)
+            report[backend.name] = {**self.stats[backend.name], "available": backend.available(),
+                                    "benched": self._benched_until[backend.name] > now,
+                                    "p50_ms": round(p50 * 1000) if p50 is not None else None}
+        return report
+
+
+tts_router = TTSRouter([BACKEND_TYPES[name]() for name in TTS_BACKENDS if name in BACKEND_TYPES])
+
+
+def synthesize(text, lang="en"):
+    """SpeechAudio for text from the process-wide router."""
+    return tts_router.synthesize(text, lang)